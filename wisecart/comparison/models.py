@@ -1,7 +1,10 @@
 from django.db import models
-from django.contrib.sessions.models import Session
 from products.models import Product
 
+# Comparison lists live in a signed cookie; see selection.py. These models are
+# no longer read or written and only keep the old tables (and the lists in
+# them) around for one more release; drop them in the next one.
+
 
 class ComparisonSession(models.Model):
     """Model to track comparison sessions using Django sessions"""
@@ -0,0 +1,81 @@
+"""The products a visitor is comparing, kept in a signed cookie.
+
+The list is only a handful of product ids, so it lives client-side: counting
+or changing it needs no session and no database row, and only the comparison
+page itself loads the products.
+"""
+from django.conf import settings
+
+from products.models import Product
+
+COMPARISON_COOKIE_NAME = getattr(settings, "COMPARISON_COOKIE_NAME", "compare")
+COMPARISON_COOKIE_AGE = getattr(settings, "COMPARISON_COOKIE_AGE", 60 * 60 * 24 * 30)
+
+
+class ComparisonList:
+    """Up to MAX_PRODUCTS product ids, in the order they were added.
+
+    Changes are written back with ``save(response)``.
+    """
+
+    MAX_PRODUCTS = 4
+    SALT = "comparison.list"
+
+    def __init__(self, request):
+        value = request.get_signed_cookie(
+            COMPARISON_COOKIE_NAME, default="", salt=self.SALT, max_age=COMPARISON_COOKIE_AGE
+        )
+        self.product_ids = [int(pk) for pk in value.split(",") if pk.isdigit()][: self.MAX_PRODUCTS]
+        self.changed = False
+
+    def __len__(self):
+        return len(self.product_ids)
+
+    def __contains__(self, product_id):
+        return product_id in self.product_ids
+
+    @property
+    def is_full(self):
+        return len(self.product_ids) >= self.MAX_PRODUCTS
+
+    def add(self, product_id):
+        if product_id in self.product_ids or self.is_full:
+            return False
+        self.product_ids.append(product_id)
+        self.changed = True
+        return True
+
+    def remove(self, product_id):
+        if product_id not in self.product_ids:
+            return False
+        self.product_ids.remove(product_id)
+        self.changed = True
+        return True
+
+    def clear(self):
+        self.changed = bool(self.product_ids)
+        self.product_ids = []
+
+    def products(self):
+        """The compared Products with their stores, dropping any deleted since."""
+        found = Product.objects.select_related("store").in_bulk(self.product_ids)
+        if len(found) < len(self.product_ids):
+            self.product_ids = [pk for pk in self.product_ids if pk in found]
+            self.changed = True
+        return [found[pk] for pk in self.product_ids]
+
+    def save(self, response):
+        if not self.changed:
+            return response
+        if self.product_ids:
+            response.set_signed_cookie(
+                COMPARISON_COOKIE_NAME,
+                ",".join(str(pk) for pk in self.product_ids),
+                salt=self.SALT,
+                max_age=COMPARISON_COOKIE_AGE,
+                httponly=True,
+                samesite="Lax",
+            )
+        else:
+            response.delete_cookie(COMPARISON_COOKIE_NAME, samesite="Lax")
+        return response
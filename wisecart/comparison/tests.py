@@ -1,3 +1,79 @@
-from django.test import TestCase
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase
 
-# Create your tests here.
+from products.models import Product, url_key
+from shops.models import Shop
+from .selection import COMPARISON_COOKIE_NAME, ComparisonList
+
+
+def request_with(cookie=None):
+    request = RequestFactory().get("/compare/")
+    if cookie is not None:
+        request.COOKIES[COMPARISON_COOKIE_NAME] = cookie
+    return request
+
+
+def saved_cookie(compared):
+    return compared.save(HttpResponse()).cookies.get(COMPARISON_COOKIE_NAME)
+
+
+class ComparisonListTests(SimpleTestCase):
+    def test_starts_empty(self):
+        compared = ComparisonList(request_with())
+        self.assertEqual(len(compared), 0)
+        self.assertIsNone(saved_cookie(compared))
+
+    def test_keeps_products_in_order_across_requests(self):
+        compared = ComparisonList(request_with())
+        self.assertTrue(compared.add(3))
+        self.assertTrue(compared.add(1))
+
+        compared = ComparisonList(request_with(saved_cookie(compared).value))
+        self.assertEqual(compared.product_ids, [3, 1])
+        self.assertIn(3, compared)
+
+    def test_ignores_duplicates_and_stops_when_full(self):
+        compared = ComparisonList(request_with())
+        for product_id in range(1, ComparisonList.MAX_PRODUCTS + 1):
+            compared.add(product_id)
+        self.assertFalse(compared.add(1))
+        self.assertTrue(compared.is_full)
+        self.assertFalse(compared.add(99))
+        self.assertEqual(len(compared), ComparisonList.MAX_PRODUCTS)
+
+    def test_removing_the_last_product_deletes_the_cookie(self):
+        compared = ComparisonList(request_with())
+        compared.add(5)
+        compared = ComparisonList(request_with(saved_cookie(compared).value))
+        self.assertTrue(compared.remove(5))
+        self.assertFalse(compared.remove(5))
+        self.assertEqual(saved_cookie(compared)["max-age"], 0)
+
+    def test_unchanged_list_is_not_written_back(self):
+        compared = ComparisonList(request_with())
+        compared.add(5)
+        compared = ComparisonList(request_with(saved_cookie(compared).value))
+        self.assertIsNone(saved_cookie(compared))
+
+    def test_tampered_cookie_is_ignored(self):
+        self.assertEqual(ComparisonList(request_with("1,2,3")).product_ids, [])
+
+
+class ComparisonListProductsTests(TestCase):
+    def test_drops_products_deleted_since(self):
+        shop = Shop.objects.create(name="Startech", mod_comment="", description="", all_domains="", address="")
+        products = [
+            Product.objects.create(
+                name=f"Mouse {n}", url=f"https://shop.test/{n}", url_key=url_key(f"https://shop.test/{n}"),
+                store=shop, rating=0,
+            )
+            for n in range(3)
+        ]
+        compared = ComparisonList(request_with())
+        for product in reversed(products):
+            compared.add(product.id)
+        products[1].delete()
+
+        self.assertEqual(compared.products(), [products[2], products[0]])
+        self.assertEqual(compared.product_ids, [products[2].id, products[0].id])
+        self.assertTrue(compared.changed)
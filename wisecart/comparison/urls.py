@@ -9,5 +9,6 @@ urlpatterns = [
     path('add-featured/', views.add_featured_to_compare, name='add_featured'),
     path('remove/', views.remove_from_compare, name='remove'),
     path('count/', views.get_compare_count, name='count'),
+    path('status/', views.comparison_status, name='status'),
     path('clear/', views.clear_comparison, name='clear'),
 ] 
\ No newline at end of file
@@ -1,29 +1,21 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST
-from django.contrib import messages
-from django.urls import reverse
-from .models import ComparisonSession, ComparedProduct
-from products.models import Product
+from .selection import ComparisonList
+from products.models import Product, PriceObservation, url_key
 from search.models import SearchResult
-from shops.models import Shop
-from urllib.parse import unquote
+from jobs.models import ScrapeJob
 import json
 import logging
-import time
 from django.utils import timezone
+from django.conf import settings
 from datetime import timedelta
 
-# Import scraping functionality from products app
-from scrapy.crawler import CrawlerRunner
-from scrapy.utils.project import get_project_settings
-from crochet import wait_for, setup
-from scraper.scraper.spiders.startech import StartechProductSpider
-from scraper.scraper.spiders.potakait import PotakaitProductSpider
-from scraper.scraper.spiders.ucc import UCCProductSpider
-from scraper.scraper.spiders.techland import TechLandProductSpider
-from scraper.scraper.spiders.sumashtech import SumashTechProductSpider
-from scraper.scraper.spiders.riointernational import RioInternationalProductSpider
+# Import scraping functionality
+from crochet import run_in_reactor, setup
+from scraper.scraper.crawl import crawl_product
+from wisecart.freshness import get_policy
+from wisecart.singleflight import in_flight
 
 logger = logging.getLogger(__name__)
 
@@ -33,115 +25,64 @@ try:
 except RuntimeError:
     pass  # Already setup
 
-SPIDER_TIMEOUT = 30  # seconds
+SCRAPE_JOBS_ENABLED = getattr(settings, "SCRAPE_JOBS_ENABLED", False)
 
+PRODUCT_POLICY = get_policy("product")
 
-def get_or_create_comparison_session(request):
-    """Get or create a comparison session for the current user session"""
-    if not request.session.session_key:
-        request.session.create()
-    
-    session_key = request.session.session_key
-    comparison_session, created = ComparisonSession.objects.get_or_create(
-        session_key=session_key
-    )
-    return comparison_session
-
-
-@wait_for(timeout=SPIDER_TIMEOUT)
-def run_spider_for_product(product_url, store):
-    """Run the appropriate spider to scrape complete product details."""
-    # Set up Scrapy settings to enable DjangoPipeline
-    settings = get_project_settings()
-    settings.set(
-        "ITEM_PIPELINES",
-        {"scraper.scraper.pipelines.DjangoPipeline": 300},
-    )
-    runner = CrawlerRunner(settings)
 
+@run_in_reactor
+def start_spider_for_product(product_url, store):
+    """Run the product spider without blocking the calling thread."""
     logger.info(f"Starting spider for comparison product URL: {product_url}")
-    if store.name == "Startech":
-        return runner.crawl(StartechProductSpider, url=product_url)
-    elif store.name == "Potakait":
-        return runner.crawl(PotakaitProductSpider, url=product_url)
-    elif store.name == "UCC":
-        return runner.crawl(UCCProductSpider, url=product_url)
-    elif store.name == "TechLand":
-        return runner.crawl(TechLandProductSpider, url=product_url)
-    elif store.name == "Sumash Tech":
-        return runner.crawl(SumashTechProductSpider, url=product_url)
-    elif store.name == "Rio International":
-        return runner.crawl(RioInternationalProductSpider, url=product_url)
+    return crawl_product(product_url, store)
+
+
+def placeholder_product(search_result):
+    """The Product for a search result, created from the result's own data if new.
+
+    A new placeholder is dated past the product policy's stale window, so
+    until a crawl fills in its details every freshness check treats it as
+    expired and scrapes it rather than serving it.
+    """
+    product, created = Product.objects.get_or_create(
+        url_key=url_key(search_result.url),
+        defaults={
+            'url': search_result.url,
+            'name': search_result.title,
+            'store': search_result.store,
+            'price': search_result.price,
+            'stock': search_result.stock,
+            'rating': search_result.rating or 0,
+            'image_src': "",
+            'description': "",
+            'overview': ""
+        }
+    )
+    if created:
+        PriceObservation.of(product).save()
+        product.last_updated = timezone.now() - PRODUCT_POLICY.stale - timedelta(seconds=1)
+        # auto_now would overwrite it on save()
+        Product.objects.filter(pk=product.pk).update(last_updated=product.last_updated)
+    return product
+
+
+def enrich_in_background(product):
+    """Scrape the full details of a placeholder product without waiting for them.
+
+    The crawl upserts the same Product row (same canonical URL), so the
+    comparison entry picks the details up once it is done.
+    """
+    if in_flight("product", product.url_key):
+        return
+    if SCRAPE_JOBS_ENABLED:
+        ScrapeJob.enqueue_product(product.url, product.store)
     else:
-        raise ValueError(f"Unsupported store: {store.name}")
-
-
-def scrape_product_details(search_result):
-    """Scrape complete product details from the store."""
-    try:
-        full_url = unquote(search_result.url)
-        
-        # Check if we already have a detailed product
-        existing_product = Product.objects.filter(url=full_url).first()
-        if existing_product and existing_product.image_src and existing_product.description:
-            # We already have detailed info, return the existing product
-            return existing_product
-        
-        # Run the spider to get detailed information
-        run_spider_for_product(full_url, search_result.store)
-        
-        # Wait a bit and then try to get the updated product
-        time.sleep(2)  # Give the spider time to complete
-        
-        # Try a few times to get the scraped product
-        for attempt in range(5):
-            product = Product.objects.filter(url=full_url).first()
-            if product and (product.image_src or product.description or product.overview):
-                # We got some detailed info, return it
-                return product
-            time.sleep(1)  # Wait 1 second between attempts
-        
-        # If scraping failed, create or return basic product
-        if not existing_product:
-            product = Product.objects.create(
-                name=search_result.title,
-                store=search_result.store,
-                price=search_result.price,
-                stock=search_result.stock,
-                url=full_url,
-                rating=search_result.rating or 0,
-                image_src="",
-                description="",
-                overview=""
-            )
-        else:
-            product = existing_product
-            
-        return product
-        
-    except Exception as e:
-        logger.error(f"Error scraping product details: {str(e)}")
-        # Return basic product on error
-        full_url = unquote(search_result.url)
-        product, created = Product.objects.get_or_create(
-            url=full_url,
-            defaults={
-                'name': search_result.title,
-                'store': search_result.store,
-                'price': search_result.price,
-                'stock': search_result.stock,
-                'rating': search_result.rating or 0,
-                'image_src': "",
-                'description': "",
-                'overview': ""
-            }
-        )
-        return product
+        start_spider_for_product(product.url, product.store)
 
 
 @require_POST
 def add_to_compare(request):
-    """Add a product to comparison via AJAX with full scraping"""
+    """Add a product to comparison via AJAX, scraping its full details in the background"""
     try:
         data = json.loads(request.body)
         search_result_id = data.get('search_result_id')
@@ -149,33 +90,36 @@ def add_to_compare(request):
         if not search_result_id:
             return JsonResponse({'success': False, 'message': 'Search result ID is required'})
         
-        search_result = get_object_or_404(SearchResult, id=search_result_id)
-        comparison_session = get_or_create_comparison_session(request)
+        compared = ComparisonList(request)
         
         # Check limit before doing any expensive operations
-        current_count = ComparedProduct.objects.filter(comparison_session=comparison_session).count()
-        if current_count >= 4:
+        if compared.is_full:
             return JsonResponse({'success': False, 'message': 'You can only compare up to 4 products'})
         
-        # Scrape complete product details
-        product = scrape_product_details(search_result)
+        search_result = get_object_or_404(SearchResult, id=search_result_id)
+        
+        # Add what the search result knows right away; the full details are
+        # scraped in the background and reported by comparison_status
+        product = placeholder_product(search_result)
         
         # Check if already in comparison
-        if ComparedProduct.objects.filter(comparison_session=comparison_session, product=product).exists():
+        if not compared.add(product.id):
             return JsonResponse({'success': False, 'message': 'Product already in comparison'})
+
+        scraped = product.has_details
+        if not scraped:
+            try:
+                enrich_in_background(product)
+            except Exception as e:
+                logger.error(f"Error scheduling product details scrape: {str(e)}")
         
-        # Add to comparison
-        ComparedProduct.objects.create(comparison_session=comparison_session, product=product)
-        
-        # Get updated count
-        new_count = ComparedProduct.objects.filter(comparison_session=comparison_session).count()
-        
-        return JsonResponse({
+        return compared.save(JsonResponse({
             'success': True, 
             'message': f'{product.name} added to comparison successfully',
-            'count': new_count,
-            'scraped': bool(product.image_src or product.description or product.overview)
-        })
+            'count': len(compared),
+            'product_id': product.id,
+            'scraped': scraped,
+        }))
         
     except Exception as e:
         logger.error(f"Error in add_to_compare: {str(e)}")
@@ -193,29 +137,22 @@ def add_featured_to_compare(request):
             return JsonResponse({'success': False, 'message': 'Product ID is required'})
         
         product = get_object_or_404(Product, id=product_id)
-        comparison_session = get_or_create_comparison_session(request)
+        compared = ComparisonList(request)
         
         # Check limit before adding
-        current_count = ComparedProduct.objects.filter(comparison_session=comparison_session).count()
-        if current_count >= 4:
+        if compared.is_full:
             return JsonResponse({'success': False, 'message': 'You can only compare up to 4 products'})
         
-        # Check if already in comparison
-        if ComparedProduct.objects.filter(comparison_session=comparison_session, product=product).exists():
-            return JsonResponse({'success': False, 'message': 'Product already in comparison'})
-        
         # Add to comparison (no scraping needed since featured products have complete details)
-        ComparedProduct.objects.create(comparison_session=comparison_session, product=product)
-        
-        # Get updated count
-        new_count = ComparedProduct.objects.filter(comparison_session=comparison_session).count()
+        if not compared.add(product.id):
+            return JsonResponse({'success': False, 'message': 'Product already in comparison'})
         
-        return JsonResponse({
+        return compared.save(JsonResponse({
             'success': True, 
             'message': f'{product.name} added to comparison successfully',
-            'count': new_count,
+            'count': len(compared),
             'scraped': True  # Featured products always have complete details
-        })
+        }))
         
     except Exception as e:
         logger.error(f"Error in add_featured_to_compare: {str(e)}")
@@ -233,22 +170,15 @@ def remove_from_compare(request):
             return JsonResponse({'success': False, 'message': 'Product ID is required'})
         
         product = get_object_or_404(Product, id=product_id)
-        comparison_session = get_or_create_comparison_session(request)
+        compared = ComparisonList(request)
         
         # Remove from comparison
-        compared_product = ComparedProduct.objects.filter(
-            comparison_session=comparison_session, 
-            product=product
-        ).first()
-        
-        if compared_product:
-            compared_product.delete()
-            new_count = ComparedProduct.objects.filter(comparison_session=comparison_session).count()
-            return JsonResponse({
+        if compared.remove(product.id):
+            return compared.save(JsonResponse({
                 'success': True, 
                 'message': f'{product.name} removed from comparison',
-                'count': new_count
-            })
+                'count': len(compared)
+            }))
         else:
             return JsonResponse({'success': False, 'message': 'Product not in comparison'})
             
@@ -258,28 +188,48 @@ def remove_from_compare(request):
 
 def comparison_page(request):
     """Display the comparison page with selected products"""
-    comparison_session = get_or_create_comparison_session(request)
-    compared_products = ComparedProduct.objects.filter(
-        comparison_session=comparison_session
-    ).select_related('product', 'product__store').order_by('added_at')
+    compared = ComparisonList(request)
+    products = compared.products()
     
     context = {
-        'compared_products': compared_products,
-        'product_count': compared_products.count(),
+        'products': products,
+        'product_count': len(products),
+        'enriched_count': sum(1 for product in products if product.has_details),
+        'rendered_at': timezone.now().timestamp(),
     }
     
-    return render(request, 'comparison/compare.html', context)
+    return compared.save(render(request, 'comparison/compare.html', context))
+
+
+def comparison_status(request):
+    """Which compared products have their full details yet, for the comparison page to poll."""
+    products = list(Product.objects.filter(id__in=ComparisonList(request).product_ids))
+    waiting = [product.url_key for product in products if not product.has_details]
+    queued = set()
+    if SCRAPE_JOBS_ENABLED and waiting:
+        queued = set(
+            ScrapeJob.objects.filter(
+                kind=ScrapeJob.KIND_PRODUCT,
+                status__in=ScrapeJob.ACTIVE_STATUSES,
+                product_url_key__in=waiting,
+            ).values_list('product_url_key', flat=True)
+        )
+    return JsonResponse({
+        'products': {
+            product.id: {'details': product.has_details, 'updated': product.last_updated.timestamp()}
+            for product in products
+        },
+        'pending': sum(1 for key in waiting if key in queued or in_flight("product", key)),
+    })
 
 
 def get_compare_count(request):
     """Get the current count of products in comparison"""
-    comparison_session = get_or_create_comparison_session(request)
-    count = ComparedProduct.objects.filter(comparison_session=comparison_session).count()
-    return JsonResponse({'count': count})
+    return JsonResponse({'count': len(ComparisonList(request))})
 
 
 def clear_comparison(request):
     """Clear all products from comparison"""
-    comparison_session = get_or_create_comparison_session(request)
-    ComparedProduct.objects.filter(comparison_session=comparison_session).delete()
-    return redirect('comparison:compare')
+    compared = ComparisonList(request)
+    compared.clear()
+    return compared.save(redirect('comparison:compare'))
@@ -0,0 +1,13 @@
+from django.contrib import admin
+from .models import ScrapeJob
+
+
+@admin.register(ScrapeJob)
+class ScrapeJobAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'kind', 'status', 'priority', 'store', 'worker', 'created_at', 'queue_time', 'run_time')
+    list_filter = ('kind', 'status', 'store')
+    search_fields = ('search__query', 'product_url', 'error')
+    readonly_fields = ('created_at', 'started_at', 'finished_at', 'worker', 'error')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('search', 'store')
@@ -0,0 +1,94 @@
+import logging
+import time
+
+from crochet import setup, wait_for
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from scraper.scraper import registry
+from search.models import Search
+
+logger = logging.getLogger(__name__)
+
+
+@wait_for(timeout=600)
+def crawl(spider_cls, cassette_dir, mode, output, spider_kwargs):
+    from scraper.scraper.crawl import crawl_cassette
+
+    return crawl_cassette(spider_cls, cassette_dir, mode, output, **spider_kwargs)
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a spider while recording its responses to a cassette directory, or "
+        "replay one offline to test or benchmark the parser"
+    )
+    # System checks import the URLconf and with it the views, which set up
+    # crochet themselves.
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("mode", choices=["record", "replay"])
+        parser.add_argument("spider", help="Spider name, e.g. startech or startech_product")
+        parser.add_argument(
+            "-a",
+            dest="spider_args",
+            action="append",
+            default=[],
+            metavar="NAME=VALUE",
+            help="Spider argument, e.g. -a url=... or -a search_term=...",
+        )
+        parser.add_argument(
+            "--cassette",
+            default=getattr(settings, "CASSETTE_DIR", None),
+            help="Cassette directory (default: CASSETTE_DIR)",
+        )
+        parser.add_argument(
+            "--output",
+            help="Write the scraped items to this JSON lines file",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=1,
+            help="Replay this many times and report the timings",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            spider_cls = registry.spider_class(options["spider"])
+        except ValueError as e:
+            raise CommandError(e)
+        if not options["cassette"]:
+            raise CommandError("No cassette directory; pass --cassette or set CASSETTE_DIR")
+        spider_kwargs = {}
+        for arg in options["spider_args"]:
+            name, sep, value = arg.partition("=")
+            if not sep:
+                raise CommandError(f"Spider arguments look like NAME=VALUE, not {arg!r}")
+            spider_kwargs[name] = value
+        if "search_term" in spider_kwargs:
+            # Search spiders tag items with a search; it is never saved here
+            spider_kwargs.setdefault("search_obj", Search(query=spider_kwargs["search_term"]))
+
+        mode = options["mode"]
+        runs = options["repeat"] if mode == "replay" else 1
+        setup()
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            crawler = crawl(spider_cls, options["cassette"], mode, options["output"], spider_kwargs)
+            timings.append((time.perf_counter() - started) * 1000)
+
+        stats = crawler.stats.get_stats()
+        self.stdout.write(
+            f"{spider_cls.name}: {stats.get('item_scraped_count', 0)} items from "
+            f"{stats.get('response_received_count', 0)} responses "
+            f"(cassette {mode}: {stats.get('cassette/hits', 0)} hits, "
+            f"{stats.get('cassette/misses', 0)} misses, {stats.get('cassette/recorded', 0)} recorded)"
+        )
+        timings.sort()
+        self.stdout.write(
+            f"{len(timings)} run(s): median {timings[len(timings) // 2]:.1f}ms, "
+            f"min {timings[0]:.1f}ms, max {timings[-1]:.1f}ms"
+        )
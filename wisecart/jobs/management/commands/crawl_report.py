@@ -0,0 +1,41 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Sum
+from django.utils import timezone
+
+from shops.models import ShopCrawlStats
+
+
+class Command(BaseCommand):
+    help = "Per-store download throughput and error rates, for tuning Shop download profiles"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=7,
+            help="Report on crawls from the last N days",
+        )
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(days=options["days"])
+        rows = (
+            ShopCrawlStats.objects.filter(bucket__gte=since)
+            .values("shop__name", "kind")
+            .annotate(**{name: Sum(name) for name in ShopCrawlStats.COUNTERS})
+            .order_by("shop__name", "kind")
+        )
+
+        self.stdout.write(
+            f"{'Store':<20} {'Kind':<8} {'Crawls':>7} {'Requests':>9} {'Resp/s':>7} "
+            f"{'Err %':>7} {'Timeouts':>9} {'Retries':>8} {'MB':>8} {'304s':>6} {'Saved MB':>9}"
+        )
+        for row in rows:
+            throughput = row["responses"] / row["seconds"] if row["seconds"] else 0
+            error_rate = row["errors"] / row["requests"] if row["requests"] else 0
+            self.stdout.write(
+                f"{row['shop__name']:<20} {row['kind']:<8} {row['crawls']:>7} {row['requests']:>9} "
+                f"{throughput:>7.2f} {error_rate:>7.1%} {row['timeouts']:>9} {row['retries']:>8} "
+                f"{row['bytes'] / 1e6:>8.1f} {row['not_modified']:>6} {row['bytes_saved'] / 1e6:>9.1f}"
+            )
@@ -0,0 +1,129 @@
+import logging
+import multiprocessing
+import os
+import socket
+import time
+
+from crochet import setup, run_in_reactor, wait_for, TimeoutError
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from jobs.models import ScrapeJob
+
+logger = logging.getLogger(__name__)
+
+
+@run_in_reactor
+def crawl(job):
+    # Imported here so Scrapy/Twisted are only loaded after the fork
+    from scraper.scraper.crawl import crawl_search, crawl_product
+
+    if job.kind == ScrapeJob.KIND_SEARCH:
+        return crawl_search(job.search, job.search.query)
+    return crawl_product(job.product_url, job.store)
+
+
+@wait_for(timeout=30)
+def start_runtime():
+    # Build the shared crawler runtime once, before the first job arrives
+    from scraper.scraper.crawl import get_runner
+
+    get_runner()
+
+
+def run_job(job, timeout):
+    started = time.monotonic()
+    result = crawl(job)
+    try:
+        result.wait(timeout)
+    except TimeoutError:
+        # Stop the spiders instead of leaving them running under a failed job
+        result.cancel()
+        logger.error(f"Scrape job {job.id} timed out after {timeout}s, crawl stopped")
+        job.finish(error=f"Timed out after {timeout}s")
+        return
+    except Exception as e:
+        logger.error(f"Scrape job {job.id} failed: {e!r}")
+        job.finish(error=repr(e))
+        return
+    job.finish()
+    logger.info(f"Scrape job {job.id} done in {time.monotonic() - started:.2f}s")
+
+
+def work_loop(poll_interval, job_timeout):
+    """Claim and run jobs forever; runs inside each worker process."""
+    setup()
+    start_runtime()
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    logger.info(f"Scrape worker {worker} started")
+    while True:
+        job = ScrapeJob.claim(worker)
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+        run_job(job, job_timeout)
+
+
+class Command(BaseCommand):
+    help = "Run a pool of worker processes that execute queued scrape jobs"
+    # System checks import the URLconf and with it the views, which start
+    # crochet's reactor thread; that must not happen before forking.
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=getattr(settings, "SCRAPE_WORKER_PROCESSES", 2),
+            help="Number of worker processes",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1.0,
+            help="Seconds to sleep when the queue is empty",
+        )
+        parser.add_argument(
+            "--job-timeout",
+            type=float,
+            default=getattr(settings, "SCRAPE_JOB_TIMEOUT", 60),
+            help="Seconds before a running crawl is marked as failed",
+        )
+
+    def handle(self, *args, **options):
+        # Children must open their own database connections
+        connections.close_all()
+
+        processes = [
+            multiprocessing.Process(
+                target=work_loop,
+                args=(options["poll_interval"], options["job_timeout"]),
+                name=f"scrape-worker-{i}",
+                daemon=True,
+            )
+            for i in range(options["processes"])
+        ]
+        for process in processes:
+            process.start()
+        self.stdout.write(f"Started {len(processes)} scrape worker processes")
+
+        try:
+            while True:
+                for i, process in enumerate(processes):
+                    if not process.is_alive():
+                        logger.warning(f"{process.name} exited with {process.exitcode}, restarting")
+                        processes[i] = multiprocessing.Process(
+                            target=work_loop,
+                            args=(options["poll_interval"], options["job_timeout"]),
+                            name=process.name,
+                            daemon=True,
+                        )
+                        processes[i].start()
+                time.sleep(1)
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping scrape workers")
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.join()
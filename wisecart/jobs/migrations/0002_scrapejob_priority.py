@@ -0,0 +1,24 @@
+# Generated by Django 5.1.3 on 2026-10-18 15:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0001_initial'),
+        ('search', '0005_trendingsearch'),
+        ('shops', '0005_shop_compression_shop_download_timeout_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scrapejob',
+            name='priority',
+            field=models.SmallIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='scrapejob',
+            index=models.Index(fields=['status', '-priority', 'created_at'], name='jobs_scrape_status_6c41bb_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-18 15:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0002_scrapejob_priority'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scrapejob',
+            name='product_url_key',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.3 on 2026-10-18 15:46
+
+import hashlib
+
+from django.db import migrations
+from w3lib.url import canonicalize_url
+
+
+# Copy of products.models.url_key as of this migration
+def url_key(url):
+    return hashlib.sha256(canonicalize_url(url).encode()).hexdigest()
+
+
+def backfill_product_url_keys(apps, schema_editor):
+    """Key the product jobs still queued or running, so new ones dedupe against them."""
+    ScrapeJob = apps.get_model("jobs", "ScrapeJob")
+    jobs = list(
+        ScrapeJob.objects.filter(kind="product", status__in=["pending", "running"]).only("id", "product_url")
+    )
+    for job in jobs:
+        job.product_url_key = url_key(job.product_url)
+    ScrapeJob.objects.bulk_update(jobs, ["product_url_key"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0003_scrapejob_product_url_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_product_url_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-18 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0004_backfill_scrapejob_product_url_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scrapejob',
+            name='normalized_query',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.3 on 2026-10-18 16:06
+
+from django.db import migrations
+from django.utils import timezone
+
+
+# Copy of search.models.Search.normalize_query as of this migration
+def normalize_query(query):
+    return " ".join(sorted(query.casefold().split()))
+
+
+def dedupe_active_jobs(apps, schema_editor):
+    """Key the search jobs still queued or running and fail all but one per key.
+
+    The unique constraints added next allow a single active job per page and
+    per query; the oldest one is kept, so its waiters are not disturbed.
+    """
+    ScrapeJob = apps.get_model("jobs", "ScrapeJob")
+    active = ScrapeJob.objects.filter(status__in=["pending", "running"])
+    searches = list(active.filter(kind="search").select_related("search"))
+    for job in searches:
+        job.normalized_query = normalize_query(job.search.query) if job.search_id else ""
+    ScrapeJob.objects.bulk_update(searches, ["normalized_query"], batch_size=500)
+
+    seen = set()
+    duplicates = []
+    for job in active.order_by("created_at", "id"):
+        key = (job.kind, job.product_url_key if job.kind == "product" else job.normalized_query)
+        if key in seen:
+            duplicates.append(job.id)
+        seen.add(key)
+    ScrapeJob.objects.filter(id__in=duplicates).update(
+        status="failed", error="Duplicate of an earlier active job", finished_at=timezone.now()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0005_scrapejob_normalized_query'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_active_jobs, migrations.RunPython.noop),
+    ]
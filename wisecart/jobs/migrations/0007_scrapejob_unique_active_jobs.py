@@ -0,0 +1,21 @@
+# Generated by Django 5.1.3 on 2026-10-18 16:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0006_dedupe_active_scrapejobs'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='scrapejob',
+            constraint=models.UniqueConstraint(condition=models.Q(('kind', 'product'), ('status__in', ('pending', 'running'))), fields=('product_url_key',), name='unique_active_product_job'),
+        ),
+        migrations.AddConstraint(
+            model_name='scrapejob',
+            constraint=models.UniqueConstraint(condition=models.Q(('kind', 'search'), ('status__in', ('pending', 'running'))), fields=('normalized_query',), name='unique_active_search_job'),
+        ),
+    ]
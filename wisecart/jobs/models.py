@@ -0,0 +1,190 @@
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models, transaction
+from django.utils import timezone
+from products.models import url_key
+from search.models import Search
+from shops.models import Shop
+
+logger = logging.getLogger(__name__)
+
+SCRAPE_JOB_LEASE = getattr(settings, "SCRAPE_JOB_LEASE", 180)
+
+
+class ScrapeJob(models.Model):
+    """A search or product crawl queued for the scrape_worker pool"""
+    KIND_SEARCH = 'search'
+    KIND_PRODUCT = 'product'
+    KIND_CHOICES = [
+        (KIND_SEARCH, 'Search'),
+        (KIND_PRODUCT, 'Product'),
+    ]
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    ACTIVE_STATUSES = (STATUS_PENDING, STATUS_RUNNING)
+
+    # Workers take higher priorities first; prefetches only run when nobody
+    # is waiting on a page
+    PRIORITY_PREFETCH = -10
+    PRIORITY_DEFAULT = 0
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    search = models.ForeignKey(Search, on_delete=models.CASCADE, null=True, blank=True)
+    product_url = models.CharField(max_length=500, blank=True)
+    # url_key(product_url); product jobs are deduplicated on it
+    product_url_key = models.CharField(max_length=64, blank=True, db_index=True)
+    # Search.normalize_query(search.query); search jobs are deduplicated on
+    # it, so users searching the same thing share one crawl
+    normalized_query = models.CharField(max_length=255, blank=True)
+    store = models.ForeignKey(Shop, on_delete=models.CASCADE, null=True, blank=True)
+    priority = models.SmallIntegerField(default=PRIORITY_DEFAULT)
+    worker = models.CharField(max_length=100, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['status', '-priority', 'created_at']),
+        ]
+        # At most one queued or running job per page and per query, even
+        # when two requests enqueue the same crawl at once
+        constraints = [
+            models.UniqueConstraint(
+                fields=['product_url_key'],
+                condition=models.Q(kind='product', status__in=('pending', 'running')),
+                name='unique_active_product_job',
+            ),
+            models.UniqueConstraint(
+                fields=['normalized_query'],
+                condition=models.Q(kind='search', status__in=('pending', 'running')),
+                name='unique_active_search_job',
+            ),
+        ]
+
+    def __str__(self):
+        target = self.search.query if self.search_id else self.product_url
+        return f"{self.get_kind_display()} job: {target} ({self.status})"
+
+    @property
+    def queue_time(self):
+        if self.started_at:
+            return self.started_at - self.created_at
+        return None
+
+    @property
+    def run_time(self):
+        if self.started_at and self.finished_at:
+            return self.finished_at - self.started_at
+        return None
+
+    @classmethod
+    def active(cls):
+        return cls.objects.filter(status__in=cls.ACTIVE_STATUSES)
+
+    @classmethod
+    def enqueue_search(cls, search_obj):
+        """Queue a search crawl, reusing a job already waiting for this query.
+
+        The job may belong to another user's Search; its results are shared
+        through SearchCache.
+        """
+        job, _ = cls.active().get_or_create(
+            kind=cls.KIND_SEARCH,
+            normalized_query=Search.normalize_query(search_obj.query),
+            defaults={'search': search_obj},
+        )
+        return job
+
+    @classmethod
+    def enqueue_product(cls, product_url, store, priority=PRIORITY_DEFAULT):
+        """Queue a product crawl, reusing a job already waiting for this URL.
+
+        A waiting job is raised to ``priority`` if that is higher, so a page
+        someone opens does not queue behind its own prefetch.
+        """
+        job, created = cls.active().get_or_create(
+            kind=cls.KIND_PRODUCT,
+            product_url_key=url_key(product_url),
+            defaults={'product_url': product_url, 'store': store, 'priority': priority},
+        )
+        if not created and job.priority < priority:
+            job.priority = priority
+            job.save(update_fields=['priority'])
+        return job
+
+    @classmethod
+    def reap_expired(cls):
+        """Fail running jobs whose lease has run out and return how many.
+
+        Workers stop a crawl after their job timeout, so a job still running
+        SCRAPE_JOB_LEASE seconds after it was claimed belongs to a worker
+        that died; left alone, every enqueue for it would keep returning it.
+        """
+        now = timezone.now()
+        reaped = cls.objects.filter(
+            status=cls.STATUS_RUNNING,
+            started_at__lt=now - timedelta(seconds=SCRAPE_JOB_LEASE),
+        ).update(status=cls.STATUS_FAILED, error='Lease expired, worker lost', finished_at=now)
+        if reaped:
+            logger.warning(f"Failed {reaped} scrape jobs whose worker was lost")
+        return reaped
+
+    @classmethod
+    def claim(cls, worker):
+        """Atomically take the most urgent, then oldest, pending job, or return None.
+
+        Expired running jobs are reaped first, so the next enqueue for the
+        same search or page starts a new job.
+        """
+        cls.reap_expired()
+        with transaction.atomic():
+            job = (
+                cls.objects.select_for_update(skip_locked=True)
+                .filter(status=cls.STATUS_PENDING)
+                .order_by('-priority', 'created_at')
+                .first()
+            )
+            if job is None:
+                return None
+            job.status = cls.STATUS_RUNNING
+            job.worker = worker
+            job.started_at = timezone.now()
+            job.save(update_fields=['status', 'worker', 'started_at'])
+        return job
+
+    def finish(self, error=None):
+        self.status = self.STATUS_FAILED if error else self.STATUS_DONE
+        self.error = error or ''
+        self.finished_at = timezone.now()
+        self.save(update_fields=['status', 'error', 'finished_at'])
+
+    def wait(self, timeout, interval=0.25):
+        """Poll until the job has finished or ``timeout`` seconds passed.
+
+        Returns True if the job finished (successfully or not) in time.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            self.refresh_from_db(fields=['status', 'error', 'started_at', 'finished_at'])
+            if self.status not in self.ACTIVE_STATUSES:
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(interval)
@@ -0,0 +1,168 @@
+import base64
+import gzip
+import json
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.test import TestCase
+from django.utils import timezone
+from scrapy.http import Request
+from scrapy.utils.request import fingerprint
+
+from jobs.models import SCRAPE_JOB_LEASE, ScrapeJob
+from scraper.scraper.shop_cache import get_shop
+from search.models import Search
+from shops.models import Shop
+
+PRODUCT_URL = "https://www.startech.com.bd/logitech-g102-mouse"
+PRODUCT_PAGE = """<html><body>
+<div class="product-short-info">
+  <h1 class="product-name"> Logitech G102 Gaming Mouse </h1>
+  <table>
+    <tr><td class="product-price"><del>2,000৳</del><ins>1,850৳</ins></td></tr>
+    <tr><td class="product-status">In Stock</td></tr>
+  </table>
+</div>
+<img class="main-img" src="https://www.startech.com.bd/image/g102.jpg">
+<div id="product"><div><div class="short-description"><ul>
+  <li>8000 DPI</li><li>RGB lighting</li>
+</ul></div></div></div>
+<div id="description"><div class="full-description"><p>A light gaming mouse.</p></div></div>
+</body></html>"""
+
+
+class CassetteReplayTests(TestCase):
+    """``manage.py cassette replay`` runs a spider offline against recorded responses."""
+
+    def setUp(self):
+        Shop.objects.create(
+            name="Startech", mod_comment="", description="", all_domains="", address=""
+        )
+        # The spider parses on the reactor thread, which cannot see this
+        # test's transaction; load the shop cache it reads from here instead
+        get_shop("Startech")
+        self.cassette = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.cassette)
+
+    def record(self, url, body):
+        entry = {
+            "url": url,
+            "method": "GET",
+            "status": 200,
+            "headers": {"Content-Type": ["text/html; charset=utf-8"]},
+            "body": base64.b64encode(body.encode()).decode(),
+        }
+        path = self.cassette / f"{fingerprint(Request(url)).hex()}.json.gz"
+        path.write_bytes(gzip.compress(json.dumps(entry).encode()))
+
+    def replay(self, url):
+        output = self.cassette / "items.jl"
+        stdout = StringIO()
+        call_command(
+            "cassette",
+            "replay",
+            "startech_product",
+            "-a",
+            f"url={url}",
+            "--cassette",
+            str(self.cassette),
+            "--output",
+            str(output),
+            stdout=stdout,
+        )
+        lines = output.read_text().splitlines() if output.exists() else []
+        return [json.loads(line) for line in lines], stdout.getvalue()
+
+    def test_replays_a_recorded_product_page(self):
+        self.record(PRODUCT_URL, PRODUCT_PAGE)
+        items, report = self.replay(PRODUCT_URL)
+
+        self.assertIn("1 hits, 0 misses", report)
+        self.assertEqual(len(items), 1)
+        item = items[0]
+        self.assertEqual(item["name"], "Logitech G102 Gaming Mouse")
+        self.assertEqual(item["price"], 1850)
+        self.assertIs(item["stock"], True)
+        self.assertEqual(item["image_src"], "https://www.startech.com.bd/image/g102.jpg")
+        self.assertEqual(item["overview"], "8000 DPI\nRGB lighting")
+        self.assertEqual(item["url"], PRODUCT_URL)
+
+    def test_pages_missing_from_the_cassette_are_not_downloaded(self):
+        self.record(PRODUCT_URL, PRODUCT_PAGE)
+        items, report = self.replay("https://www.startech.com.bd/not-recorded")
+
+        self.assertIn("0 hits, 1 misses", report)
+        self.assertEqual(items, [])
+
+
+class ScrapeJobQueueTests(TestCase):
+    def setUp(self):
+        self.shop = Shop.objects.create(
+            name="Startech", mod_comment="", description="", all_domains="", address=""
+        )
+
+    def test_same_query_from_different_searches_shares_a_job(self):
+        first = ScrapeJob.enqueue_search(Search.objects.create(query="Gaming  Mouse"))
+        second = ScrapeJob.enqueue_search(Search.objects.create(query="mouse gaming"))
+
+        self.assertEqual(first, second)
+        self.assertEqual(first.normalized_query, "gaming mouse")
+
+    def test_same_page_under_another_encoding_shares_a_job(self):
+        first = ScrapeJob.enqueue_product(PRODUCT_URL + "?b=2&a=1", self.shop)
+        second = ScrapeJob.enqueue_product(PRODUCT_URL + "?a=1&b=2", self.shop)
+        self.assertEqual(first, second)
+
+    def test_waiting_job_is_raised_to_the_higher_priority(self):
+        job = ScrapeJob.enqueue_product(PRODUCT_URL, self.shop, priority=ScrapeJob.PRIORITY_PREFETCH)
+        ScrapeJob.enqueue_product(PRODUCT_URL, self.shop)
+
+        job.refresh_from_db()
+        self.assertEqual(job.priority, ScrapeJob.PRIORITY_DEFAULT)
+
+    def test_finished_jobs_are_not_reused(self):
+        job = ScrapeJob.enqueue_product(PRODUCT_URL, self.shop)
+        job.finish()
+        self.assertNotEqual(ScrapeJob.enqueue_product(PRODUCT_URL, self.shop), job)
+
+    def test_database_rejects_a_second_active_job(self):
+        job = ScrapeJob.enqueue_product(PRODUCT_URL, self.shop)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ScrapeJob.objects.create(
+                kind=ScrapeJob.KIND_PRODUCT,
+                product_url=job.product_url,
+                product_url_key=job.product_url_key,
+            )
+
+    def test_claim_takes_the_most_urgent_then_oldest_job(self):
+        prefetch = ScrapeJob.enqueue_product(PRODUCT_URL, self.shop, priority=ScrapeJob.PRIORITY_PREFETCH)
+        older = ScrapeJob.enqueue_product(PRODUCT_URL + "-2", self.shop)
+        ScrapeJob.enqueue_product(PRODUCT_URL + "-3", self.shop)
+
+        claimed = [ScrapeJob.claim("w1") for _ in range(3)]
+        self.assertEqual(claimed[0], older)
+        self.assertEqual(claimed[2], prefetch)
+        self.assertEqual(claimed[0].status, ScrapeJob.STATUS_RUNNING)
+        self.assertEqual(claimed[0].worker, "w1")
+        self.assertIsNone(ScrapeJob.claim("w1"))
+
+    def test_jobs_past_their_lease_are_reaped(self):
+        lost = ScrapeJob.enqueue_product(PRODUCT_URL, self.shop)
+        running = ScrapeJob.enqueue_product(PRODUCT_URL + "-2", self.shop)
+        now = timezone.now()
+        ScrapeJob.objects.filter(pk=lost.pk).update(
+            status=ScrapeJob.STATUS_RUNNING,
+            started_at=now - timedelta(seconds=SCRAPE_JOB_LEASE + 1),
+        )
+        ScrapeJob.objects.filter(pk=running.pk).update(status=ScrapeJob.STATUS_RUNNING, started_at=now)
+
+        self.assertEqual(ScrapeJob.reap_expired(), 1)
+        lost.refresh_from_db()
+        self.assertEqual(lost.status, ScrapeJob.STATUS_FAILED)
+        self.assertNotEqual(ScrapeJob.enqueue_product(PRODUCT_URL, self.shop), lost)
+        self.assertEqual(ScrapeJob.enqueue_product(PRODUCT_URL + "-2", self.shop), running)
@@ -1,12 +1,21 @@
 from django.contrib import admin
-from .models import Product, FeaturedProduct, Bookmark
+from .models import Product, PriceObservation, FeaturedProduct, Bookmark
 from django.utils import timezone
 
+class PriceObservationInline(admin.TabularInline):
+    model = PriceObservation
+    fields = ('observed_at', 'price', 'stock')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+    max_num = 0
+
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
     list_display = ('name', 'store', 'price', 'stock', 'rating', 'is_available')
     search_fields = ('name', 'store__name')
     ordering = ('-last_updated',)
+    inlines = [PriceObservationInline]
 
     def is_available(self, obj):
         return obj.stock is not None and obj.stock > 0
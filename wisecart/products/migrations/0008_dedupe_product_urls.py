@@ -0,0 +1,44 @@
+# Generated by Django 5.1.3 on 2026-10-18 15:08
+
+from django.db import IntegrityError, migrations, transaction
+from django.db.models import Count
+
+
+def dedupe_product_urls(apps, schema_editor):
+    """Keep the most recently updated product per URL and repoint references to it."""
+    Product = apps.get_model("products", "Product")
+    relations = [
+        rel for rel in Product._meta.related_objects if rel.one_to_many or rel.one_to_one
+    ]
+
+    duplicated = (
+        Product.objects.values("url").annotate(rows=Count("id")).filter(rows__gt=1)
+    )
+    for row in duplicated:
+        keep, *drop = Product.objects.filter(url=row["url"]).order_by("-last_updated", "-id")
+        drop_ids = [product.id for product in drop]
+        for rel in relations:
+            field = rel.field.name
+            for obj in rel.related_model.objects.filter(**{f"{field}_id__in": drop_ids}):
+                try:
+                    with transaction.atomic():
+                        rel.related_model.objects.filter(pk=obj.pk).update(**{field: keep})
+                except IntegrityError:
+                    # The kept product already has an equivalent row (e.g. a bookmark)
+                    obj.delete()
+        Product.objects.filter(id__in=drop_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_product_search_indexes'),
+        ('comparison', '0001_initial'),
+    ]
+
+    operations = [
+        # The unique constraint is added by the next migration: these deletes
+        # leave deferred FK trigger events that Postgres only clears at commit,
+        # and it refuses to ALTER the table while they are pending
+        migrations.RunPython(dedupe_product_urls, migrations.RunPython.noop),
+    ]
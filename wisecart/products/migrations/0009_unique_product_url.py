@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-18 15:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_dedupe_product_urls'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='product',
+            name='url',
+            field=models.CharField(max_length=500, unique=True),
+        ),
+    ]
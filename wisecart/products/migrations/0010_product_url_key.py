@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-18 15:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0009_unique_product_url'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='url_key',
+            field=models.CharField(editable=False, max_length=64, null=True),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.1.3 on 2026-10-18 15:12
+
+import hashlib
+from collections import defaultdict
+from urllib.parse import urlsplit, urlunsplit
+
+from django.db import IntegrityError, migrations, transaction
+from w3lib.url import canonicalize_url, safe_url_string
+
+
+# Copies of products.models.canonical_url and url_key as of this migration,
+# so later changes to those do not change what it does
+def canonical_url(url):
+    parts = urlsplit(safe_url_string(url.strip()))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, parts.query, ""))
+
+
+def url_key(url):
+    return hashlib.sha256(canonicalize_url(url).encode()).hexdigest()
+
+
+def backfill_url_keys(apps, schema_editor):
+    """Canonicalize stored URLs, fill url_key and merge rows that now collide.
+
+    The most recently updated product per key is kept; references to the
+    others are repointed to it.
+    """
+    Product = apps.get_model("products", "Product")
+    relations = [
+        rel for rel in Product._meta.related_objects if rel.one_to_many or rel.one_to_one
+    ]
+
+    by_key = defaultdict(list)
+    for product in Product.objects.order_by("-last_updated", "-id").only("id", "url"):
+        by_key[url_key(product.url)].append(product)
+
+    for key, (keep, *drop) in by_key.items():
+        drop_ids = [product.id for product in drop]
+        if drop_ids:
+            for rel in relations:
+                field = rel.field.name
+                for obj in rel.related_model.objects.filter(**{f"{field}_id__in": drop_ids}):
+                    try:
+                        with transaction.atomic():
+                            rel.related_model.objects.filter(pk=obj.pk).update(**{field: keep})
+                    except IntegrityError:
+                        # The kept product already has an equivalent row (e.g. a bookmark)
+                        obj.delete()
+            Product.objects.filter(id__in=drop_ids).delete()
+        Product.objects.filter(pk=keep.pk).update(url=canonical_url(keep.url), url_key=key)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0010_product_url_key'),
+        ('comparison', '0001_initial'),
+    ]
+
+    operations = [
+        # The unique index is added by the next migration: these deletes leave
+        # deferred FK trigger events that Postgres only clears at commit, and
+        # it refuses to ALTER the table while they are pending
+        migrations.RunPython(backfill_url_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.3 on 2026-10-18 15:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0011_backfill_product_url_keys'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='product',
+            name='url_key',
+            field=models.CharField(editable=False, max_length=64, unique=True),
+        ),
+        # url_key carries the uniqueness now; drop the wide index on url
+        migrations.AlterField(
+            model_name='product',
+            name='url',
+            field=models.CharField(max_length=500),
+        ),
+    ]
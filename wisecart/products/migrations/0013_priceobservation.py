@@ -0,0 +1,47 @@
+# Generated by Django 5.1.3 on 2026-10-18 15:29
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def seed_history(apps, schema_editor):
+    """Start every product's history with its current price."""
+    Product = apps.get_model("products", "Product")
+    PriceObservation = apps.get_model("products", "PriceObservation")
+    batch = []
+    for pk, price, stock, last_updated in Product.objects.values_list(
+        "pk", "price", "stock", "last_updated"
+    ).iterator(chunk_size=2000):
+        batch.append(
+            PriceObservation(product_id=pk, price=price, stock=stock, observed_at=last_updated)
+        )
+        if len(batch) >= 2000:
+            PriceObservation.objects.bulk_create(batch)
+            batch = []
+    PriceObservation.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0012_product_url_key_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceObservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('stock', models.BooleanField(blank=True, null=True)),
+                ('observed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_history', to='products.product')),
+            ],
+            options={
+                'ordering': ['-observed_at'],
+                'indexes': [models.Index(fields=['product', 'observed_at'], name='products_pr_product_9b007e_idx')],
+            },
+        ),
+        migrations.RunPython(seed_history, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,43 @@
+import hashlib
+from urllib.parse import urlsplit, urlunsplit
+
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
 from django.db import models
+from django.utils import timezone
 from shops.models import Shop
 from django.conf import settings
+from w3lib.url import canonicalize_url, safe_url_string
+
+# Catalog lookups filter on this exact expression so they can use the index
+SEARCH_VECTOR = SearchVector("name", "overview", config="english")
+
+
+def canonical_url(url):
+    """The form of a product URL that is stored and crawled.
+
+    Characters that are not allowed in a URL are percent-encoded, the scheme
+    and host are lower-cased and the fragment is dropped. Existing escapes
+    are left alone, so the URL still points at the same page.
+    """
+    parts = urlsplit(safe_url_string(url.strip()))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, parts.query, ""))
+
+
+def url_key(url):
+    """Fixed-width lookup key for a product URL.
+
+    Hashes w3lib's ``canonicalize_url``, as Scrapy's request fingerprints and
+    RevalidationMiddleware do, so every encoding and query order of a page
+    shares a key while ``%26``, ``%2F`` or ``+`` keep pages apart.
+    """
+    return hashlib.sha256(canonicalize_url(url).encode()).hexdigest()
+
+
+class ProductQuerySet(models.QuerySet):
+    def for_url(self, url):
+        """Products stored under any encoding of ``url``."""
+        return self.filter(url_key=url_key(url))
 
 
 class Product(models.Model):
@@ -9,15 +46,62 @@ class Product(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     stock = models.BooleanField(default=True, null=True, blank=True)
     url = models.CharField(max_length=500)
+    url_key = models.CharField(max_length=64, unique=True, editable=False)
     rating = models.FloatField(null=True, blank=True)
     image_src = models.URLField(max_length=200, null=True, blank=True)
     description = models.TextField(null=True, blank=True)
     overview = models.TextField(null=True, blank=True)
     last_updated = models.DateTimeField(auto_now=True)
 
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            GinIndex(SEARCH_VECTOR, name="product_search_vector_idx"),
+            GinIndex(
+                fields=["name"], opclasses=["gin_trgm_ops"], name="product_name_trgm_idx"
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
+    @property
+    def has_details(self):
+        """False for products only known from a search result so far."""
+        return bool(self.image_src or self.description or self.overview)
+
+    def save(self, *args, **kwargs):
+        self.url = canonical_url(self.url)
+        self.url_key = url_key(self.url)
+        super().save(*args, **kwargs)
+
+
+class PriceObservation(models.Model):
+    """A product's price and stock as scraped, recorded only when they changed"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="price_history")
+    price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    stock = models.BooleanField(null=True, blank=True)
+    observed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["-observed_at"]
+        indexes = [
+            models.Index(fields=["product", "observed_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}: {self.price} at {self.observed_at:%Y-%m-%d %H:%M}"
+
+    @classmethod
+    def of(cls, product, observed_at=None):
+        return cls(
+            product_id=product.pk,
+            price=product.price,
+            stock=product.stock,
+            observed_at=observed_at or timezone.now(),
+        )
+
 
 class FeaturedProduct(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
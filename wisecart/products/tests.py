@@ -1,3 +1,58 @@
-from django.test import TestCase
+from django.test import SimpleTestCase
 
-# Create your tests here.
+from .models import canonical_url, url_key
+
+
+class CanonicalUrlTests(SimpleTestCase):
+    def test_escapes_characters_not_allowed_in_urls(self):
+        self.assertEqual(canonical_url(" https://s.com/a b?q=x y "), "https://s.com/a%20b?q=x%20y")
+        self.assertEqual(canonical_url("https://s.com/\u0995"), "https://s.com/%E0%A6%95")
+
+    def test_lowercases_scheme_and_host_and_drops_fragment(self):
+        self.assertEqual(
+            canonical_url("HTTPS://WWW.S.COM/Path?b=2&a=1#reviews"), "https://www.s.com/Path?b=2&a=1"
+        )
+
+    def test_leaves_escapes_and_reserved_characters_alone(self):
+        for url in [
+            "https://s.com/p?q=a%26b=c",
+            "https://s.com/a%2Fb",
+            "https://s.com/x?q=a+b",
+            "https://s.com/x?q=a%2Bb",
+            "https://www.startech.com.bd/index.php?route=product/product&product_id=12",
+        ]:
+            with self.subTest(url=url):
+                self.assertEqual(canonical_url(url), url)
+
+    def test_is_idempotent(self):
+        url = canonical_url("HTTPS://S.com/a b/\u0995?q=x y#top")
+        self.assertEqual(canonical_url(url), url)
+
+
+class UrlKeyTests(SimpleTestCase):
+    def test_encodings_of_one_page_share_a_key(self):
+        key = url_key("https://s.com/a b?x=1&y=2")
+        for url in [
+            "https://s.com/a%20b?x=1&y=2",
+            "HTTPS://S.COM/a%20b?y=2&x=1",
+            "https://s.com/a b?x=1&y=2#specs",
+        ]:
+            with self.subTest(url=url):
+                self.assertEqual(url_key(url), key)
+
+    def test_distinct_pages_keep_distinct_keys(self):
+        for first, second in [
+            ("https://s.com/p?q=a%26b=c", "https://s.com/p?q=a&b=c"),
+            ("https://s.com/a%2Fb", "https://s.com/a/b"),
+            ("https://s.com/x?q=a+b", "https://s.com/x?q=a%2Bb"),
+        ]:
+            with self.subTest(first=first, second=second):
+                self.assertNotEqual(url_key(first), url_key(second))
+
+    def test_stored_url_has_the_same_key(self):
+        for url in ["https://s.com/a b?y=2&x=1#specs", "https://s.com/p?q=a%26b=c"]:
+            with self.subTest(url=url):
+                self.assertEqual(url_key(canonical_url(url)), url_key(url))
+
+    def test_is_fixed_width(self):
+        self.assertEqual(len(url_key("https://s.com/" + "x" * 600)), 64)
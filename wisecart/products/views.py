@@ -1,18 +1,12 @@
-from crochet import setup, wait_for
-from scrapy.crawler import CrawlerRunner
-from scrapy.utils.project import get_project_settings
+from crochet import setup, wait_for, run_in_reactor
 from django.shortcuts import render, Http404, redirect, get_object_or_404
-from django.utils import timezone
-from datetime import timedelta
-from .models import Product, Bookmark
+from django.conf import settings
+from .models import Product, Bookmark, url_key
 from shops.models import Shop
-from scraper.scraper.spiders.startech import StartechProductSpider
-from scraper.scraper.spiders.potakait import PotakaitProductSpider
-from scraper.scraper.spiders.ucc import UCCProductSpider
-from scraper.scraper.spiders.techland import TechLandProductSpider
-from scraper.scraper.spiders.sumashtech import SumashTechProductSpider
-from scraper.scraper.spiders.riointernational import RioInternationalProductSpider
-import time
+from jobs.models import ScrapeJob
+from wisecart.freshness import get_policy, FRESH, STALE
+from scraper.scraper.crawl import crawl_product
+from wisecart.singleflight import in_flight
 import logging
 from urllib.parse import unquote, quote
 from django.contrib.auth.decorators import login_required
@@ -23,47 +17,60 @@ from django.core.paginator import Paginator
 logger = logging.getLogger(__name__)
 setup()  # Setup Crochet
 
-PRODUCT_CACHE_HOURS = 24
-MAX_RETRIES = 5
-RETRY_DELAY = 0.5  # seconds
+PRODUCT_POLICY = get_policy("product")
 SPIDER_TIMEOUT = 30  # seconds
+SCRAPE_JOBS_ENABLED = getattr(settings, "SCRAPE_JOBS_ENABLED", False)
+SCRAPE_JOB_WAIT_SECONDS = getattr(settings, "SCRAPE_JOB_WAIT_SECONDS", 5)
 
 
-@wait_for(timeout=30)
+class ScrapePending(Exception):
+    """A queued product scrape did not finish within SCRAPE_JOB_WAIT_SECONDS."""
+
+
+@wait_for(timeout=SPIDER_TIMEOUT)
 def run_spider(product_url, store):
-    """Run the appropriate spider based on store configuration."""
-    # Set up Scrapy settings to enable DjangoPipeline
-    settings = get_project_settings()
-    settings.set(
-        "ITEM_PIPELINES",
-        {"scraper.scraper.pipelines.DjangoPipeline": 300},
-    )
-    runner = CrawlerRunner(settings)
-
-    logger.info(f"Starting spider for URL: {product_url}")
-    if store.name == "Startech":
-        return runner.crawl(StartechProductSpider, url=product_url)
-    elif store.name == "Potakait":
-        return runner.crawl(PotakaitProductSpider, url=product_url)
-    elif store.name == "UCC":
-        return runner.crawl(UCCProductSpider, url=product_url)
-    elif store.name == "TechLand":
-        return runner.crawl(TechLandProductSpider, url=product_url)
-    elif store.name == "Sumash Tech":
-        return runner.crawl(SumashTechProductSpider, url=product_url)
-    elif store.name == "Rio International":
-        return runner.crawl(RioInternationalProductSpider, url=product_url)
+    """Run the appropriate spider and return the Product it saved, if any."""
+    return crawl_product(product_url, store)
+
+
+@run_in_reactor
+def start_spider(product_url, store):
+    """Run the product spider without blocking the calling thread."""
+    return crawl_product(product_url, store)
+
+
+def refresh_product_in_background(product_url, store):
+    """Kick off a product re-scrape and return immediately."""
+    if in_flight("product", url_key(product_url)):
+        return
+    if SCRAPE_JOBS_ENABLED:
+        ScrapeJob.enqueue_product(product_url, store)
     else:
-        raise ValueError(f"Unsupported store: {store.name}")
+        start_spider(product_url, store)
+
+
+def scrape_product(product_url, store):
+    """Scrape a product page and return the saved Product, or None.
+
+    Goes through the scrape worker queue when enabled and raises
+    ScrapePending if the job did not finish within SCRAPE_JOB_WAIT_SECONDS.
+    """
+    if SCRAPE_JOBS_ENABLED:
+        if not ScrapeJob.enqueue_product(product_url, store).wait(SCRAPE_JOB_WAIT_SECONDS):
+            raise ScrapePending(product_url)
+        # Saved by a worker process
+        return get_product_from_db(product_url)
+    # The crawl hands back what it saved; if it joined another crawl of this
+    # URL or the page was unchanged, the row is already up to date
+    return run_spider(product_url, store) or get_product_from_db(product_url)
 
 
 def get_product_from_db(product_url, recent_only=False):
     """Fetch product from database with optional recency check."""
-    query = Product.objects.filter(url=product_url)
+    query = Product.objects.for_url(product_url)
 
     if recent_only:
-        cache_threshold = timezone.now() - timedelta(hours=PRODUCT_CACHE_HOURS)
-        query = query.filter(last_updated__gte=cache_threshold)
+        query = query.filter(last_updated__gte=PRODUCT_POLICY.fresh_since())
 
     return query.first()
 
@@ -78,33 +85,36 @@ def product_detail(request, store_name, product_url):
         full_url = unquote(product_url)  # Decode the URL passed from the UI
         
         # Try to get existing product first (using decoded URL)
-        product = Product.objects.filter(url=full_url).first()
+        product = Product.objects.for_url(full_url).first()
         
         if product:
-            # Check if product needs updating
-            cache_threshold = timezone.now() - timedelta(hours=PRODUCT_CACHE_HOURS)
-            if product.last_updated < cache_threshold:
+            # Serve fresh and stale-but-servable data now; only block once expired
+            state = PRODUCT_POLICY.state(product.last_updated)
+            if state == STALE:
+                try:
+                    refresh_product_in_background(full_url, store)
+                except Exception as e:
+                    logger.error(f"Error scheduling product refresh: {str(e)}")
+            elif state != FRESH and in_flight("product", url_key(full_url)):
+                # Another request is already re-scraping it; serve the last known data
+                logger.info(f"Refresh of {full_url} already in flight, serving last known data")
+            elif state != FRESH:
                 try:
-                    run_spider(full_url, store)
-                    product.refresh_from_db()
+                    product = scrape_product(full_url, store) or product
+                except ScrapePending:
+                    logger.info(f"Refresh of {full_url} still queued, serving last known data")
                 except Exception as e:
                     logger.error(f"Error updating product: {str(e)}")
                     # Continue with existing product data if update fails
         else:
             # Product not found - try scraping
             try:
-                run_spider(full_url, store)
-                
-                # Poll database for results (using consistent URL format)
-                for attempt in range(MAX_RETRIES):
-                    product = Product.objects.filter(url=full_url).first()
-                    if product:
-                        break
-                    time.sleep(RETRY_DELAY)
-                
+                product = scrape_product(full_url, store)
                 if not product:
                     raise Http404("Product not found after scraping")
-                    
+            except ScrapePending:
+                # The worker is still on it; the pending page reloads itself
+                return render(request, 'products/product_pending.html', {'store': store})
             except Exception as e:
                 logger.error(f"Error during scraping: {str(e)}")
                 raise Http404(f"Error fetching product: {str(e)}")
@@ -0,0 +1,395 @@
+"""Crawl entry points shared by the web views and the scrape worker.
+
+Every crawl function here must be called on the reactor thread (through
+crochet's ``wait_for`` / ``run_in_reactor``) and returns a Deferred. Scrapy
+and the spiders are only imported once a crawl actually starts.
+"""
+import logging
+import os
+import time
+from importlib.util import find_spec
+
+from django.conf import settings as django_settings
+
+from products.models import Product, url_key
+from search.models import Search, SearchResult, SearchCache
+from shops.models import Shop
+from wisecart.freshness import get_policy
+from wisecart.singleflight import coalesce, COALESCED
+from scraper.scraper import registry
+from scraper.scraper.shop_cache import get_shop
+
+logger = logging.getLogger(__name__)
+
+# Extra time on top of the slowest store deadline for stopped spiders to close
+STOP_GRACE_SECONDS = 5
+PRODUCT_CRAWL_TIMEOUT = 30  # seconds
+SEARCH_RESULT_BATCH_SIZE = getattr(django_settings, "SEARCH_RESULT_BATCH_SIZE", 100)
+# Revalidate product pages with ETag / Last-Modified (see RevalidationMiddleware)
+PRODUCT_REVALIDATION = getattr(django_settings, "PRODUCT_REVALIDATION", True)
+REVALIDATION_CACHE_DIR = getattr(django_settings, "REVALIDATION_CACHE_DIR", None)
+REVALIDATION_CACHE_MAX_ENTRIES = getattr(django_settings, "REVALIDATION_CACHE_MAX_ENTRIES", 20000)
+REVALIDATION_CACHE_MAX_AGE = getattr(django_settings, "REVALIDATION_CACHE_MAX_AGE", 30 * 24 * 60 * 60)
+
+# Applied per crawl on top of the shared runner's settings
+SEARCH_CRAWL_SETTINGS = {
+    "ITEM_PIPELINES": {"scraper.scraper.pipelines.SearchResultPipeline": 300},
+}
+PRODUCT_CRAWL_SETTINGS = {
+    "ITEM_PIPELINES": {"scraper.scraper.pipelines.DjangoPipeline": 300},
+}
+if PRODUCT_REVALIDATION and REVALIDATION_CACHE_DIR:
+    # Below HttpCompressionMiddleware (590) so it sees decompressed bodies
+    PRODUCT_CRAWL_SETTINGS["DOWNLOADER_MIDDLEWARES"] = {
+        "scraper.scraper.middlewares.RevalidationMiddleware": 585,
+    }
+
+# Full-catalog crawls: product pipeline plus AutoThrottle, one JOBDIR per store
+CATALOG_JOBDIR = getattr(django_settings, "CATALOG_JOBDIR", None)
+CATALOG_START_URLS = getattr(django_settings, "CATALOG_START_URLS", {})
+CATALOG_MAX_CONCURRENCY = getattr(django_settings, "CATALOG_MAX_CONCURRENCY", 4)
+CATALOG_CRAWL_SETTINGS = {
+    **PRODUCT_CRAWL_SETTINGS,
+    "AUTOTHROTTLE_ENABLED": True,
+    "AUTOTHROTTLE_START_DELAY": 1.0,
+    "AUTOTHROTTLE_MAX_DELAY": 30.0,
+    "AUTOTHROTTLE_TARGET_CONCURRENCY": getattr(django_settings, "CATALOG_TARGET_CONCURRENCY", 2.0),
+}
+
+# Offline record/replay runs (see CassetteMiddleware); items are not saved
+CASSETTE_CRAWL_SETTINGS = {
+    "ITEM_PIPELINES": {},
+    "DOWNLOADER_MIDDLEWARES": {"scraper.scraper.middlewares.CassetteMiddleware": 950},
+    "RETRY_ENABLED": False,
+}
+
+_runner = None
+
+
+def get_runner():
+    """The process-wide CrawlerRunner, built on first use.
+
+    Project settings are parsed once; each crawl then only creates its own
+    Crawler with the overrides it needs (see ``start_crawl``).
+    """
+    global _runner
+    if _runner is None:
+        from scrapy.crawler import CrawlerRunner
+        from scrapy.utils.project import get_project_settings
+
+        settings = get_project_settings()
+        settings.set("SEARCH_RESULT_BATCH_SIZE", SEARCH_RESULT_BATCH_SIZE)
+        if REVALIDATION_CACHE_DIR:
+            settings.set("REVALIDATION_CACHE_DIR", str(REVALIDATION_CACHE_DIR))
+            settings.set("REVALIDATION_CACHE_MAX_ENTRIES", REVALIDATION_CACHE_MAX_ENTRIES)
+            settings.set("REVALIDATION_CACHE_MAX_AGE", REVALIDATION_CACHE_MAX_AGE)
+        settings.set("EXTENSIONS", {"scraper.scraper.extensions.ShopCrawlStatsExtension": 500})
+        _runner = CrawlerRunner(settings)
+    return _runner
+
+
+def create_crawler(spider_cls, overrides):
+    """A Crawler for one run of ``spider_cls`` with per-crawl setting overrides.
+
+    Overrides go in at project priority, so a spider's ``custom_settings``
+    still win, as they did when every crawl built its own settings.
+    """
+    crawler = get_runner().create_crawler(spider_cls)
+    crawler.settings.setdict(overrides, priority="project")
+    return crawler
+
+
+def start_crawl(crawler, **spider_kwargs):
+    """Start ``crawler`` on the shared runner and record its startup time.
+
+    The time from here to ``spider_opened`` ends up in the crawl stats as
+    ``crawl/startup_ms``. Cancelling the returned Deferred stops the
+    crawler; it fails with CancelledError right away while the spider
+    closes and its pipelines flush.
+    """
+    from scrapy import signals
+    from twisted.internet import defer
+
+    started = time.perf_counter()
+
+    def opened(spider):
+        startup_ms = (time.perf_counter() - started) * 1000
+        crawler.stats.set_value("crawl/startup_ms", startup_ms, spider=spider)
+        logger.debug(f"{spider.name} started in {startup_ms:.1f}ms")
+
+    crawler.signals.connect(opened, signal=signals.spider_opened, weak=False)
+    stoppable = defer.Deferred(lambda _: crawler.stop())
+    get_runner().crawl(crawler, **spider_kwargs).chainDeferred(stoppable)
+    return stoppable
+
+
+def download_settings(store):
+    """Scrapy settings for the download profile of ``store``'s Shop.
+
+    Concurrency also bounds how many connections to the store are kept
+    alive for reuse. Stores without a Shop row keep Scrapy's defaults.
+    """
+    try:
+        shop = get_shop(store.name)
+    except Shop.DoesNotExist:
+        return {}
+    profile = {
+        "CONCURRENT_REQUESTS_PER_DOMAIN": shop.max_concurrency,
+        "DOWNLOAD_TIMEOUT": shop.download_timeout,
+        "RETRY_TIMES": shop.retry_times,
+        "COMPRESSION_ENABLED": shop.compression,
+    }
+    if shop.use_http2:
+        if find_spec("h2") is None:
+            logger.warning(f"{shop} is set to use HTTP/2 but the h2 package is not installed")
+        else:
+            profile["DOWNLOAD_HANDLERS"] = {
+                "https": "scrapy.core.downloader.handlers.http2.H2DownloadHandler",
+            }
+    return profile
+
+
+def search_deadlines():
+    """Seconds each store's search crawl may run, keyed by store name."""
+    names = registry.store_names()
+    timeouts = dict(
+        Shop.objects.filter(name__in=names).values_list("name", "search_timeout")
+    )
+    return {name: timeouts.get(name, Shop.DEFAULT_SEARCH_TIMEOUT) for name in names}
+
+
+def search_wait_seconds():
+    """How long a whole fan-out may take: the slowest store deadline plus grace."""
+    return max(search_deadlines().values()) + STOP_GRACE_SECONDS
+
+
+def crawl_search(search_obj, search_term, on_spider_done=None):
+    """Start every search spider in parallel and return a Deferred.
+
+    Each store gets its own deadline (``Shop.search_timeout``); crawls that
+    run past it are stopped so the others' results are kept. The Deferred
+    fires with the names of the stores that timed out.
+
+    ``on_spider_done`` is called (on the reactor thread) with the store name
+    and whether it timed out, as soon as that spider has closed and its
+    items went through SearchResultPipeline.
+
+    If the same normalized query is already being crawled, by this or any
+    other process, no spiders are started: the Deferred fires once that
+    crawl is done and ``on_spider_done`` is called once with ``None`` as the
+    store name. The results then live under ``SearchCache``'s search. If
+    that crawl left no fresh results behind, this one runs after all.
+    """
+    normalized = Search.normalize_query(search_term)
+
+    def joined(result):
+        if result is not COALESCED:
+            return result
+        if on_spider_done is not None:
+            on_spider_done(None, False)
+        return []
+
+    def ready():
+        return SearchCache.objects.filter(
+            normalized_query=normalized,
+            refreshed_at__gte=get_policy("search").fresh_since(),
+        ).exists()
+
+    return coalesce(
+        "search",
+        normalized,
+        lambda: _crawl_search(search_obj, search_term, on_spider_done),
+        timeout=search_wait_seconds(),
+        ready=ready,
+    ).addCallback(joined)
+
+
+def _crawl_search(search_obj, search_term, on_spider_done):
+    from twisted.internet import defer, reactor
+
+    deadlines = search_deadlines()
+    timed_out = []
+
+    # Old results stay visible until the new ones are in
+    stale_ids = list(
+        SearchResult.objects.filter(search=search_obj).values_list("id", flat=True)
+    )
+
+    def cancel(crawler, store_name):
+        logger.warning(
+            f"{store_name} missed its {deadlines[store_name]}s deadline for '{search_term}', stopping"
+        )
+        timed_out.append(store_name)
+        crawler.stop()
+
+    def spider_done(result, store_name, timer, crawler):
+        if timer.active():
+            timer.cancel()
+        stats = crawler.stats.get_stats()
+        logger.info(
+            f"{store_name}: wrote {stats.get('search_results/rows_written', 0)} results "
+            f"in {stats.get('search_results/flushes', 0)} batches "
+            f"({stats.get('search_results/write_time_ms', 0):.1f}ms)"
+        )
+        if on_spider_done is not None:
+            on_spider_done(store_name, store_name in timed_out)
+        return result
+
+    deferreds = []
+    for store in registry.STORES:
+        store_name = store.name
+        profile = download_settings(store)
+        # Hung downloads must not hold the spider open past its deadline
+        timeout = min(profile.get("DOWNLOAD_TIMEOUT", deadlines[store_name]), deadlines[store_name])
+        crawler = create_crawler(
+            store.search_spider,
+            {**SEARCH_CRAWL_SETTINGS, **profile, "DOWNLOAD_TIMEOUT": timeout},
+        )
+        d = start_crawl(crawler, search_term=search_term, search_obj=search_obj)
+        timer = reactor.callLater(deadlines[store_name], cancel, crawler, store_name)
+        d.addBoth(spider_done, store_name, timer, crawler)
+        deferreds.append(d)
+    dlist = defer.DeferredList(deferreds, consumeErrors=True)
+
+    def share_results(result):
+        SearchResult.objects.filter(id__in=stale_ids).delete()
+        # Serve these results to everyone searching the same normalized query
+        SearchCache.refresh(search_obj)
+        return timed_out
+
+    dlist.addCallback(share_results)
+    return dlist
+
+
+def crawl_product(product_url, store):
+    """Run the appropriate product spider, unless the URL is already being crawled.
+
+    The Deferred fires with the Product the crawl saved. It fires with None
+    when the crawl saved nothing (a failed or unmodified page) or was joined
+    to one already in flight; whatever is known is then in the database.
+    A joined crawl that did not leave the product fresh is run again.
+    """
+
+    def joined(result):
+        return None if result is COALESCED else result
+
+    def ready():
+        return Product.objects.for_url(product_url).filter(
+            last_updated__gte=get_policy("product").fresh_since()
+        ).exists()
+
+    return coalesce(
+        "product",
+        url_key(product_url),
+        lambda: _crawl_product(product_url, store),
+        timeout=PRODUCT_CRAWL_TIMEOUT,
+        ready=ready,
+    ).addCallback(joined)
+
+
+def _crawl_product(product_url, store):
+    from scraper.scraper.pipelines import product_saved
+
+    entry = registry.get(store)
+    spider_cls = entry.product_spider
+    crawler = create_crawler(spider_cls, {**PRODUCT_CRAWL_SETTINGS, **download_settings(entry)})
+
+    saved = {}
+
+    def collect(product, spider):
+        saved[product.url_key] = product
+
+    def result(_):
+        # A redirected page is saved under its final URL
+        product = saved.get(url_key(product_url)) or next(iter(saved.values()), None)
+        return product if product is not None and product.pk is not None else None
+
+    crawler.signals.connect(collect, signal=product_saved, weak=False)
+    logger.info(f"Starting {spider_cls.name} for URL: {product_url}")
+    return start_crawl(crawler, url=product_url).addCallback(result)
+
+
+def catalog_jobdir(store, root=None):
+    """Where the catalog crawl of ``store`` keeps its resumable state, or None."""
+    root = root or CATALOG_JOBDIR
+    return os.path.join(root, store.slug) if root else None
+
+
+def crawl_catalog(stores=None, jobdir_root=None):
+    """Walk the category listings of ``stores`` (default: all) into Product rows.
+
+    One crawler per store runs in parallel, each throttled per domain by
+    AutoThrottle and writing through DjangoPipeline's batched upserts. A
+    store's scheduler queue and seen-request log live in its JOBDIR, so
+    starting the same crawl again after an interruption resumes it.
+
+    Returns a Deferred firing with ``(store, crawler)`` pairs once every
+    crawl has closed.
+    """
+    from twisted.internet import defer
+    from twisted.python.failure import Failure
+
+    def done(result, store, crawler):
+        if isinstance(result, Failure):
+            logger.error(f"{store.name} catalog crawl failed: {result.getErrorMessage()}")
+        stats = crawler.stats.get_stats()
+        logger.info(
+            f"{store.name} catalog: {stats.get('catalog/listing_pages', 0)} listing pages, "
+            f"{stats.get('products/created', 0)} products created, "
+            f"{stats.get('products/updated', 0)} updated, "
+            f"{stats.get('products/unchanged', 0)} unchanged "
+            f"({stats.get('finish_reason')})"
+        )
+        return store, crawler
+
+    deferreds = []
+    for store in stores or registry.STORES:
+        profile = download_settings(store)
+        overrides = {**CATALOG_CRAWL_SETTINGS, **profile}
+        # The catalog cap applies on top of the store's own limit
+        overrides["CONCURRENT_REQUESTS_PER_DOMAIN"] = min(
+            profile.get("CONCURRENT_REQUESTS_PER_DOMAIN", CATALOG_MAX_CONCURRENCY),
+            CATALOG_MAX_CONCURRENCY,
+        )
+        jobdir = catalog_jobdir(store, jobdir_root)
+        if jobdir:
+            overrides["JOBDIR"] = jobdir
+        crawler = create_crawler(store.product_spider, overrides)
+
+        spider_kwargs = {"catalog": True}
+        if store.slug in CATALOG_START_URLS:
+            spider_kwargs["catalog_urls"] = CATALOG_START_URLS[store.slug]
+        logger.info(f"Starting {store.name} catalog crawl (state in {jobdir or 'memory'})")
+        d = start_crawl(crawler, **spider_kwargs)
+        d.addBoth(done, store, crawler)
+        deferreds.append(d)
+
+    dlist = defer.DeferredList(deferreds)
+    dlist.addCallback(lambda results: [value for _, value in results])
+    return dlist
+
+
+def crawl_cassette(spider_cls, cassette_dir, mode, output=None, **spider_kwargs):
+    """Run ``spider_cls`` recording to, or replaying from, ``cassette_dir``.
+
+    Scraped items are only written to ``output`` (JSON lines), if given,
+    never to the database. Returns a Deferred firing with the crawler, whose
+    stats hold the ``cassette/`` counters.
+    """
+    from scrapy.settings import SETTINGS_PRIORITIES
+
+    crawler = create_crawler(
+        spider_cls, {**CASSETTE_CRAWL_SETTINGS, "CASSETTE_DIR": str(cassette_dir), "CASSETTE_MODE": mode}
+    )
+    # Above the spiders' own custom_settings, which may name a pipeline
+    crawler.settings.set("ITEM_PIPELINES", {}, priority=SETTINGS_PRIORITIES["cmdline"])
+    if output:
+        crawler.settings.set("FEEDS", {str(output): {"format": "jsonlines", "overwrite": True}})
+    if mode == "replay":
+        # Nothing goes over the network, so there is nothing to be polite to
+        crawler.settings.setdict({"AUTOTHROTTLE_ENABLED": False, "DOWNLOAD_DELAY": 0})
+
+    logger.info(f"Starting {spider_cls.name} in cassette {mode} mode ({cassette_dir})")
+    d = start_crawl(crawler, **spider_kwargs)
+    d.addCallback(lambda _: crawler)
+    return d
@@ -0,0 +1,47 @@
+"""Scrapy extensions installed on every crawl the site runs."""
+import logging
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+
+from scraper.scraper import registry
+from scraper.scraper.shop_cache import get_shop
+from shops.models import Shop, ShopCrawlStats
+
+logger = logging.getLogger(__name__)
+
+
+class ShopCrawlStatsExtension:
+    """Roll each finished crawl's download stats into ShopCrawlStats.
+
+    Gives per-store throughput and error rates to tune the Shop download
+    profiles against. Cassette runs are not counted.
+    """
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if crawler.settings.get("CASSETTE_MODE"):
+            raise NotConfigured("Cassette runs do not touch the stores")
+        ext = cls(crawler.stats)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        return ext
+
+    def spider_closed(self, spider, reason):
+        try:
+            store = registry.for_spider(spider)
+            shop = get_shop(store.name)
+        except (ValueError, Shop.DoesNotExist):
+            return
+        if getattr(spider, "catalog", False):
+            kind = ShopCrawlStats.KIND_CATALOG
+        elif isinstance(spider, store.product_spider):
+            kind = ShopCrawlStats.KIND_PRODUCT
+        else:
+            kind = ShopCrawlStats.KIND_SEARCH
+        try:
+            ShopCrawlStats.record(shop, kind, self.stats.get_stats())
+        except Exception as e:
+            logger.error(f"Could not record {kind} crawl stats for {shop}: {e!r}")
@@ -0,0 +1,184 @@
+"""Declarative, precompiled extraction plans for product pages.
+
+A plan maps each ProductItem field to an ordered list of CSS selectors and a
+post-processor. Selectors are translated to XPath and compiled once, when the
+spider class is defined, and every page is then evaluated against the single
+lxml tree Scrapy already parsed. The first selector whose processed value is
+non-empty wins; which one matched is counted in the crawl stats as
+``extraction/<field>/selector_<n>`` (or ``extraction/<field>/missing``).
+"""
+import logging
+import re
+
+import scrapy
+from lxml import etree
+from parsel.csstranslator import HTMLTranslator
+
+from scraper.scraper.items import ProductItem
+from scraper.scraper.shop_cache import get_shop
+
+logger = logging.getLogger(__name__)
+
+_translator = HTMLTranslator()
+
+EMPTY = (None, "", [])
+
+
+class Css:
+    """One CSS selector, optionally overriding its field's ``first`` setting."""
+
+    def __init__(self, css, first=None):
+        self.css = css
+        self.first = first
+        self.xpath = etree.XPath(_translator.css_to_xpath(css), smart_strings=False)
+
+
+class Field:
+    """Ordered fallback selectors for one field.
+
+    ``first`` hands the processor only the first match (like ``.get()``);
+    otherwise it gets every match (like ``.getall()``). ``default`` is used
+    when no selector produces a value.
+    """
+
+    def __init__(self, *selectors, first=True, process=None, default=None):
+        self.selectors = [sel if isinstance(sel, Css) else Css(sel) for sel in selectors]
+        self.first = first
+        self.process = process or (lambda value: value)
+        self.default = default
+
+    def extract(self, root):
+        """Return ``(value, index of the selector that matched or None)``."""
+        for index, sel in enumerate(self.selectors):
+            matches = sel.xpath(root)
+            if not matches:
+                continue
+            first = self.first if sel.first is None else sel.first
+            value = self.process(matches[0] if first else matches)
+            if value not in EMPTY:
+                return value, index
+        return self.default, None
+
+
+class ProductPlan:
+    def __init__(self, **fields):
+        self.fields = fields
+
+    def extract(self, response, stats=None, spider=None):
+        root = response.selector.root
+        values = {}
+        for name, field in self.fields.items():
+            values[name], index = field.extract(root)
+            if stats is not None:
+                key = "missing" if index is None else f"selector_{index}"
+                stats.inc_value(f"extraction/{name}/{key}", spider=spider)
+            if index:
+                logger.debug(f"{response.url}: {name} matched fallback selector {index}")
+        return values
+
+
+# Post-processors
+
+
+def strip(text):
+    return text.strip()
+
+
+def digits_int(text):
+    """Keep only the digits, e.g. '৳1,200' -> 1200."""
+    digits = re.sub(r"\D", "", text.strip())
+    return int(digits) if digits else None
+
+
+def decimal_float(text):
+    """Keep digits and dots, e.g. '1,200.50৳' -> 1200.5."""
+    try:
+        return float(re.sub(r"[^0-9.]", "", text))
+    except ValueError:
+        return None
+
+
+def currency_amount(text):
+    """Strip currency symbols and commas; fall back to the first number, else 0."""
+    text = re.sub(r"[৳$₹€£]", "", text).strip().replace(",", "")
+    try:
+        return float(text)
+    except ValueError:
+        numbers = re.findall(r"\d+", text)
+        return float(numbers[0]) if numbers else 0
+
+
+def joined(separator):
+    """Join the stripped, non-empty strings of a match (or list of matches)."""
+
+    def join(texts):
+        if isinstance(texts, str):
+            texts = [texts]
+        return separator.join(text.strip() for text in texts if text.strip())
+
+    return join
+
+
+def present(matches):
+    return bool(matches)
+
+
+class ProductPageSpider(scrapy.Spider):
+    """Base for product spiders: fetch ``url`` and run the class's plan over it.
+
+    Subclasses set ``store_name`` and ``plan``, optionally ``headers``, and
+    can adjust the extracted values in ``finalize``.
+
+    Started with ``catalog=True`` the spider instead walks the store's
+    category listings: from each of ``catalog_urls`` it follows the product
+    links matched by ``catalog_links`` and the further listing pages matched
+    by ``catalog_pagination``. Listing pages are marked ``dont_cache``:
+    only product pages are worth revalidating.
+
+    The store is looked up once, when the crawl starts, not per page.
+    """
+
+    store_name = None
+    plan = None
+    headers = {}
+
+    catalog_urls = ()
+    catalog_links = None
+    catalog_pagination = None
+
+    def start_requests(self):
+        self.store_id = get_shop(self.store_name).id
+        if getattr(self, "catalog", False):
+            for url in self.catalog_urls:
+                yield scrapy.Request(
+                    url=url, callback=self.parse_listing, headers=self.headers, meta={"dont_cache": True}
+                )
+            return
+
+        url = getattr(self, "url", None)
+        if not url:
+            self.log(f"No URL provided. Use -a url='<product page>' to scrape a {self.store_name} product.")
+            return
+        yield scrapy.Request(url=url, callback=self.parse, headers=self.headers)
+
+    def parse(self, response):
+        values = self.plan.extract(response, stats=self.crawler.stats, spider=self)
+        values.setdefault("rating", 0)
+        values["url"] = response.url
+        values["store_id"] = self.store_id
+        yield ProductItem(**self.finalize(values, response))
+
+    def parse_listing(self, response):
+        self.crawler.stats.inc_value("catalog/listing_pages", spider=self)
+        root = response.selector.root
+        for href in self.catalog_links.xpath(root):
+            # Product pages first, so items keep flowing while listings queue up
+            yield response.follow(href, callback=self.parse, headers=self.headers, priority=1)
+        if self.catalog_pagination is not None:
+            for href in self.catalog_pagination.xpath(root):
+                yield response.follow(
+                    href, callback=self.parse_listing, headers=self.headers, meta={"dont_cache": True}
+                )
+
+    def finalize(self, values, response):
+        return values
@@ -3,11 +3,31 @@
 # See documentation in:
 # https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 
+import base64
+import gzip
+import hashlib
+import json
+import logging
+import time
+from pathlib import Path
+
+from django.utils import timezone
 from scrapy import signals
+from scrapy.exceptions import IgnoreRequest, NotConfigured
+from scrapy.http import Headers
+from scrapy.responsetypes import responsetypes
+from w3lib.url import canonicalize_url
 
 # useful for handling different item types with a single interface
 from itemadapter import is_item, ItemAdapter
 
+from products.models import Product
+
+logger = logging.getLogger(__name__)
+
+# Cache directory -> when this process last pruned it (see RevalidationMiddleware)
+_last_pruned = {}
+
 
 class ScraperSpiderMiddleware:
     # Not all methods need to be defined. If a method is not defined,
@@ -101,3 +121,234 @@ class ScraperDownloaderMiddleware:
 
     def spider_opened(self, spider):
         spider.logger.info("Spider opened: %s" % spider.name)
+
+
+class NotModified(IgnoreRequest):
+    """The page has not changed since it was last scraped."""
+
+
+class RevalidationMiddleware:
+    """Revalidate product pages with conditional requests instead of re-downloading.
+
+    For every 200 response carrying an ETag or Last-Modified header, the
+    validators and a gzipped copy of the body are stored on disk under
+    REVALIDATION_CACHE_DIR, keyed by the canonical URL. The next request for
+    that URL sends If-None-Match / If-Modified-Since. On a 304 the product's
+    last_updated is bumped and the response is dropped, so nothing is parsed
+    or upserted; if there is no product row to bump, the cached body is
+    replayed as a 200 instead. Bytes saved are counted under
+    ``revalidation/`` in the crawler stats, which ShopCrawlStats keeps.
+
+    Requests with ``dont_cache`` in their meta, such as catalog listing
+    pages, are left alone. At most once an hour per process, entries unused
+    for REVALIDATION_CACHE_MAX_AGE seconds and the least recently used ones
+    beyond REVALIDATION_CACHE_MAX_ENTRIES are deleted.
+    """
+
+    PRUNE_INTERVAL = 60 * 60  # seconds
+
+    def __init__(self, cache_dir, stats, max_entries=20000, max_age=30 * 24 * 60 * 60):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.stats = stats
+        self.max_entries = max_entries
+        self.max_age = max_age
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        from twisted.internet import reactor
+
+        cache_dir = crawler.settings.get("REVALIDATION_CACHE_DIR")
+        if not cache_dir:
+            raise NotConfigured("REVALIDATION_CACHE_DIR is not set")
+        mw = cls(
+            cache_dir,
+            crawler.stats,
+            max_entries=crawler.settings.getint("REVALIDATION_CACHE_MAX_ENTRIES", 20000),
+            max_age=crawler.settings.getfloat("REVALIDATION_CACHE_MAX_AGE", 30 * 24 * 60 * 60),
+        )
+        if time.monotonic() - _last_pruned.get(mw.cache_dir, -cls.PRUNE_INTERVAL) >= cls.PRUNE_INTERVAL:
+            _last_pruned[mw.cache_dir] = time.monotonic()
+            reactor.callInThread(mw.prune)
+        return mw
+
+    def prune(self):
+        """Delete expired entries, then the least recently used beyond the limit."""
+        entries = []
+        for meta_path in self.cache_dir.glob("*.json"):
+            try:
+                entries.append((meta_path.stat().st_mtime, meta_path))
+            except OSError:
+                continue
+        entries.sort(reverse=True)
+        cutoff = time.time() - self.max_age
+        evicted = [
+            meta_path
+            for i, (used_at, meta_path) in enumerate(entries)
+            if i >= self.max_entries or used_at < cutoff
+        ]
+        for meta_path in evicted:
+            meta_path.unlink(missing_ok=True)
+            meta_path.with_suffix(".gz").unlink(missing_ok=True)
+        if evicted:
+            logger.info(f"Evicted {len(evicted)} of {len(entries)} revalidation cache entries")
+
+    def _paths(self, url):
+        key = hashlib.sha1(canonicalize_url(url).encode()).hexdigest()
+        return self.cache_dir / f"{key}.json", self.cache_dir / f"{key}.gz"
+
+    def _load(self, url):
+        meta_path, body_path = self._paths(url)
+        try:
+            return json.loads(meta_path.read_text()), body_path
+        except (OSError, ValueError):
+            return None, body_path
+
+    def process_request(self, request, spider):
+        if request.method != "GET" or request.meta.get("dont_cache"):
+            return None
+        meta, _ = self._load(request.url)
+        if meta is None:
+            return None
+        if meta.get("etag"):
+            request.headers.setdefault("If-None-Match", meta["etag"])
+        if meta.get("last_modified"):
+            request.headers.setdefault("If-Modified-Since", meta["last_modified"])
+        return None
+
+    def process_response(self, request, response, spider):
+        if response.status == 304:
+            return self._not_modified(request, response, spider)
+        if response.status == 200 and request.method == "GET" and not request.meta.get("dont_cache"):
+            self._store(request, response)
+        return response
+
+    def _store(self, request, response):
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return
+        meta_path, body_path = self._paths(request.url)
+        try:
+            body_path.write_bytes(gzip.compress(response.body))
+            meta_path.write_text(
+                json.dumps(
+                    {
+                        "url": request.url,
+                        "etag": etag.decode() if etag else None,
+                        "last_modified": last_modified.decode() if last_modified else None,
+                        "content_type": (response.headers.get("Content-Type") or b"").decode(),
+                        "size": len(response.body),
+                        "stored_at": timezone.now().isoformat(),
+                    }
+                )
+            )
+        except OSError as e:
+            logger.warning(f"Could not cache {request.url} for revalidation: {e}")
+
+    def _not_modified(self, request, response, spider):
+        meta, body_path = self._load(request.url)
+        if meta is None:
+            return response
+
+        saved = meta.get("size", 0)
+        self.stats.inc_value("revalidation/not_modified", spider=spider)
+        self.stats.inc_value("revalidation/bytes_saved", saved, spider=spider)
+        try:
+            # Still in use; keep it through the next prune
+            self._paths(request.url)[0].touch()
+        except OSError:
+            pass
+
+        if Product.objects.for_url(request.url).update(last_updated=timezone.now()):
+            logger.info(f"{spider.name}: {request.url} not modified, saved {saved} bytes")
+            raise NotModified(f"Not modified: {request.url}")
+
+        # Nothing to bump; parse the copy we have instead
+        try:
+            body = gzip.decompress(body_path.read_bytes())
+        except OSError:
+            return response
+        headers = Headers({"Content-Type": meta.get("content_type") or "text/html"})
+        response_cls = responsetypes.from_args(headers=headers, url=request.url, body=body)
+        return response_cls(
+            url=request.url, status=200, headers=headers, body=body, request=request
+        )
+
+
+class CassetteMiddleware:
+    """Record responses to a cassette directory, or replay them without network access.
+
+    With CASSETTE_MODE = "record" every downloaded response is written to
+    CASSETTE_DIR as ``<request fingerprint>.json.gz`` (status, headers and
+    body as they came off the wire). With "replay" responses are served from
+    those files and a request missing from the cassette is dropped instead
+    of downloaded, so a replayed crawl is deterministic and offline.
+
+    Meant to sit right above the download handler (priority 950): recorded
+    responses are the raw ones, and replayed responses go back through every
+    other middleware (decompression, redirects, cookies) as if downloaded.
+    Hits, misses and recordings are counted under ``cassette/`` in the stats.
+    """
+
+    MODES = ("record", "replay")
+
+    def __init__(self, cassette_dir, mode, crawler):
+        self.cassette_dir = Path(cassette_dir)
+        self.mode = mode
+        self.stats = crawler.stats
+        self.fingerprinter = crawler.request_fingerprinter
+        if mode == "record":
+            self.cassette_dir.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        cassette_dir = crawler.settings.get("CASSETTE_DIR")
+        mode = crawler.settings.get("CASSETTE_MODE")
+        if not cassette_dir or not mode:
+            raise NotConfigured("CASSETTE_DIR and CASSETTE_MODE are not set")
+        if mode not in cls.MODES:
+            raise NotConfigured(f"CASSETTE_MODE must be one of {cls.MODES}, not {mode!r}")
+        return cls(cassette_dir, mode, crawler)
+
+    def _path(self, request):
+        return self.cassette_dir / f"{self.fingerprinter.fingerprint(request).hex()}.json.gz"
+
+    def process_request(self, request, spider):
+        if self.mode != "replay":
+            return None
+        try:
+            entry = json.loads(gzip.decompress(self._path(request).read_bytes()))
+        except (OSError, ValueError):
+            self.stats.inc_value("cassette/misses", spider=spider)
+            raise IgnoreRequest(f"Not in cassette: {request.url}")
+
+        self.stats.inc_value("cassette/hits", spider=spider)
+        headers = Headers(entry["headers"])
+        body = base64.b64decode(entry["body"])
+        response_cls = responsetypes.from_args(headers=headers, url=entry["url"], body=body)
+        return response_cls(
+            url=entry["url"], status=entry["status"], headers=headers, body=body, request=request
+        )
+
+    def process_response(self, request, response, spider):
+        if self.mode != "record":
+            return response
+        entry = {
+            "url": response.url,
+            "method": request.method,
+            "status": response.status,
+            "headers": {
+                key.decode("latin-1"): [value.decode("latin-1") for value in values]
+                for key, values in response.headers.items()
+            },
+            "body": base64.b64encode(response.body).decode(),
+            "recorded_at": timezone.now().isoformat(),
+        }
+        try:
+            self._path(request).write_bytes(gzip.compress(json.dumps(entry).encode()))
+        except OSError as e:
+            logger.warning(f"Could not record {request.url} to the cassette: {e}")
+        else:
+            self.stats.inc_value("cassette/recorded", spider=spider)
+        return response
@@ -1,16 +1,23 @@
 from itemadapter import ItemAdapter
-from products.models import Product
-from shops.models import Shop
+from scrapy.exceptions import DropItem
+from products.models import Product, PriceObservation, canonical_url, url_key
+from scraper.scraper.shop_cache import get_shop
 from django.db import transaction
 from django.utils import timezone
 import logging
 from search.models import SearchResult
 from scraper.scraper.items import SearchResultItem
-import traceback
-import urllib.parse
+from scraper.scraper import registry
+import time
+from decimal import Decimal
+from collections import defaultdict
 
 logger = logging.getLogger(__name__)
 
+# Sent by DjangoPipeline for every Product a flush saved (or found unchanged),
+# so whoever started the crawl gets it without reading it back
+product_saved = object()
+
 
 class ScrapersPipeline:
     def process_item(self, item, spider):
@@ -18,48 +25,191 @@ class ScrapersPipeline:
 
 
 class DjangoPipeline:
-    def __init__(self):
+    """Buffer scraped products and upsert them in batches keyed by canonical URL.
+
+    Each flush reads the existing rows for the batch in one query and inserts
+    new products with a single ``INSERT ... ON CONFLICT (url_key) DO UPDATE``.
+    Changed products only get the columns that differ written back, one
+    ``bulk_update`` per set of changed columns, so a price change does not
+    rewrite the description and overview; unchanged ones only have
+    last_updated bumped. New products and price or stock changes append a
+    ``PriceObservation``. Per-flush created/updated/unchanged counts are
+    logged and added to the crawler stats under ``products/``. Each saved
+    Product is then sent with the ``product_saved`` signal. Items without a
+    URL are dropped and counted as ``products/dropped_no_url``.
+    """
+
+    # Fields compared to decide whether a scraped product changed
+    TRACKED_FIELDS = [
+        "name",
+        "store_id",
+        "price",
+        "stock",
+        "rating",
+        "image_src",
+        "description",
+        "overview",
+    ]
+
+    def __init__(self, stats=None, batch_size=500, signals=None):
+        self.stats = stats
+        self.batch_size = batch_size
+        self.signals = signals
+        self.buffer = {}
         logger.info("DatabasePipeline initialized")
 
-    @transaction.atomic
-    def process_item(self, item, spider):
-        try:
-            if spider.name in ["startech_product", "potakait_product", "ucc_product", "techland_product", "sumashtech_product", "riointernational_product"]:
-                # Get store object from store_id
-                store = Shop.objects.get(id=item["store_id"])
-
-                # Always save the product with a fully encoded URL
-                url = item.get('url') or item.get('url_src')
-                encoded_url = urllib.parse.quote(url, safe=':/?&=%') if url else None
-                # Use encoded_url when saving to the Product model
-                product, created = Product.objects.update_or_create(
-                    url=encoded_url,
-                    defaults={
-                        "name": item.get("name") or item.get("title"),
-                        "store": store,
-                        "price": item.get("price"),
-                        "stock": item.get("stock"),
-                        "rating": item.get("rating", 0),
-                        "image_src": item.get("image") or item.get("image_src"),
-                        "description": item.get("description", ""),
-                        "overview": item.get("overview", ""),
-                        "last_updated": timezone.now(),
-                    },
-                )
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(
+            stats=crawler.stats,
+            batch_size=crawler.settings.getint("PRODUCT_BATCH_SIZE", 500),
+            signals=crawler.signals,
+        )
 
-                logger.info(
-                    f"{'Created' if created else 'Updated'} product: {product.name} from spider: {spider.name}"
-                )
-            else:
-                logger.debug(f"DjangoPipeline skipped for spider: {spider.name}")
+    def process_item(self, item, spider):
+        if not registry.is_product_spider(spider):
+            logger.debug(f"DjangoPipeline skipped for spider: {spider.name}")
             return item
-        except Exception as e:
-            traceback.print_exc()
-            logger.error(f"Error saving product: {str(e)}")
+
+        raw_url = item.get('url') or item.get('url_src')
+        if not raw_url:
+            if self.stats:
+                self.stats.inc_value("products/dropped_no_url", spider=spider)
+            raise DropItem(f"Product item without a URL: {item.get('name') or item.get('title')!r}")
+
+        # Always save the product under its canonical URL; bulk_create skips
+        # Product.save, so set the key here
+        url = canonical_url(raw_url)
+        key = url_key(url)
+        # Later items for the same URL in a batch win
+        self.buffer[key] = Product(
+            url=url,
+            url_key=key,
+            name=item.get("name") or item.get("title"),
+            store=get_shop(item["store_id"]),
+            price=item.get("price"),
+            stock=item.get("stock"),
+            rating=item.get("rating", 0),
+            image_src=item.get("image") or item.get("image_src"),
+            description=item.get("description", ""),
+            overview=item.get("overview", ""),
+            last_updated=timezone.now(),
+        )
+        if len(self.buffer) >= self.batch_size:
+            self.flush(spider)
+        return item
+
+    def close_spider(self, spider):
+        self.flush(spider)
+
+    def _changed_fields(self, product, existing):
+        """The tracked fields whose scraped value differs from the stored row."""
+        changed = []
+        for field in self.TRACKED_FIELDS:
+            new = getattr(product, field)
+            old = getattr(existing, field)
+            if field == "price" and new is not None:
+                new = Decimal(str(new)).quantize(Decimal("0.01"))
+            # Missing text is scraped as "" but may be stored as NULL
+            if new in (None, "") and old in (None, ""):
+                continue
+            if new != old:
+                changed.append(field)
+        return changed
+
+    def flush(self, spider):
+        if not self.buffer:
+            return
+        products, self.buffer = self.buffer, {}
+        started = time.perf_counter()
+        now = timezone.now()
+        try:
+            with transaction.atomic():
+                existing = Product.objects.in_bulk(list(products), field_name="url_key")
+                created, unchanged, observations = [], [], []
+                # Changed columns -> products with exactly those changes
+                changed = defaultdict(list)
+                for key, product in products.items():
+                    if key not in existing:
+                        created.append(product)
+                        continue
+                    product.pk = existing[key].pk
+                    fields = self._changed_fields(product, existing[key])
+                    if not fields:
+                        unchanged.append(key)
+                        continue
+                    changed[tuple(fields)].append(product)
+                    if "price" in fields or "stock" in fields:
+                        observations.append(PriceObservation.of(product, now))
+                if created:
+                    # Another crawl may have inserted the same URL since the read
+                    Product.objects.bulk_create(
+                        created,
+                        update_conflicts=True,
+                        unique_fields=["url_key"],
+                        update_fields=self.TRACKED_FIELDS + ["last_updated"],
+                    )
+                    if any(product.pk is None for product in created):
+                        # Backends that cannot return ids from an upsert
+                        pks = dict(
+                            Product.objects.filter(
+                                url_key__in=[product.url_key for product in created]
+                            ).values_list("url_key", "pk")
+                        )
+                        for product in created:
+                            product.pk = pks[product.url_key]
+                    observations.extend(PriceObservation.of(product, now) for product in created)
+                for fields, rows in changed.items():
+                    Product.objects.bulk_update(rows, [*fields, "last_updated"])
+                if observations:
+                    PriceObservation.objects.bulk_create(observations)
+                if unchanged:
+                    Product.objects.filter(url_key__in=unchanged).update(last_updated=now)
+        except Exception:
+            logger.exception(f"Error saving {len(products)} products")
             raise
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        updated = sum(len(rows) for rows in changed.values())
+        logger.info(
+            f"{spider.name}: {len(created)} created, {updated} updated, {len(unchanged)} unchanged "
+            f"products, {len(observations)} price changes in {elapsed_ms:.1f}ms"
+        )
+        if self.stats:
+            self.stats.inc_value("products/created", len(created), spider=spider)
+            self.stats.inc_value("products/updated", updated, spider=spider)
+            self.stats.inc_value("products/unchanged", len(unchanged), spider=spider)
+            self.stats.inc_value("products/price_changes", len(observations), spider=spider)
+            self.stats.inc_value("products/write_time_ms", elapsed_ms, spider=spider)
+
+        if self.signals:
+            for key in unchanged:
+                existing[key].last_updated = now
+                self.signals.send_catch_log(product_saved, product=existing[key], spider=spider)
+            for product in created + [product for rows in changed.values() for product in rows]:
+                self.signals.send_catch_log(product_saved, product=product, spider=spider)
 
 
 class SearchResultPipeline:
+    """Buffer SearchResult rows per crawl and write them with bulk_create.
+
+    Rows are flushed when the buffer reaches SEARCH_RESULT_BATCH_SIZE and when
+    the spider closes, so a search costs one INSERT per store. Write timings
+    are exposed through the crawler stats under ``search_results/``.
+    """
+
+    def __init__(self, stats=None, batch_size=100):
+        self.stats = stats
+        self.batch_size = batch_size
+        self.buffer = []
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(
+            stats=crawler.stats,
+            batch_size=crawler.settings.getint("SEARCH_RESULT_BATCH_SIZE", 100),
+        )
+
     def process_item(self, item, spider):
         if not isinstance(item, SearchResultItem):
             # If it's not a SearchResultItem, skip this pipeline
@@ -67,17 +217,45 @@ class SearchResultPipeline:
 
         adapter = ItemAdapter(item)
         try:
-            # Create the SearchResult object
-            search_result = SearchResult(
-                search_id=adapter["search_id"],
-                title=adapter.get("title") or adapter.get("name"),
-                rating=adapter.get("rating", 0),  # Default to 0 if not provided
-                stock=adapter.get("stock", True),
-                url=adapter["url"],
-                price=adapter["price"],
-                store_id=adapter["store_id"],
+            self.buffer.append(
+                SearchResult(
+                    search_id=adapter["search_id"],
+                    title=adapter.get("title") or adapter.get("name"),
+                    rating=adapter.get("rating", 0),  # Default to 0 if not provided
+                    stock=adapter.get("stock", True),
+                    url=adapter["url"],
+                    price=adapter["price"],
+                    store_id=adapter["store_id"],
+                )
             )
-            search_result.save()
         except Exception as e:
-            logger.error(f"SearchResultPipeline: error saving SearchResult: {e}")
+            logger.error(f"SearchResultPipeline: error building SearchResult: {e}")
+            return item
+
+        if len(self.buffer) >= self.batch_size:
+            self.flush(spider)
         return item
+
+    def close_spider(self, spider):
+        self.flush(spider)
+
+    def flush(self, spider):
+        if not self.buffer:
+            return
+        rows, self.buffer = self.buffer, []
+        started = time.perf_counter()
+        try:
+            SearchResult.objects.bulk_create(rows)
+        except Exception as e:
+            logger.error(f"SearchResultPipeline: error saving {len(rows)} SearchResults: {e}")
+            if self.stats:
+                self.stats.inc_value("search_results/failed_rows", len(rows), spider=spider)
+            return
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        logger.debug(f"SearchResultPipeline: wrote {len(rows)} rows for {spider.name} in {elapsed_ms:.1f}ms")
+        if self.stats:
+            self.stats.inc_value("search_results/flushes", spider=spider)
+            self.stats.inc_value("search_results/rows_written", len(rows), spider=spider)
+            self.stats.inc_value("search_results/write_time_ms", elapsed_ms, spider=spider)
+            self.stats.max_value("search_results/max_flush_time_ms", elapsed_ms, spider=spider)
@@ -0,0 +1,124 @@
+"""Which spiders scrape which store.
+
+Every store is registered once here with the dotted paths of its search and
+product spiders. Spider classes are only imported the first time they are
+needed, so code that just needs to know about stores (the web views) never
+loads Scrapy.
+"""
+from django.utils.module_loading import import_string
+from django.utils.text import slugify
+
+
+class StoreSpiders:
+    def __init__(self, name, search, product, aliases=()):
+        self.name = name
+        self.slug = slugify(name)
+        self.aliases = tuple(aliases)
+        self.search_path = search
+        self.product_path = product
+        self._classes = {}
+
+    def __repr__(self):
+        return f"<StoreSpiders {self.slug}>"
+
+    def _load(self, path):
+        if path not in self._classes:
+            self._classes[path] = import_string(path)
+        return self._classes[path]
+
+    @property
+    def search_spider(self):
+        return self._load(self.search_path)
+
+    @property
+    def product_spider(self):
+        return self._load(self.product_path)
+
+
+STORES = []
+_by_key = {}
+
+
+def register(name, search, product, aliases=()):
+    """Register a store's spiders under its name, slug and any aliases."""
+    entry = StoreSpiders(name, search, product, aliases)
+    for key in dict.fromkeys((entry.slug, name.casefold(), *entry.aliases)):
+        if key in _by_key:
+            raise ValueError(f"Store key '{key}' is already registered")
+        _by_key[key] = entry
+    STORES.append(entry)
+    return entry
+
+
+def get(store):
+    """Look up a store's spiders by Shop, slug or name.
+
+    Raises ValueError for stores without spiders.
+    """
+    if isinstance(store, str):
+        keys = [store.casefold()]
+    else:
+        keys = [store.slug, store.name.casefold()]
+    for key in keys:
+        if key in _by_key:
+            return _by_key[key]
+    raise ValueError(f"Unsupported store: {store}")
+
+
+def store_names():
+    return [entry.name for entry in STORES]
+
+
+def spider_class(name):
+    """The search or product spider class whose Scrapy ``name`` is ``name``."""
+    for entry in STORES:
+        for spider_cls in (entry.search_spider, entry.product_spider):
+            if spider_cls.name == name:
+                return spider_cls
+    raise ValueError(f"Unknown spider: {name}")
+
+
+def for_spider(spider):
+    """The store a running spider scrapes; raises ValueError for other spiders."""
+    for entry in STORES:
+        if isinstance(spider, (entry.search_spider, entry.product_spider)):
+            return entry
+    raise ValueError(f"No store is scraped by {spider.name}")
+
+
+def is_product_spider(spider):
+    return any(isinstance(spider, entry.product_spider) for entry in STORES)
+
+
+register(
+    "Startech",
+    search="scraper.scraper.spiders.startech.StartechSpider",
+    product="scraper.scraper.spiders.startech.StartechProductSpider",
+)
+register(
+    "Potakait",
+    search="scraper.scraper.spiders.potakait.PotakaitSpider",
+    product="scraper.scraper.spiders.potakait.PotakaitProductSpider",
+)
+register(
+    "UCC",
+    search="scraper.scraper.spiders.ucc.UCCSpider",
+    product="scraper.scraper.spiders.ucc.UCCProductSpider",
+)
+register(
+    "TechLand",
+    search="scraper.scraper.spiders.techland.TechLandSpider",
+    product="scraper.scraper.spiders.techland.TechLandProductSpider",
+)
+register(
+    "Sumash Tech",
+    search="scraper.scraper.spiders.sumashtech.SumashTechSpider",
+    product="scraper.scraper.spiders.sumashtech.SumashTechProductSpider",
+    aliases=("sumashtech",),
+)
+register(
+    "Rio International",
+    search="scraper.scraper.spiders.riointernational.RioInternationalSpider",
+    product="scraper.scraper.spiders.riointernational.RioInternationalProductSpider",
+    aliases=("riointernational",),
+)
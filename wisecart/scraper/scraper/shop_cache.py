@@ -0,0 +1,75 @@
+"""Read-through, in-process cache of Shop rows for spiders and pipelines.
+
+All shops are loaded in one query the first time any is asked for, then
+looked up by id, slug or case-folded name without touching the database.
+Saving or deleting a Shop in this process clears the cache; SHOP_CACHE_TTL
+bounds how long edits made in other processes (e.g. the admin) go unseen.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from shops.models import Shop
+
+logger = logging.getLogger(__name__)
+
+SHOP_CACHE_TTL = getattr(settings, "SHOP_CACHE_TTL", 300)  # seconds
+
+_lock = threading.Lock()
+_shops = {}
+# Keys still unknown after a reload; they do not trigger another until the
+# next one is due anyway
+_missing = set()
+_loaded_at = None
+
+
+def _load():
+    global _shops, _loaded_at
+    shops = {}
+    for shop in Shop.objects.all():
+        shops[shop.id] = shop
+        shops[shop.slug] = shop
+        shops[shop.name.casefold()] = shop
+    _shops = shops
+    _missing.clear()
+    _loaded_at = time.monotonic()
+    logger.debug(f"Shop cache loaded {len(shops)} keys")
+
+
+def _key(key):
+    return key.casefold() if isinstance(key, str) else int(key)
+
+
+def get_shop(key):
+    """Return the Shop with this id, slug or name.
+
+    An unknown key triggers a reload (the shop may have been added since),
+    then raises Shop.DoesNotExist like ``Shop.objects.get``. It is not
+    reloaded for again until the cache expires or is cleared.
+    """
+    key = _key(key)
+    with _lock:
+        expired = _loaded_at is None or time.monotonic() - _loaded_at > SHOP_CACHE_TTL
+        if expired or (key not in _shops and key not in _missing):
+            _load()
+        try:
+            return _shops[key]
+        except KeyError:
+            _missing.add(key)
+            raise Shop.DoesNotExist(f"No shop matches '{key}'") from None
+
+
+def clear():
+    global _loaded_at
+    with _lock:
+        _loaded_at = None
+
+
+@receiver(post_save, sender=Shop)
+@receiver(post_delete, sender=Shop)
+def _invalidate(sender, **kwargs):
+    clear()
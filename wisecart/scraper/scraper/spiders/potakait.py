@@ -1,63 +1,38 @@
 import re
 import scrapy
-from shops.models import Shop
-from scraper.scraper.items import ProductItem, SearchResultItem
+from scraper.scraper.shop_cache import get_shop
+from scraper.scraper.extraction import ProductPageSpider, ProductPlan, Css, Field, digits_int, joined, present, strip
+from scraper.scraper.items import SearchResultItem
 
 
-class PotakaitProductSpider(scrapy.Spider):
+class PotakaitProductSpider(ProductPageSpider):
     name = "potakait_product"
     allowed_domains = ["potakait.com"]
-
-    def start_requests(self):
-        url = getattr(self, "url", None)
-        if not url:
-            self.log(
-                "No URL provided. Use -a url='https://potakait.com/product-name' to search."
-            )
-            return
-        yield scrapy.Request(
-            url=url,
-            callback=self.parse,
-            headers={"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"}
-        )
-
-    def parse(self, response):
-        # Use precise selectors for the main product only
-        name = response.css('#product > div > h1::text').get()
-        name = name.strip() if name else None
-        store = Shop.objects.get(name="Potakait")
-        price = self.clean_price(
-            response.css('#product > div > div.price-wrapper > span.special::text').get()
-        )
-        stock = bool(response.css("button#buy-now"))
-        image_src = response.css('#main-image::attr(src)').get()
-        # Overview: join all text from the overview list
-        overview_list = response.css('#product > div > div.product-details__short-description > div > ul *::text').getall()
-        overview = '\n'.join([t.strip() for t in overview_list if t.strip()]) if overview_list else None
-        # Description: join all text from the description div
-        description_list = response.css('#description > div > div *::text').getall()
-        description = '\n'.join([t.strip() for t in description_list if t.strip()]) if description_list else None
-
-        # Create item
-        item = ProductItem(
-            name=name,
-            store_id=store.id,
-            price=price,
-            stock=stock,
-            url=response.url,
-            rating=0,
-            image_src=image_src,
-            description=description,
-            overview=overview
-        )
-        yield item
-
-    def clean_price(self, price_str):
-        """Clean the price string and return an integer value."""
-        if price_str:
-            cleaned_price = re.sub(r"\D", "", price_str.strip())
-            return int(cleaned_price) if cleaned_price else None
-        return None
+    store_name = "Potakait"
+    headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"}
+
+    # Category listings walked by `manage.py crawl_catalog`
+    catalog_urls = [
+        "https://potakait.com/laptop",
+        "https://potakait.com/desktop-component",
+        "https://potakait.com/monitor",
+        "https://potakait.com/accessories",
+    ]
+    catalog_links = Css("h4.title a::attr(href)")
+    catalog_pagination = Css("ul.pagination a::attr(href)")
+
+    plan = ProductPlan(
+        name=Field("#product > div > h1::text", process=strip),
+        price=Field("#product > div > div.price-wrapper > span.special::text", process=digits_int),
+        stock=Field("button#buy-now", first=False, process=present, default=False),
+        image_src=Field("#main-image::attr(src)"),
+        overview=Field(
+            "#product > div > div.product-details__short-description > div > ul *::text",
+            first=False,
+            process=joined("\n"),
+        ),
+        description=Field("#description > div > div *::text", first=False, process=joined("\n")),
+    )
 
 
 class PotakaitSpider(scrapy.Spider):
@@ -83,7 +58,7 @@ class PotakaitSpider(scrapy.Spider):
 
     def parse(self, response):
         products = response.css("div.product-item")
-        store = Shop.objects.get(name="Potakait")
+        store = get_shop("Potakait")
         product_count = 0
 
         for product in products:
@@ -1,107 +1,63 @@
 import scrapy
 import re
-from scraper.scraper.items import ProductItem, SearchResultItem
-from shops.models import Shop
+from scraper.scraper.extraction import ProductPageSpider, ProductPlan, Css, Field, currency_amount, joined, strip
+from scraper.scraper.items import SearchResultItem
+from scraper.scraper.shop_cache import get_shop
 
 
-class RioInternationalProductSpider(scrapy.Spider):
+class RioInternationalProductSpider(ProductPageSpider):
     name = "riointernational_product"
     allowed_domains = ["riointernational.com.bd"]
-
-    def __init__(self, url=None, *args, **kwargs):
-        super(RioInternationalProductSpider, self).__init__(*args, **kwargs)
-        self.start_urls = [url] if url else []
-
-    def parse(self, response):
-        try:
-            store = Shop.objects.get(slug="riointernational")
-        except Shop.DoesNotExist:
-            store = Shop.objects.get(name="Rio International")
-
-        # Extract product details
-        # Multiple fallback selectors for title
-        title = response.css('body > div.page-wrapper > main > main > div > div > div > div > div.product.product-single.row > div:nth-child(2) > div > h1::text').get()
-        if not title:
-            title = response.css('h1::text').get()
-        if not title:
-            title = response.css('.product-title::text').get()
-        if not title:
-            title = response.css('.pd-title::text').get()
-        
-        # Multiple fallback selectors for price
-        price_text = response.css('body > div.page-wrapper > main > main > div > div > div > div > div.product.product-single.row > div:nth-child(2) > div > div.pd-details-info-top > div.product-price > ins::text').get()
-        if not price_text:
-            price_text = response.css('div.product-price ins::text').get()
-        if not price_text:
-            price_text = response.css('ins.new-price::text').get()
-        if not price_text:
-            price_text = response.css('.price::text').get()
-        
-        # Clean price
-        if price_text:
-            # Remove currency symbols (৳, $, etc.) and extra spaces
-            price_text = re.sub(r'[৳$₹€£]', '', price_text).strip()
-            
-            # Remove commas from the number
-            price_text_no_commas = price_text.replace(',', '')
-            
-            try:
-                # Convert directly to float
-                price = float(price_text_no_commas)
-            except ValueError:
-                # If direct conversion fails, try to extract just the numbers
-                price_matches = re.findall(r'\d+', price_text_no_commas)
-                if price_matches:
-                    price = float(price_matches[0])
-                else:
-                    price = 0
-        else:
-            price = 0
-
-        # Multiple fallback selectors for main image
-        image_src = response.css('#swiper-wrapper-9bb561610aeb82103 > div.swiper-slide.swiper-slide-active > div > img:nth-child(1)::attr(src)').get()
-        if not image_src:
-            image_src = response.css('#swiper-wrapper-10a66d980edfa4ccd > div.swiper-slide.swiper-slide-active > div > img:nth-child(1)::attr(src)').get()
-        if not image_src:
-            image_src = response.css('div.swiper-slide.swiper-slide-active > div > img::attr(src)').get()
-        if not image_src:
-            image_src = response.css('img.main-image::attr(src)').get()
-        if not image_src:
-            image_src = response.css('img::attr(src)').get()
-        
-        # Description set to None as per user request
-        description = None
-        
-        # Multiple fallback selectors for overview
-        overview = response.css('body > div.page-wrapper > main > main > div > div > div > div > div.product.product-single.row > div:nth-child(2) > div > div.pd-details-info-top > div.product-short-desc *::text').getall()
-        overview = self.clean_text_content(overview) if overview else ""
-        
-        if not overview:
-            overview = response.css('div.product-short-desc *::text').getall()
-            overview = self.clean_text_content(overview) if overview else ""
-        
-        # Stock set to IN STOCK by default as per user request
-        stock = True
-        
-        item = ProductItem(
-            store_id=store.id,
-            name=title.strip() if title else "",
-            price=price,
-            stock=stock,
-            url=response.url,
-            image_src=image_src,
-            description=description,
-            overview=overview.strip() if overview else "",
-        )
-
-        yield item
-
-    def clean_text_content(self, text_list):
-        """Clean and join text content from CSS selector results"""
-        if not text_list:
-            return ""
-        cleaned_texts = [text.strip() for text in text_list if text.strip()]
-        return ' | '.join(cleaned_texts)
+    store_name = "Rio International"
+
+    # Category listings walked by `manage.py crawl_catalog`
+    catalog_urls = [
+        "https://riointernational.com.bd/category/laptop",
+        "https://riointernational.com.bd/category/desktop-component",
+        "https://riointernational.com.bd/category/monitor",
+        "https://riointernational.com.bd/category/accessories",
+    ]
+    catalog_links = Css(".product h4.product-name a::attr(href)")
+    catalog_pagination = Css(".pagination a::attr(href)")
+
+    plan = ProductPlan(
+        name=Field(
+            "body > div.page-wrapper > main > main > div > div > div > div > div.product.product-single.row > div:nth-child(2) > div > h1::text",
+            "h1::text",
+            ".product-title::text",
+            ".pd-title::text",
+            process=strip,
+            default="",
+        ),
+        price=Field(
+            "body > div.page-wrapper > main > main > div > div > div > div > div.product.product-single.row > div:nth-child(2) > div > div.pd-details-info-top > div.product-price > ins::text",
+            "div.product-price ins::text",
+            "ins.new-price::text",
+            ".price::text",
+            process=currency_amount,
+            default=0,
+        ),
+        image_src=Field(
+            "#swiper-wrapper-9bb561610aeb82103 > div.swiper-slide.swiper-slide-active > div > img:nth-child(1)::attr(src)",
+            "#swiper-wrapper-10a66d980edfa4ccd > div.swiper-slide.swiper-slide-active > div > img:nth-child(1)::attr(src)",
+            "div.swiper-slide.swiper-slide-active > div > img::attr(src)",
+            "img.main-image::attr(src)",
+            "img::attr(src)",
+        ),
+        overview=Field(
+            "body > div.page-wrapper > main > main > div > div > div > div > div.product.product-single.row > div:nth-child(2) > div > div.pd-details-info-top > div.product-short-desc *::text",
+            "div.product-short-desc *::text",
+            first=False,
+            process=joined(" | "),
+            default="",
+        ),
+    )
+
+    def finalize(self, values, response):
+        # Description is left empty and stock assumed, as per user request
+        values["description"] = None
+        values["stock"] = True
+        return values
 
 
 class RioInternationalSpider(scrapy.Spider):
@@ -128,10 +84,7 @@ class RioInternationalSpider(scrapy.Spider):
         yield scrapy.Request(url=search_url, callback=self.parse)
 
     def parse(self, response):
-        try:
-            store = Shop.objects.get(slug="riointernational")
-        except Shop.DoesNotExist:
-            store = Shop.objects.get(name="Rio International")
+        store = get_shop("Rio International")
         
         # Find product cards using the provided selector
         products = response.css('.product')
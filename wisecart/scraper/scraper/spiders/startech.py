@@ -1,75 +1,42 @@
 import re
 import scrapy
-from shops.models import Shop
-from scraper.scraper.items import ProductItem, SearchResultItem
+from scraper.scraper.shop_cache import get_shop
+from scraper.scraper.extraction import ProductPageSpider, ProductPlan, Css, Field, digits_int, joined, strip
+from scraper.scraper.items import SearchResultItem
 
 
-class StartechProductSpider(scrapy.Spider):
+class StartechProductSpider(ProductPageSpider):
     name = "startech_product"
     allowed_domains = ["startech.com.bd"]
-
-    def start_requests(self):
-        url = getattr(self, "url", None)
-        if not url:
-            self.log(
-                "No URL provided. Use -a url='https://www.startech.com.bd/product-name' to search."
-            )
-            return
-        yield scrapy.Request(url=url, callback=self.parse)
-
-    def parse(self, response):
-        # Extract data
-        name = response.css("div.product-short-info h1.product-name::text").get()
-        name = name.strip() if name else None
-        store = Shop.objects.get(name="Startech")
-        # Extract price - prioritize <ins> tag (current price), fallback to any text
-        price_current = response.css("div.product-short-info td.product-price ins::text").get()
-        if not price_current:
-            # Fallback to first available price text if no <ins> tag
-            price_current = response.css("div.product-short-info td.product-price *::text").get()
-        
-        self.logger.info(f"Price extraction - Raw text: {repr(price_current)}")
-        price = self.clean_price(price_current)
-        self.logger.info(f"Price extraction - Cleaned price: {price}")
-        stock = (
-            True
-            if response.css("div.product-short-info td.product-status::text")
-            .get()
-            and response.css("div.product-short-info td.product-status::text")
-            .get()
-            .lower()
-            == "in stock"
-            else False
-        )
-        
-        # Overview: join all text from the overview list using the provided selector
-        overview_list = response.css('#product > div > div.short-description > ul *::text').getall()
-        overview = '\n'.join([t.strip() for t in overview_list if t.strip()]) if overview_list else None
-        # Description: join all text from the description section using the provided selector
-        description_list = response.css('#description > div.full-description *::text').getall()
-        description = '\n'.join([t.strip() for t in description_list if t.strip()]) if description_list else None
-
-        # Create item
-        item = ProductItem(
-            name=name,
-            store_id=store.id,
-            price=price,
-            stock=stock,
-            url=response.url,
-            rating=0,
-            image_src=response.css("img.main-img::attr(src)").get(),
-            description=description,
-            overview=overview
-        )
-        
-        yield item
-
-    def clean_price(self, price_str):
-        """Clean the price string and return an integer value."""
-        if price_str:
-            cleaned_price = re.sub(r"\D", "", price_str.strip())
-            return int(cleaned_price) if cleaned_price else None
-        return None
+    store_name = "Startech"
+
+    # Category listings walked by `manage.py crawl_catalog`
+    catalog_urls = [
+        "https://www.startech.com.bd/component",
+        "https://www.startech.com.bd/laptop-notebook",
+        "https://www.startech.com.bd/monitor",
+        "https://www.startech.com.bd/accessories",
+    ]
+    catalog_links = Css("div.p-item-img a::attr(href)")
+    catalog_pagination = Css("ul.pagination a::attr(href)")
+
+    plan = ProductPlan(
+        name=Field("div.product-short-info h1.product-name::text", process=strip),
+        # Prefer the <ins> (current) price, else the first price text
+        price=Field(
+            "div.product-short-info td.product-price ins::text",
+            "div.product-short-info td.product-price *::text",
+            process=digits_int,
+        ),
+        stock=Field(
+            "div.product-short-info td.product-status::text",
+            process=lambda text: text.lower() == "in stock",
+            default=False,
+        ),
+        image_src=Field("img.main-img::attr(src)"),
+        overview=Field("#product > div > div.short-description > ul *::text", first=False, process=joined("\n")),
+        description=Field("#description > div.full-description *::text", first=False, process=joined("\n")),
+    )
 
 
 class StartechSpider(scrapy.Spider):
@@ -90,7 +57,7 @@ class StartechSpider(scrapy.Spider):
 
     def parse(self, response):
         products = response.css("div.p-item")
-        store = Shop.objects.get(name="Startech")
+        store = get_shop("Startech")
         product_count = 0
 
         for product in products:
@@ -1,106 +1,59 @@
 import scrapy
 import re
 import json
-from scraper.scraper.items import ProductItem, SearchResultItem
-from shops.models import Shop
+from scraper.scraper.extraction import ProductPageSpider, ProductPlan, Css, Field, currency_amount, joined, strip
+from scraper.scraper.items import SearchResultItem
+from scraper.scraper.shop_cache import get_shop
 from search.models import Search
 
 
-class SumashTechProductSpider(scrapy.Spider):
+class SumashTechProductSpider(ProductPageSpider):
     name = "sumashtech_product"
     allowed_domains = ["sumashtech.com"]
-
-    def __init__(self, url=None, *args, **kwargs):
-        super(SumashTechProductSpider, self).__init__(*args, **kwargs)
-        self.start_urls = [url] if url else []
-
-    def parse(self, response):
-        try:
-            store = Shop.objects.get(slug="sumashtech")
-        except Shop.DoesNotExist:
-            store = Shop.objects.get(name="Sumash Tech")
-
-        # Extract product details - using correct selectors from manual analysis
-        # Title selector from manual analysis: div.product__widget > div.main-info > div > h1
-        title = response.css('div.product__widget > div.main-info > div > h1::text').get()
-        if not title:
-            title = response.css('h1::text').get()
-        
-        # Extract price - using the exact selector from manual analysis
-        # First try to get the price from the <b> tag inside the div
-        price_text = response.css('div.single__product_wrapper > div > div > div:nth-child(2) > div > div.product__widget > div.main-info > span:nth-child(2) > div > div b::text').get()
-        
-        # If that fails, try getting it from the div directly
-        if not price_text:
-            price_text = response.css('div.single__product_wrapper > div > div > div:nth-child(2) > div > div.product__widget > div.main-info > span:nth-child(2) > div > div::text').get()
-        
-        # If both fail, try a simpler selector
-        if not price_text:
-            price_text = response.css('div.product__sale_price b::text').get()
-        
-        # Clean price using the same logic as search page
-        if price_text:
-            # First, remove currency symbol and whitespace
-            price_text = re.sub(r'[৳$₹€£]', '', price_text).strip()
-            
-            # Remove commas from the number
-            price_text_no_commas = price_text.replace(',', '')
-            
-            try:
-                # Convert directly to float
-                price = float(price_text_no_commas)
-            except ValueError:
-                # If direct conversion fails, try to extract just the numbers
-                price_matches = re.findall(r'\d+', price_text_no_commas)
-                if price_matches:
-                    price = float(price_matches[0])
-                else:
-                    price = 0
-        else:
-            price = 0
-
-        # Extract image from manual analysis: div.d-lg-block > img
-        image_src = response.css('div.d-lg-block > img::attr(src)').get()
-        if not image_src:
-            image_src = response.css('img::attr(src)').get()
-
-        # Extract description from manual analysis
-        description = response.css('div.container > div > div.col-12.col-sm-12.col-md-12.col-lg-8.order-2.order-sm-2.order-lg-1.order-md-2 > div:nth-child(2) *::text').getall()
-        description = ' '.join(description).strip() if description else ""
-        
-        if not description:
-            # Try alternative selectors
-            description = response.css('div.col-12.col-sm-12.col-md-12.col-lg-8 > div:nth-child(2) *::text').getall()
-            description = ' '.join(description).strip() if description else ""
-        
-        if not description:
-            description = response.css('p::text').get() or ""
-
-        # Extract overview from manual analysis
-        overview = response.css('div.single__product_wrapper > div > div > div:nth-child(2) > div > div.product__widget > div.product__short_description > ul li::text').getall()
-        overview = ' | '.join(overview).strip() if overview else ""
-        
-        if not overview:
-            # Try alternative selectors
-            overview = response.css('div.product__widget > div.product__short_description > ul li::text').getall()
-            overview = ' | '.join(overview).strip() if overview else ""
-        
-        if not overview:
-            overview = response.css('div.product__short_description ul li::text').getall()
-            overview = ' | '.join(overview).strip() if overview else ""
-
-        item = ProductItem(
-            store_id=store.id,
-            name=title.strip() if title else "",
-            price=price,
-            stock=True if price > 0 else False,
-            url=response.url,
-            image_src=image_src,
-            description=description.strip() if description else "",
-            overview=overview.strip() if overview else "",
-        )
-
-        yield item
+    store_name = "Sumash Tech"
+
+    # Category listings walked by `manage.py crawl_catalog`
+    catalog_urls = [
+        "https://www.sumashtech.com/category/laptop",
+        "https://www.sumashtech.com/category/desktop-component",
+        "https://www.sumashtech.com/category/monitor",
+        "https://www.sumashtech.com/category/accessories",
+    ]
+    catalog_links = Css("div.product__items > div > div > div > div > a::attr(href)")
+    catalog_pagination = Css("ul.pagination a::attr(href)")
+
+    # Selectors from manual analysis first, then simpler fallbacks
+    plan = ProductPlan(
+        name=Field("div.product__widget > div.main-info > div > h1::text", "h1::text", process=strip, default=""),
+        price=Field(
+            "div.single__product_wrapper > div > div > div:nth-child(2) > div > div.product__widget > div.main-info > span:nth-child(2) > div > div b::text",
+            "div.single__product_wrapper > div > div > div:nth-child(2) > div > div.product__widget > div.main-info > span:nth-child(2) > div > div::text",
+            "div.product__sale_price b::text",
+            process=currency_amount,
+            default=0,
+        ),
+        image_src=Field("div.d-lg-block > img::attr(src)", "img::attr(src)"),
+        description=Field(
+            "div.container > div > div.col-12.col-sm-12.col-md-12.col-lg-8.order-2.order-sm-2.order-lg-1.order-md-2 > div:nth-child(2) *::text",
+            "div.col-12.col-sm-12.col-md-12.col-lg-8 > div:nth-child(2) *::text",
+            Css("p::text", first=True),
+            first=False,
+            process=joined(" "),
+            default="",
+        ),
+        overview=Field(
+            "div.single__product_wrapper > div > div > div:nth-child(2) > div > div.product__widget > div.product__short_description > ul li::text",
+            "div.product__widget > div.product__short_description > ul li::text",
+            "div.product__short_description ul li::text",
+            first=False,
+            process=joined(" | "),
+            default="",
+        ),
+    )
+
+    def finalize(self, values, response):
+        values["stock"] = values["price"] > 0
+        return values
 
 
 class SumashTechSpider(scrapy.Spider):
@@ -127,10 +80,7 @@ class SumashTechSpider(scrapy.Spider):
         yield scrapy.Request(url=search_url, callback=self.parse)
 
     def parse(self, response):
-        try:
-            store = Shop.objects.get(slug="sumashtech")
-        except Shop.DoesNotExist:
-            store = Shop.objects.get(name="Sumash Tech")
+        store = get_shop("Sumash Tech")
         
         # Find product cards - using correct selectors from manual analysis
         products = response.css('div.product__items > div > div')
@@ -1,80 +1,50 @@
 import re
 import scrapy
-from shops.models import Shop
-from scraper.scraper.items import ProductItem, SearchResultItem
+from scraper.scraper.shop_cache import get_shop
+from scraper.scraper.extraction import ProductPageSpider, ProductPlan, Css, Field, digits_int, joined, strip
+from scraper.scraper.items import SearchResultItem
 
-class TechLandProductSpider(scrapy.Spider):
+class TechLandProductSpider(ProductPageSpider):
     name = "techland_product"
     allowed_domains = ["techlandbd.com"]
+    store_name = "TechLand"
+    headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"}
 
-    def start_requests(self):
-        url = getattr(self, "url", None)
-        if not url:
-            self.log(
-                "No URL provided. Use -a url='https://www.techlandbd.com/product-name' to search."
-            )
-            return
-        yield scrapy.Request(
-            url=url,
-            callback=self.parse,
-            headers={"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"}
-        )
+    # Category listings walked by `manage.py crawl_catalog`
+    catalog_urls = [
+        "https://www.techlandbd.com/pc-components",
+        "https://www.techlandbd.com/shop-laptop-computer",
+        "https://www.techlandbd.com/monitor",
+        "https://www.techlandbd.com/accessories",
+    ]
+    catalog_links = Css("div.p-4.flex-grow > div > a::attr(href)")
+    catalog_pagination = Css('nav[role="navigation"] a::attr(href)')
 
-    def parse(self, response):
-        # Try multiple selectors for the product name
-        name = response.css('h1.text-xl.sm\\:text-2xl.md\\:text-3xl.font-bold.text-gray-800::text').get()
-        if not name:
-            name = response.css('h1::text').get()
-        if not name:
-            name = response.css('.product-title::text').get()
-        if not name:
-            # Fallback - try any h1 tag
-            name = response.css('h1::text').get()
-        
-        name = name.strip() if name else "TechLand Product"  # Fallback name if nothing found
-        
-        store = Shop.objects.get(name="TechLand")
-        price = self.clean_price(
-            response.css('span.text-lg.sm\\:text-xl.lg\\:text-2xl.font-bold.text-\\[\\#1c4289\\]::text').get()
-        )
-        
-        stock_section_html = response.css('div.pt-2.text-sm').get()
-        
-        stock_text = response.css('span.text-green-600::text').get()
-        if not stock_text:
-            stock_text = response.css('span:contains("Stock")::text').get()
-        
-        stock = stock_text and ('in stock' in stock_text.lower())
-        
-        image_src = response.css('#main-image::attr(src)').get()
-        if not image_src:
-            image_src = response.css('img[alt*="product"]::attr(src)').get()
-        
-        # Overview: extract all <li> text from the overview div
-        overview_list = response.css('div.text-xs.sm\\:text-sm.text-gray-600.break-words li::text').getall()
-        overview = '\n'.join([t.strip() for t in overview_list if t.strip()]) if overview_list else None
-        
-        description_list = response.css('#description-tab > div *::text').getall()
-        description = '\n'.join([t.strip() for t in description_list if t.strip()]) if description_list else None
-        
-        item = ProductItem(
-            name=name,
-            store_id=store.id,
-            price=price,
-            stock=stock,
-            url=response.url,
-            rating=0,
-            image_src=image_src,
-            description=description,
-            overview=overview
-        )
-        yield item
-
-    def clean_price(self, price_str):
-        if price_str:
-            cleaned_price = re.sub(r"\D", "", price_str.strip())
-            return int(cleaned_price) if cleaned_price else None
-        return None
+    plan = ProductPlan(
+        name=Field(
+            "h1.text-xl.sm\\:text-2xl.md\\:text-3xl.font-bold.text-gray-800::text",
+            "h1::text",
+            ".product-title::text",
+            process=strip,
+            default="TechLand Product",
+        ),
+        price=Field(
+            "span.text-lg.sm\\:text-xl.lg\\:text-2xl.font-bold.text-\\[\\#1c4289\\]::text",
+            process=digits_int,
+        ),
+        stock=Field(
+            "span.text-green-600::text",
+            'span:contains("Stock")::text',
+            process=lambda text: "in stock" in text.lower(),
+        ),
+        image_src=Field("#main-image::attr(src)", 'img[alt*="product"]::attr(src)'),
+        overview=Field(
+            "div.text-xs.sm\\:text-sm.text-gray-600.break-words li::text",
+            first=False,
+            process=joined("\n"),
+        ),
+        description=Field("#description-tab > div *::text", first=False, process=joined("\n")),
+    )
 
 class TechLandSpider(scrapy.Spider):
     name = "techland"
@@ -100,7 +70,7 @@ class TechLandSpider(scrapy.Spider):
 
     def parse(self, response):
         products = response.css('div.grid.grid-cols-2.md\:grid-cols-5.gap-4 > div')
-        store = Shop.objects.get(name="TechLand")
+        store = get_shop("TechLand")
         product_count = 0
         
         for product in products:
@@ -1,7 +1,8 @@
 import re
 import scrapy
-from shops.models import Shop
-from scraper.scraper.items import ProductItem, SearchResultItem
+from scraper.scraper.shop_cache import get_shop
+from scraper.scraper.extraction import ProductPageSpider, ProductPlan, Css, Field, decimal_float, joined, present, strip
+from scraper.scraper.items import SearchResultItem
 
 class UCCSpider(scrapy.Spider):
     name = "ucc"
@@ -27,7 +28,7 @@ class UCCSpider(scrapy.Spider):
     def parse(self, response):
         # Use provided selector for product container
         products = response.css('#content > div.main-products-wrapper > div.main-products.product-grid > div')
-        store = Shop.objects.get(name="UCC")
+        store = get_shop("UCC")
         product_count = 0
         
         for product in products:
@@ -66,69 +67,52 @@ class UCCSpider(scrapy.Spider):
         except Exception:
             return None
 
-class UCCProductSpider(scrapy.Spider):
+class UCCProductSpider(ProductPageSpider):
     name = "ucc_product"
     allowed_domains = ["ucc.com.bd"]
     custom_settings = {
         "ITEM_PIPELINES": {"scraper.scraper.pipelines.DjangoPipeline": 300}
     }
+    store_name = "UCC"
+    headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"}
+
+    # Category listings walked by `manage.py crawl_catalog`
+    catalog_urls = [
+        "https://www.ucc.com.bd/laptop",
+        "https://www.ucc.com.bd/desktop-components",
+        "https://www.ucc.com.bd/monitor",
+        "https://www.ucc.com.bd/accessories",
+    ]
+    catalog_links = Css("div.main-products div.caption > div.name a::attr(href)")
+    catalog_pagination = Css("ul.pagination a::attr(href)")
+
+    plan = ProductPlan(
+        name=Field("#product > div.title.page-title::text", process=strip),
+        price=Field("#product > div.product-price-group > div > div.price-group > div::text", process=decimal_float),
+        stock=Field(
+            "#product > div.product-stats > ul > li.product-stock.in-stock > b",
+            first=False,
+            process=present,
+            default=False,
+        ),
+        image_src=Field("div.product-image img::attr(src)"),
+        overview=Field(
+            "#product > div.button-group-page > div.short_description_product-page > div > ul *::text",
+            first=False,
+            process=joined("\n"),
+        ),
+        description=Field(
+            "#blocks-6881f58164c28-tab-1 > div > div.block-wrapper > div *::text",
+            first=False,
+            process=joined("\n"),
+        ),
+    )
 
     def __init__(self, url=None, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.url = url
 
-    def start_requests(self):
-        url = getattr(self, "url", None)
-        if not url:
-            self.log("No URL provided. Use -a url='https://www.ucc.com.bd/product-name' to search.")
-            return
-        yield scrapy.Request(
-            url=url,
-            callback=self.parse,
-            headers={"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"}
-        )
-
-    def parse(self, response):
-        # Name
-        name = response.css('#product > div.title.page-title::text').get()
-        name = name.strip() if name else None
-        store = Shop.objects.get(name="UCC")
-        # Price
-        price = response.css('#product > div.product-price-group > div > div.price-group > div::text').get()
-        price = self.clean_price(price)
-        # Stock: Check for in-stock class using the specific selector
-        in_stock_element = response.css('#product > div.product-stats > ul > li.product-stock.in-stock > b').get()
-        stock = bool(in_stock_element)
-        # Main image: select the first image in the product-image container
-        image = response.css('div.product-image img::attr(src)').get()
-        # Overview: join all text from the overview list
-        overview_list = response.css('#product > div.button-group-page > div.short_description_product-page > div > ul *::text').getall()
-        overview = '\n'.join([t.strip() for t in overview_list if t.strip()]) if overview_list else None
-        # Description: join all text from the description div (using flexible selector)
-        description_list = response.css('#blocks-6881f58164c28-tab-1 > div > div.block-wrapper > div *::text').getall()
-        description = '\n'.join([t.strip() for t in description_list if t.strip()]) if description_list else None
-        # Yield ProductItem
-        try:
-            item = ProductItem()
-            item["name"] = name
-            item["price"] = price
-            item["stock"] = stock
-            item["image_src"] = image
-            item["overview"] = overview
-            item["description"] = description
-            item["url"] = self.url  # Always use the original URL passed to the spider
-            item["store_id"] = 8  # UCC shop id, update if different in your DB
-            yield item
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
-
-    @staticmethod
-    def clean_price(price):
-        if not price:
-            return None
-        price = re.sub(r"[^0-9.]", "", price)
-        try:
-            return float(price)
-        except Exception:
-            return None 
\ No newline at end of file
+    def finalize(self, values, response):
+        # Always use the original URL passed to the spider (catalog crawls have none)
+        values["url"] = self.url or response.url
+        return values
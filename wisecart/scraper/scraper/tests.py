@@ -0,0 +1,241 @@
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from scrapy.exceptions import DropItem
+from scrapy.http import HtmlResponse, Request
+
+from products.models import PriceObservation, Product
+from scraper.scraper import shop_cache
+
+from scraper.scraper.extraction import (
+    Css,
+    Field,
+    ProductPlan,
+    currency_amount,
+    digits_int,
+    joined,
+    strip,
+)
+from scraper.scraper.items import ProductItem
+from scraper.scraper.middlewares import NotModified, RevalidationMiddleware
+from scraper.scraper.pipelines import DjangoPipeline
+from scraper.scraper.spiders.startech import StartechProductSpider
+from shops.models import Shop
+
+
+class Stats(dict):
+    """Just enough of a Scrapy stats collector for ProductPlan and the pipelines."""
+
+    def __bool__(self):
+        # A collector is truthy even before anything was counted
+        return True
+
+    def inc_value(self, key, count=1, spider=None):
+        self[key] = self.get(key, 0) + count
+
+
+def page(body):
+    return HtmlResponse("https://shop.test/p", body=body, encoding="utf-8")
+
+
+class ExtractionPlanTests(SimpleTestCase):
+    def test_first_selector_with_a_value_wins_and_is_counted(self):
+        plan = ProductPlan(
+            price=Field("span.sale::text", "span.price::text", process=digits_int),
+        )
+        stats = Stats()
+        values = plan.extract(page("<span class='price'>৳1,200</span>"), stats=stats)
+        self.assertEqual(values, {"price": 1200})
+        self.assertEqual(stats, {"extraction/price/selector_1": 1})
+
+    def test_empty_processed_value_falls_through_to_the_next_selector(self):
+        field = Field("h1::text", "h2::text", process=strip)
+        self.assertEqual(field.extract(page("<h1>  </h1><h2> Mouse </h2>").selector.root), ("Mouse", 1))
+
+    def test_default_and_missing_count_when_nothing_matches(self):
+        plan = ProductPlan(stock=Field("td.status::text", default=False))
+        stats = Stats()
+        self.assertEqual(plan.extract(page("<p>Call</p>"), stats=stats), {"stock": False})
+        self.assertEqual(stats, {"extraction/stock/missing": 1})
+
+    def test_first_false_hands_every_match_to_the_processor(self):
+        field = Field("li::text", first=False, process=joined("\n"))
+        root = page("<ul><li> a </li><li></li><li>b</li></ul>").selector.root
+        self.assertEqual(field.extract(root), ("a\nb", 0))
+
+    def test_selector_can_override_first(self):
+        field = Field(Css("li::text", first=False), process=len)
+        self.assertEqual(field.extract(page("<ul><li>a</li><li>b</li></ul>").selector.root), (2, 0))
+
+    def test_price_processors(self):
+        self.assertEqual(digits_int(" 1,850৳ "), 1850)
+        self.assertIsNone(digits_int("Call for price"))
+        self.assertEqual(currency_amount("৳ 1,250.50"), 1250.5)
+        self.assertEqual(currency_amount("Up to 900 Tk"), 900)
+
+
+class ShopCacheTests(TestCase):
+    def setUp(self):
+        shop_cache.clear()
+        self.addCleanup(shop_cache.clear)
+        self.shop = Shop.objects.create(
+            name="Startech", mod_comment="", description="", all_domains="", address=""
+        )
+
+    def test_shops_are_looked_up_by_id_slug_or_name_in_one_query(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(shop_cache.get_shop(self.shop.id), self.shop)
+            self.assertEqual(shop_cache.get_shop(self.shop.slug), self.shop)
+            self.assertEqual(shop_cache.get_shop("STARTECH"), self.shop)
+
+    def test_unknown_keys_reload_once(self):
+        shop_cache.get_shop("Startech")
+        with self.assertNumQueries(1):
+            for _ in range(3):
+                with self.assertRaises(Shop.DoesNotExist):
+                    shop_cache.get_shop("Ryans")
+
+    def test_saving_a_shop_makes_it_findable(self):
+        with self.assertRaises(Shop.DoesNotExist):
+            shop_cache.get_shop("Ryans")
+        Shop.objects.create(name="Ryans", mod_comment="", description="", all_domains="", address="")
+        self.assertEqual(shop_cache.get_shop("Ryans").name, "Ryans")
+
+
+class DjangoPipelineTests(TestCase):
+    url = "https://www.startech.com.bd/g102"
+
+    def setUp(self):
+        shop_cache.clear()
+        self.addCleanup(shop_cache.clear)
+        self.shop = Shop.objects.create(
+            name="Startech", mod_comment="", description="", all_domains="", address=""
+        )
+        self.spider = StartechProductSpider()
+
+    def item(self, **values):
+        defaults = {
+            "name": "Logitech G102",
+            "price": 1850,
+            "stock": True,
+            "rating": 0,
+            "image_src": None,
+            "description": "",
+            "overview": "8000 DPI",
+            "url": self.url,
+            "store_id": self.shop.id,
+        }
+        return ProductItem(**{**defaults, **values})
+
+    def scrape(self, *items):
+        stats = Stats()
+        pipeline = DjangoPipeline(stats=stats)
+        for item in items:
+            pipeline.process_item(item, self.spider)
+        pipeline.close_spider(self.spider)
+        return stats
+
+    def test_new_products_are_created(self):
+        stats = self.scrape(self.item())
+        product = Product.objects.get()
+        self.assertEqual(product.name, "Logitech G102")
+        self.assertEqual(product.price, 1850)
+        self.assertEqual(stats["products/created"], 1)
+
+    def test_rescraping_the_same_values_leaves_the_row_unchanged(self):
+        self.scrape(self.item())
+        Product.objects.update(description=None)
+        stats = self.scrape(self.item())
+        self.assertEqual(stats["products/unchanged"], 1)
+        self.assertEqual(stats["products/updated"], 0)
+
+    def test_changed_products_get_their_new_values(self):
+        self.scrape(self.item())
+        stats = self.scrape(self.item(price=1799, stock=False))
+        product = Product.objects.get()
+        self.assertEqual((product.price, product.stock), (1799, False))
+        self.assertEqual(stats["products/updated"], 1)
+        self.assertEqual(stats["products/created"], 0)
+
+    def test_later_items_for_the_same_url_win(self):
+        self.scrape(self.item(price=1900), self.item(price=1850))
+        self.assertEqual(Product.objects.get().price, 1850)
+
+    def test_encodings_of_the_same_page_share_a_row(self):
+        self.scrape(self.item(url="HTTPS://www.startech.com.bd/g102?b=2&a=1#reviews"))
+        stats = self.scrape(self.item(url="https://www.startech.com.bd/g102?a=1&b=2", price=1799))
+
+        product = Product.objects.get()
+        self.assertEqual(product.url, "https://www.startech.com.bd/g102?b=2&a=1")
+        self.assertEqual(product.price, 1799)
+        self.assertEqual(stats["products/updated"], 1)
+
+    def test_price_history_is_only_written_when_price_or_stock_changes(self):
+        self.scrape(self.item())
+        self.scrape(self.item(overview="8000 DPI, RGB"))
+        stats = self.scrape(self.item(price=1799))
+
+        history = PriceObservation.objects.order_by("observed_at", "id")
+        self.assertEqual([observation.price for observation in history], [1850, 1799])
+        self.assertEqual(stats["products/price_changes"], 1)
+
+    def test_items_without_a_url_are_dropped_and_counted(self):
+        stats = Stats()
+        pipeline = DjangoPipeline(stats=stats)
+        with self.assertRaises(DropItem):
+            pipeline.process_item(self.item(url=None), self.spider)
+        self.assertEqual(stats, {"products/dropped_no_url": 1})
+
+
+class RevalidationMiddlewareTests(TestCase):
+    url = "https://www.startech.com.bd/g102"
+    body = b"<html><h1>Logitech G102</h1></html>"
+
+    def setUp(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        self.stats = Stats()
+        self.middleware = RevalidationMiddleware(cache_dir, self.stats)
+        self.spider = StartechProductSpider()
+
+    def fetch(self, status, body=b"", meta=None, **headers):
+        request = Request(self.url, meta=meta or {})
+        self.middleware.process_request(request, self.spider)
+        response = HtmlResponse(self.url, status=status, body=body, headers=headers, request=request)
+        return request, self.middleware.process_response(request, response, self.spider)
+
+    def test_cached_pages_are_requested_conditionally(self):
+        self.fetch(200, self.body, ETag='"v1"')
+        request, _ = self.fetch(200, self.body)
+        self.assertEqual(request.headers.get("If-None-Match"), b'"v1"')
+
+    def test_not_modified_bumps_the_product_and_drops_the_response(self):
+        shop = Shop.objects.create(
+            name="Startech", mod_comment="", description="", all_domains="", address=""
+        )
+        product = Product.objects.create(name="Logitech G102", store=shop, price=1850, url=self.url)
+        day_old = timezone.now() - timedelta(days=1)
+        Product.objects.filter(pk=product.pk).update(last_updated=day_old)
+        self.fetch(200, self.body, ETag='"v1"')
+
+        with self.assertRaises(NotModified):
+            self.fetch(304)
+        product.refresh_from_db()
+        self.assertGreater(product.last_updated, day_old)
+        self.assertEqual(self.stats["revalidation/not_modified"], 1)
+        self.assertEqual(self.stats["revalidation/bytes_saved"], len(self.body))
+
+    def test_not_modified_without_a_product_replays_the_cached_page(self):
+        self.fetch(200, self.body, ETag='"v1"')
+        _, response = self.fetch(304)
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.body, self.body)
+
+    def test_dont_cache_requests_are_left_alone(self):
+        self.fetch(200, self.body, meta={"dont_cache": True}, ETag='"v1"')
+        request, response = self.fetch(304)
+        self.assertNotIn("If-None-Match", request.headers)
+        self.assertEqual(response.status, 304)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Search, SearchResult
+from .models import Search, SearchResult, SearchCache, TrendingSearch
 
 @admin.register(Search)
 class SearchAdmin(admin.ModelAdmin):
@@ -15,4 +15,21 @@ class SearchResultAdmin(admin.ModelAdmin):
     def get_query(self, obj):
         return obj.search.query
     get_query.short_description = 'Search Query'
-    get_query.admin_order_field = 'search__query'
\ No newline at end of file
+    get_query.admin_order_field = 'search__query'
+
+@admin.register(SearchCache)
+class SearchCacheAdmin(admin.ModelAdmin):
+    list_display = ('normalized_query', 'refreshed_at', 'hits', 'misses', 'hit_rate')
+    search_fields = ['normalized_query']
+    readonly_fields = ('hits', 'misses')
+
+    def hit_rate(self, obj):
+        total = obj.hits + obj.misses
+        return f"{obj.hits / total:.0%}" if total else "-"
+    hit_rate.short_description = 'Hit Rate'
+
+@admin.register(TrendingSearch)
+class TrendingSearchAdmin(admin.ModelAdmin):
+    list_display = ('query', 'bucket', 'searches', 'lowest_price')
+    list_filter = ('bucket',)
+    search_fields = ['query', 'normalized_query']
@@ -0,0 +1,95 @@
+"""Search the local product catalog before scraping the stores.
+
+Every product page we scrape ends up in ``Product``, so popular queries can
+often be answered from it in milliseconds. On Postgres this uses the full-text
+and trigram indexes on ``Product``; other databases fall back to a plain
+``icontains`` match on the name.
+"""
+import logging
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db import connection, transaction
+from django.db.models import Q
+
+from products.models import Product, SEARCH_VECTOR
+from wisecart.freshness import get_policy
+from .models import SearchResult, SearchCache
+
+logger = logging.getLogger(__name__)
+
+CATALOG_MIN_RESULTS = getattr(settings, "CATALOG_MIN_RESULTS", 10)
+CATALOG_MIN_STORES = getattr(settings, "CATALOG_MIN_STORES", 3)
+CATALOG_MAX_RESULTS = getattr(settings, "CATALOG_MAX_RESULTS", 60)
+
+PRODUCT_POLICY = get_policy("product")
+
+
+def _uses_full_text():
+    return connection.vendor == "postgresql"
+
+
+def catalog_search(query, limit=CATALOG_MAX_RESULTS):
+    """Return fresh, priced products matching ``query``, best matches first."""
+    products = Product.objects.filter(
+        last_updated__gte=PRODUCT_POLICY.fresh_since(), price__isnull=False
+    ).select_related("store")
+
+    if _uses_full_text():
+        search_query = SearchQuery(query, search_type="websearch", config="english")
+        products = (
+            products.annotate(
+                search=SEARCH_VECTOR,
+                rank=SearchRank(SEARCH_VECTOR, search_query),
+                similarity=TrigramSimilarity("name", query),
+            )
+            .filter(Q(search=search_query) | Q(name__trigram_similar=query))
+            .order_by("-rank", "-similarity")
+        )
+    else:
+        for term in query.split():
+            products = products.filter(name__icontains=term)
+
+    return list(products[:limit])
+
+
+def answer_from_catalog(search_obj):
+    """Fill ``search_obj`` with catalog matches if they cover the query well.
+
+    Coverage is good when at least CATALOG_MIN_RESULTS products from
+    CATALOG_MIN_STORES different stores match. The matches are stored as the
+    search's results and shared through SearchCache like a finished crawl,
+    dated by the oldest product used so they age with the data behind them.
+    Returns True if the search was answered.
+    """
+    products = catalog_search(search_obj.query)
+    store_count = len({product.store_id for product in products})
+    if len(products) < CATALOG_MIN_RESULTS or store_count < CATALOG_MIN_STORES:
+        logger.info(
+            f"Catalog has {len(products)} matches from {store_count} stores for "
+            f"'{search_obj.query}', scraping instead"
+        )
+        return False
+
+    with transaction.atomic():
+        SearchResult.objects.filter(search=search_obj).delete()
+        SearchResult.objects.bulk_create(
+            SearchResult(
+                search=search_obj,
+                title=product.name,
+                rating=product.rating,
+                stock=bool(product.stock),
+                url=product.url,
+                price=product.price,
+                store=product.store,
+            )
+            for product in products
+        )
+        SearchCache.refresh(
+            search_obj, refreshed_at=min(product.last_updated for product in products)
+        )
+
+    logger.info(
+        f"Answered '{search_obj.query}' from the catalog: {len(products)} products from {store_count} stores"
+    )
+    return True
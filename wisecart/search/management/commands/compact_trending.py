@@ -0,0 +1,77 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Min
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from search.models import Search, TrendingSearch
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Drop trending-search buckets past the retention window and optionally "
+        "rebuild recent buckets from the Search log"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--keep-days",
+            type=int,
+            default=30,
+            help="Delete hourly buckets older than this many days",
+        )
+        parser.add_argument(
+            "--rebuild-days",
+            type=int,
+            default=0,
+            help=(
+                "Recompute the buckets of the last N days from Search rows. Repeat "
+                "searches by the same user only keep their latest time, so this "
+                "undercounts compared to the live rollup"
+            ),
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        cutoff = TrendingSearch.bucket_for(now - timedelta(days=options["keep_days"]))
+        deleted, _ = TrendingSearch.objects.filter(bucket__lt=cutoff).delete()
+        self.stdout.write(f"Deleted {deleted} trending buckets older than {cutoff:%Y-%m-%d %H:00}")
+
+        if options["rebuild_days"]:
+            since = TrendingSearch.bucket_for(now - timedelta(days=options["rebuild_days"]))
+            rebuilt = self.rebuild(since)
+            self.stdout.write(f"Rebuilt {rebuilt} trending buckets since {since:%Y-%m-%d %H:00}")
+
+    def rebuild(self, since):
+        rows = (
+            Search.objects.filter(time__gte=since)
+            .annotate(bucket=TruncHour("time"))
+            .values("bucket", "query")
+            .annotate(searches=Count("id", distinct=True), lowest_price=Min("results__price"))
+        )
+
+        # Fold spelling variants of the same query into one bucket row
+        buckets = defaultdict(lambda: {"searches": 0, "lowest_price": None})
+        for row in rows:
+            entry = buckets[(row["bucket"], Search.normalize_query(row["query"]))]
+            entry["query"] = row["query"]
+            entry["searches"] += row["searches"]
+            if row["lowest_price"] is not None and (
+                entry["lowest_price"] is None or row["lowest_price"] < entry["lowest_price"]
+            ):
+                entry["lowest_price"] = row["lowest_price"]
+
+        with transaction.atomic():
+            TrendingSearch.objects.filter(bucket__gte=since).delete()
+            TrendingSearch.objects.bulk_create(
+                TrendingSearch(bucket=bucket, normalized_query=normalized, **entry)
+                for (bucket, normalized), entry in buckets.items()
+            )
+        logger.info(f"Rebuilt {len(buckets)} trending buckets from Search rows")
+        return len(buckets)
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.3 on 2026-10-18 14:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0003_alter_searchresult_url'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('normalized_query', models.CharField(max_length=255, unique=True)),
+                ('refreshed_at', models.DateTimeField(blank=True, null=True)),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('misses', models.PositiveIntegerField(default=0)),
+                ('search', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='search.search')),
+            ],
+            options={
+                'verbose_name': 'Search Cache',
+                'verbose_name_plural': 'Search Cache',
+            },
+        ),
+    ]
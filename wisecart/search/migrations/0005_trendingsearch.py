@@ -0,0 +1,29 @@
+# Generated by Django 5.1.3 on 2026-10-18 15:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0004_searchcache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingSearch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField()),
+                ('normalized_query', models.CharField(max_length=255)),
+                ('query', models.CharField(max_length=255)),
+                ('searches', models.PositiveIntegerField(default=0)),
+                ('lowest_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+            ],
+            options={
+                'verbose_name': 'Trending Search',
+                'verbose_name_plural': 'Trending Searches',
+                'unique_together': {('bucket', 'normalized_query')},
+            },
+        ),
+    ]
@@ -1,5 +1,9 @@
+from datetime import timedelta
+
 from django.db import models
+from django.utils import timezone
 from shops.models import Shop  # Make sure this import path is correct
+from wisecart.rollups import add_to_rollup
 
 
 class Search(models.Model):
@@ -16,6 +20,11 @@ class Search(models.Model):
     def __str__(self):
         return f"Search: {self.query}"
 
+    @staticmethod
+    def normalize_query(query):
+        """Case-fold, collapse whitespace and sort tokens so equivalent queries match."""
+        return " ".join(sorted(query.casefold().split()))
+
 
 class SearchResult(models.Model):
     search = models.ForeignKey(Search, on_delete=models.CASCADE, related_name="results")
@@ -53,3 +62,120 @@ class SearchResult(models.Model):
     @classmethod
     def rating_low_to_high(cls):
         return cls.objects.order_by('rating')
+
+
+class SearchCache(models.Model):
+    """Cross-user pointer to the latest scraped results for a normalized query"""
+    normalized_query = models.CharField(max_length=255, unique=True)
+    search = models.ForeignKey(
+        Search,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    refreshed_at = models.DateTimeField(null=True, blank=True)
+    hits = models.PositiveIntegerField(default=0)
+    misses = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Search Cache"
+        verbose_name_plural = "Search Cache"
+
+    def __str__(self):
+        return f"Cache: {self.normalized_query}"
+
+    def record_hit(self):
+        SearchCache.objects.filter(pk=self.pk).update(hits=models.F("hits") + 1)
+
+    def record_miss(self):
+        SearchCache.objects.filter(pk=self.pk).update(misses=models.F("misses") + 1)
+
+    @classmethod
+    def refresh(cls, search, refreshed_at=None):
+        """Point the cache entry for this search's query at its fresh results.
+
+        ``refreshed_at`` is when the results' data was scraped (default now).
+        """
+        cls.objects.update_or_create(
+            normalized_query=Search.normalize_query(search.query),
+            defaults={"search": search, "refreshed_at": refreshed_at or timezone.now()},
+        )
+
+
+class TrendingSearch(models.Model):
+    """Hourly rollup of how often a normalized query was searched.
+
+    Kept up to date as searches happen so trending lists read a handful of
+    bucket rows instead of grouping over every Search. ``compact_trending``
+    drops old buckets and can rebuild recent ones from Search.
+    """
+    bucket = models.DateTimeField()
+    normalized_query = models.CharField(max_length=255)
+    query = models.CharField(max_length=255)
+    searches = models.PositiveIntegerField(default=0)
+    lowest_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+
+    class Meta:
+        unique_together = ("bucket", "normalized_query")
+        verbose_name = "Trending Search"
+        verbose_name_plural = "Trending Searches"
+
+    def __str__(self):
+        return f"{self.query} ({self.searches}) @ {self.bucket:%Y-%m-%d %H:00}"
+
+    @staticmethod
+    def bucket_for(when):
+        return when.replace(minute=0, second=0, microsecond=0)
+
+    @staticmethod
+    def _lower_price(price):
+        return models.Case(
+            models.When(
+                models.Q(lowest_price__isnull=True) | models.Q(lowest_price__gt=price),
+                then=models.Value(price),
+            ),
+            default=models.F("lowest_price"),
+            output_field=models.DecimalField(max_digits=10, decimal_places=2),
+        )
+
+    @classmethod
+    def record(cls, query, min_price=None):
+        """Count one search for ``query`` in the current hour bucket."""
+        updates = {"query": query, "searches": models.F("searches") + 1}
+        if min_price is not None:
+            updates["lowest_price"] = cls._lower_price(min_price)
+        add_to_rollup(
+            cls,
+            key={
+                "bucket": cls.bucket_for(timezone.now()),
+                "normalized_query": Search.normalize_query(query),
+            },
+            updates=updates,
+            initial={"query": query, "searches": 1, "lowest_price": min_price},
+        )
+
+    @classmethod
+    def record_price(cls, query, price):
+        """Lower this hour's min price for ``query`` once its results are known."""
+        if price is None:
+            return
+        cls.objects.filter(
+            bucket=cls.bucket_for(timezone.now()),
+            normalized_query=Search.normalize_query(query),
+        ).update(lowest_price=cls._lower_price(price))
+
+    @classmethod
+    def top(cls, limit, days=7):
+        """Most searched queries over the last ``days``, with their lowest price."""
+        since = cls.bucket_for(timezone.now() - timedelta(days=days))
+        return (
+            cls.objects.filter(bucket__gte=since)
+            .values("normalized_query")
+            .annotate(
+                search_term=models.Max("query"),
+                search_count=models.Sum("searches"),
+                min_price=models.Min("lowest_price"),
+            )
+            .order_by("-search_count")[:limit]
+        )
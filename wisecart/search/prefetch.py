@@ -0,0 +1,155 @@
+"""Speculative prefetch of product pages for the top search results.
+
+Most people open one of the cheapest few results, and without a fresh
+``Product`` row that click blocks on a product crawl. Once a results page
+has been served, the cheapest ``PREFETCH_TOP_N`` results of each store are
+crawled in the background so the click usually finds one.
+
+Prefetches are low priority: with the scrape job queue they are queued below
+every other job; otherwise at most ``PREFETCH_CONCURRENCY`` of them run per
+store at a time, next to whatever crawls requests start themselves. Each
+store also has a budget of ``PREFETCH_PER_STORE_PER_MINUTE`` prefetches
+(overridable per store slug in ``PREFETCH_BUDGETS``), counted in the Django
+cache; configure a shared cache for the budget to hold across processes.
+"""
+import logging
+import time
+
+from crochet import setup, run_in_reactor
+from django.conf import settings
+from django.core.cache import cache
+from twisted.internet import defer, threads
+
+from jobs.models import ScrapeJob
+from products.models import Product, url_key
+from wisecart.freshness import get_policy
+from wisecart.singleflight import in_flight
+
+logger = logging.getLogger(__name__)
+setup()
+
+PREFETCH_ENABLED = getattr(settings, "PREFETCH_ENABLED", False)
+PREFETCH_TOP_N = getattr(settings, "PREFETCH_TOP_N", 3)
+PREFETCH_PER_STORE_PER_MINUTE = getattr(settings, "PREFETCH_PER_STORE_PER_MINUTE", 10)
+PREFETCH_BUDGETS = getattr(settings, "PREFETCH_BUDGETS", {})
+PREFETCH_CONCURRENCY = getattr(settings, "PREFETCH_CONCURRENCY", 1)
+
+SCRAPE_JOBS_ENABLED = getattr(settings, "SCRAPE_JOBS_ENABLED", False)
+
+PRODUCT_POLICY = get_policy("product")
+
+# Store id -> DeferredSemaphore limiting in-process prefetch crawls
+_slots = {}
+
+
+def top_results(results, per_store=PREFETCH_TOP_N):
+    """The cheapest ``per_store`` priced results of each store."""
+    picked = {}
+    for result in sorted(
+        (result for result in results if result.price is not None), key=lambda r: r.price
+    ):
+        store_results = picked.setdefault(result.store_id, [])
+        if len(store_results) < per_store:
+            store_results.append(result)
+    return [result for store_results in picked.values() for result in store_results]
+
+
+def take_budget(store):
+    """Count one prefetch against ``store``'s budget for this minute.
+
+    Returns False once the budget is spent.
+    """
+    budget = PREFETCH_BUDGETS.get(store.slug, PREFETCH_PER_STORE_PER_MINUTE)
+    if budget <= 0:
+        return False
+    key = f"prefetch:{store.pk}:{int(time.time() // 60)}"
+    cache.add(key, 0, timeout=120)
+    try:
+        return cache.incr(key) <= budget
+    except ValueError:
+        # Evicted between add() and incr()
+        cache.set(key, 1, timeout=120)
+        return True
+
+
+def needs_fetch(results):
+    """Drop results whose product is already fresh or being crawled."""
+    fresh = set(
+        Product.objects.filter(
+            url_key__in=[url_key(result.url) for result in results],
+            last_updated__gte=PRODUCT_POLICY.fresh_since(),
+        ).values_list("url_key", flat=True)
+    )
+    return [
+        result
+        for result in results
+        if url_key(result.url) not in fresh and not in_flight("product", url_key(result.url))
+    ]
+
+
+def _crawl_when_free(product_url, store):
+    from scraper.scraper.crawl import crawl_product
+
+    def is_fresh():
+        return Product.objects.for_url(product_url).filter(
+            last_updated__gte=PRODUCT_POLICY.fresh_since()
+        ).exists()
+
+    def crawl():
+        # A click may have crawled it while this one waited for a slot
+        return threads.deferToThread(is_fresh).addCallback(
+            lambda fresh: None if fresh else crawl_product(product_url, store)
+        )
+
+    def failed(failure):
+        logger.warning(f"Prefetch of {product_url} failed: {failure.getErrorMessage()}")
+
+    slots = _slots.setdefault(store.pk, defer.DeferredSemaphore(PREFETCH_CONCURRENCY))
+    return slots.run(crawl).addErrback(failed)
+
+
+def _select(results):
+    """Pick the results to prefetch, queueing them as jobs if enabled.
+
+    Runs in the reactor's thread pool. Returns the results still to be
+    crawled in this process.
+    """
+    picked = []
+    for result in needs_fetch(results):
+        if not take_budget(result.store):
+            logger.debug(f"Prefetch budget for {result.store} spent, skipping {result.url}")
+            continue
+        picked.append(result)
+    if picked:
+        logger.info(f"Prefetching {len(picked)} product pages")
+    if not SCRAPE_JOBS_ENABLED:
+        return picked
+    for result in picked:
+        ScrapeJob.enqueue_product(result.url, result.store, priority=ScrapeJob.PRIORITY_PREFETCH)
+    return []
+
+
+@run_in_reactor
+def _prefetch(results):
+    def crawl(picked):
+        for result in picked:
+            _crawl_when_free(result.url, result.store)
+
+    def failed(failure):
+        logger.error(f"Prefetch failed: {failure.getErrorMessage()}")
+
+    threads.deferToThread(_select, results).addCallback(crawl).addErrback(failed)
+
+
+def prefetch_results(results):
+    """Prefetch the product pages of the cheapest results, if enabled.
+
+    Only picks the candidates here and returns immediately. The database
+    checks run in the reactor's thread pool; only the crawls themselves are
+    started on the reactor thread.
+    """
+    if not PREFETCH_ENABLED:
+        return
+    candidates = top_results(results)
+    if candidates:
+        _prefetch(candidates)
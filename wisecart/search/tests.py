@@ -1,3 +1,146 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from products.models import Product
+from shops.models import Shop
+from wisecart.freshness import EXPIRED, FRESH, STALE, FreshnessPolicy, get_policy
+from . import views
+from .catalog import answer_from_catalog
+from .models import Search, SearchCache, SearchResult, TrendingSearch
+
+
+class NormalizeQueryTests(SimpleTestCase):
+    def test_ignores_case_spacing_and_word_order(self):
+        self.assertEqual(Search.normalize_query("  Gaming\tMOUSE  "), "gaming mouse")
+        self.assertEqual(Search.normalize_query("mouse gaming"), Search.normalize_query("Gaming Mouse"))
+
+    def test_casefolds_beyond_ascii(self):
+        self.assertEqual(Search.normalize_query("STRASSE"), Search.normalize_query("Straße"))
+
+    def test_keeps_different_words_apart(self):
+        self.assertNotEqual(Search.normalize_query("ssd 1tb"), Search.normalize_query("ssd 2tb"))
+        self.assertNotEqual(Search.normalize_query("mouse"), Search.normalize_query("mouse pad"))
+
+
+class FreshnessPolicyTests(SimpleTestCase):
+    def setUp(self):
+        self.policy = FreshnessPolicy(fresh=timedelta(hours=1), stale=timedelta(hours=3))
+
+    def test_state_by_age(self):
+        now = timezone.now()
+        for age, state in [
+            (timedelta(minutes=30), FRESH),
+            (timedelta(hours=2), STALE),
+            (timedelta(hours=4), EXPIRED),
+        ]:
+            with self.subTest(age=age):
+                self.assertEqual(self.policy.state(now - age), state)
+
+    def test_never_refreshed_is_expired(self):
+        self.assertEqual(self.policy.state(None), EXPIRED)
+
+    def test_stale_window_is_never_shorter_than_fresh(self):
+        policy = FreshnessPolicy(fresh=timedelta(hours=2), stale=timedelta(hours=1))
+        self.assertEqual(policy.state(timezone.now() - timedelta(minutes=90)), FRESH)
+        self.assertEqual(policy.state(timezone.now() - timedelta(hours=3)), EXPIRED)
+
+    def test_fresh_since_matches_state(self):
+        since = self.policy.fresh_since()
+        self.assertEqual(self.policy.state(since + timedelta(seconds=1)), FRESH)
+        self.assertEqual(self.policy.state(since - timedelta(seconds=1)), STALE)
+
+    @override_settings(FRESHNESS_POLICIES={"search": {"fresh_hours": 2}})
+    def test_settings_override_the_defaults(self):
+        policy = get_policy("search")
+        self.assertEqual(policy.fresh, timedelta(hours=2))
+        self.assertEqual(policy.stale, timedelta(hours=24 * 3))
+
+
+class TrendingSearchTests(TestCase):
+    def test_equivalent_queries_count_in_one_hourly_row(self):
+        TrendingSearch.record("Gaming Mouse")
+        TrendingSearch.record("mouse  gaming")
+
+        row = TrendingSearch.objects.get()
+        self.assertEqual(row.searches, 2)
+        self.assertEqual(row.normalized_query, "gaming mouse")
+        self.assertEqual(row.query, "mouse  gaming")
+        self.assertEqual(row.bucket, TrendingSearch.bucket_for(timezone.now()))
+
+    def test_keeps_the_lowest_price_seen(self):
+        TrendingSearch.record("ssd", min_price=Decimal("5000"))
+        TrendingSearch.record("ssd", min_price=Decimal("4500"))
+        TrendingSearch.record("ssd")
+        TrendingSearch.record_price("ssd", Decimal("4800"))
+        self.assertEqual(TrendingSearch.objects.get().lowest_price, Decimal("4500"))
+
+    def test_top_adds_up_hourly_buckets(self):
+        an_hour_ago = timezone.now() - timedelta(hours=1)
+        with mock.patch("search.models.timezone.now", return_value=an_hour_ago):
+            TrendingSearch.record("ssd")
+            TrendingSearch.record("mouse")
+        TrendingSearch.record("ssd", min_price=Decimal("4500"))
+
+        self.assertEqual(TrendingSearch.objects.count(), 3)
+        top = list(TrendingSearch.top(limit=1))
+        self.assertEqual(len(top), 1)
+        self.assertEqual(top[0]["normalized_query"], "ssd")
+        self.assertEqual(top[0]["search_count"], 2)
+        self.assertEqual(top[0]["min_price"], Decimal("4500"))
+
+
+class CatalogAnswerTests(TestCase):
+    def setUp(self):
+        self.shops = [
+            Shop.objects.create(name=name, mod_comment="", description="", all_domains="", address="")
+            for name in ("Startech", "Ryans", "TechLand")
+        ]
+        self.search = Search.objects.create(query="gaming mouse")
+
+    def stock(self, count, stores=3, name="Gaming Mouse"):
+        for i in range(count):
+            Product.objects.create(
+                name=f"{name} {i}",
+                store=self.shops[i % stores],
+                price=Decimal(1000 + i),
+                url=f"https://shop.test/{name.replace(' ', '-')}-{i}",
+            )
+
+    def test_answers_with_enough_products_from_enough_stores(self):
+        self.stock(10)
+        oldest = timezone.now() - timedelta(hours=2)
+        Product.objects.filter(name="Gaming Mouse 0").update(last_updated=oldest)
+
+        self.assertTrue(answer_from_catalog(self.search))
+        self.assertEqual(SearchResult.objects.filter(search=self.search).count(), 10)
+        cache = SearchCache.objects.get(normalized_query="gaming mouse")
+        self.assertEqual(cache.search, self.search)
+        self.assertEqual(cache.refreshed_at, oldest)
+
+    def test_too_few_products_fall_back_to_scraping(self):
+        self.stock(9)
+        self.assertFalse(answer_from_catalog(self.search))
+        self.assertFalse(SearchResult.objects.exists())
+
+    def test_too_few_stores_fall_back_to_scraping(self):
+        self.stock(12, stores=2)
+        self.assertFalse(answer_from_catalog(self.search))
+
+    def test_stale_products_do_not_count(self):
+        self.stock(10)
+        Product.objects.filter(name="Gaming Mouse 0").update(
+            last_updated=get_policy("product").fresh_since() - timedelta(minutes=1)
+        )
+        self.assertFalse(answer_from_catalog(self.search))
+
+    def test_stream_skips_the_catalog_the_page_already_asked(self):
+        request = RequestFactory().get("/search/results/stream/", {"search": self.search.id, "catalog": "checked"})
+        request.user = AnonymousUser()
+        with mock.patch.object(views, "answer_from_catalog") as answer:
+            views.results_stream(request)
+        answer.assert_not_called()
@@ -6,4 +6,5 @@ app_name = 'search'
 urlpatterns = [
     path('', views.search, name='index'),
     path('results/', views.results, name='results'),
+    path('results/stream/', views.results_stream, name='results_stream'),
 ]
\ No newline at end of file
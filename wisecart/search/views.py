@@ -1,23 +1,92 @@
-from django.shortcuts import render, redirect
+from django.shortcuts import render, redirect, get_object_or_404
+from django.http import Http404, StreamingHttpResponse
+from django.template.loader import render_to_string
 from django.utils import timezone
-from datetime import timedelta
-from django.db.models import Count, Min
-from .models import SearchResult, Search
-from scraper.scraper.spiders.startech import StartechSpider
-from scraper.scraper.spiders.potakait import PotakaitSpider
-from scraper.scraper.spiders.ucc import UCCSpider
-from scraper.scraper.spiders.techland import TechLandSpider
-from scraper.scraper.spiders.sumashtech import SumashTechSpider
-from scraper.scraper.spiders.riointernational import RioInternationalSpider
-from scrapy.crawler import CrawlerRunner
-from scrapy.utils.project import get_project_settings
-from crochet import setup, wait_for
+from django.conf import settings
+from django.db.models import Max
+from .models import SearchResult, Search, SearchCache, TrendingSearch
+from .catalog import answer_from_catalog
+from .prefetch import prefetch_results
+from jobs.models import ScrapeJob
+from wisecart.freshness import get_policy, EXPIRED, STALE
+from scraper.scraper import registry
+from scraper.scraper.crawl import crawl_search, search_wait_seconds
+from wisecart.singleflight import in_flight
+from crochet import setup, run_in_reactor, TimeoutError as CrawlTimeoutError
+import json
 import logging
-from twisted.internet import defer
+import queue
+import time
 
 logger = logging.getLogger(__name__)
 setup()
 
+# Render the results page straight away and push each store's rows over
+# Server-Sent Events as its spider finishes
+SEARCH_STREAMING = getattr(settings, "SEARCH_STREAMING", True)
+
+# Scraped results are shared across users per normalized query; stale ones
+# are served while a background crawl refreshes them
+SEARCH_POLICY = get_policy("search")
+
+# Hand crawls to the scrape_worker pool instead of running them in the request
+SCRAPE_JOBS_ENABLED = getattr(settings, "SCRAPE_JOBS_ENABLED", False)
+SCRAPE_JOB_WAIT_SECONDS = getattr(settings, "SCRAPE_JOB_WAIT_SECONDS", 5)
+
+# Try already-scraped products before going out to the stores
+CATALOG_SEARCH_ENABLED = getattr(settings, "CATALOG_SEARCH_ENABLED", True)
+
+
+@run_in_reactor
+def start_spiders(search_obj, search_term, on_spider_done):
+    """Run all search spiders without blocking the calling thread."""
+    return crawl_search(search_obj, search_term, on_spider_done)
+
+
+def run_spiders(search_obj, search_term):
+    """Run all search spiders and block until each finished or hit its deadline.
+
+    Returns the names of the stores that timed out.
+    """
+    finished = set()
+    eventual = start_spiders(
+        search_obj, search_term, lambda store_name, timed_out: finished.add(store_name)
+    )
+    try:
+        return eventual.wait(search_wait_seconds())
+    except CrawlTimeoutError:
+        logger.warning(f"Search fan-out for '{search_term}' overran its deadline")
+        return [name for name in registry.store_names() if name not in finished]
+
+
+def refresh_search_in_background(search_obj):
+    """Kick off a search re-scrape and return immediately."""
+    if in_flight("search", Search.normalize_query(search_obj.query)):
+        return
+    if SCRAPE_JOBS_ENABLED:
+        ScrapeJob.enqueue_search(search_obj)
+    else:
+        start_spiders(search_obj, search_obj.query, None)
+
+
+def fetch_results(search_id):
+    """Load a search's results with their stores in one query, cheapest first."""
+    if search_id is None:
+        return []
+    return list(
+        SearchResult.objects.filter(search_id=search_id)
+        .select_related("store")
+        .order_by("price")
+    )
+
+
+def count_stores(results):
+    return len({result.store_id for result in results})
+
+
+def lowest_price(results):
+    return min((result.price for result in results if result.price is not None), default=None)
+
 
 def search(request):
     if request.method == "POST":
@@ -28,16 +97,10 @@ def search(request):
                 query=search_term,
                 user=request.user if request.user.is_authenticated else None,
             )
+            TrendingSearch.record(search_term)
             return redirect(f"/results/?q={search_term}")
 
-    # Update trending searches query to work with new model
-    week_ago = timezone.now() - timedelta(days=7)
-    trending_searches = (
-        SearchResult.objects.filter(search__time__gte=week_ago)
-        .values("search__query")
-        .annotate(search_count=Count("search__query"), min_price=Min("price"))
-        .order_by("-search_count")[:8]
-    )
+    trending_searches = TrendingSearch.top(8)
 
     return render(
         request, "search/index.html", {"trending_searches": trending_searches}
@@ -51,85 +114,115 @@ def results(request):
 
     try:
         # Create or get the search object
+        now = timezone.now()
         search_obj, created = Search.objects.get_or_create(
             query=search_term,
             user=request.user if request.user.is_authenticated else None,
-            defaults={"time": timezone.now()},
+            defaults={"time": now},
+        )
+        # Trending counts a search once per user and hour; reloads and
+        # pending-page refreshes only lower its price
+        submitted = created or (
+            TrendingSearch.bucket_for(search_obj.time) != TrendingSearch.bucket_for(now)
         )
 
         # If not created, update the time
         if not created:
-            search_obj.time = timezone.now()
+            search_obj.time = now
             search_obj.save()
 
-        # Check for recent results
-        recent_results = SearchResult.objects.filter(
-            search=search_obj, search__time__gte=timezone.now() - timedelta(hours=24)
+        # Results are shared across users, keyed by the normalized query
+        cache, _ = SearchCache.objects.get_or_create(
+            normalized_query=Search.normalize_query(search_term)
         )
+        state = SEARCH_POLICY.state(cache.refreshed_at if cache.search_id else None)
+        # Expired results are still better than piling onto a crawl that
+        # another request already started for this query
+        if state != EXPIRED or in_flight("search", cache.normalized_query):
+            recent_results = fetch_results(cache.search_id)
+            if recent_results:
+                cache.record_hit()
+                if submitted:
+                    TrendingSearch.record(search_term, lowest_price(recent_results))
+                else:
+                    TrendingSearch.record_price(search_term, lowest_price(recent_results))
+                if state == STALE:
+                    try:
+                        refresh_search_in_background(search_obj)
+                    except Exception as e:
+                        logger.error(f"Error scheduling search refresh: {str(e)}")
+                logger.info(
+                    f"Cache hit: {len(recent_results)} recent results for '{search_term}'"
+                )
+                response = render(
+                    request,
+                    "search/results.html",
+                    {
+                        "results": recent_results,
+                        "search_term": search_term,
+                        "store_count": count_stores(recent_results),
+                    },
+                )
+                prefetch_results(recent_results)
+                return response
+        cache.record_miss()
+        if submitted:
+            TrendingSearch.record(search_term)
 
-        if recent_results.exists():
-            logger.info(
-                f"Found {recent_results.count()} recent results for '{search_term}'"
-            )
-            store_count = recent_results.values("store__name").distinct().count()
+        timed_out_stores = []
+        if CATALOG_SEARCH_ENABLED and answer_from_catalog(search_obj):
+            # Enough fresh products on file; skip scraping altogether
+            pass
+        elif SCRAPE_JOBS_ENABLED:
+            # Give the worker a short head start, then show a pending page
+            job = ScrapeJob.enqueue_search(search_obj)
+            if not job.wait(SCRAPE_JOB_WAIT_SECONDS):
+                return render(
+                    request,
+                    "search/results.html",
+                    {
+                        "search_term": search_term,
+                        "pending": True,
+                        "store_count": 0,
+                    },
+                )
+        elif SEARCH_STREAMING:
+            # Render the page now; results_stream runs the spiders
             return render(
                 request,
                 "search/results.html",
                 {
-                    "results": recent_results.order_by("price"),
                     "search_term": search_term,
-                    "store_count": store_count,
+                    "search_id": search_obj.id,
+                    "streaming": True,
+                    "store_count": 0,
                 },
             )
+        else:
+            # Run spiders and wait for results; slow stores are left out
+            logger.info(f"No recent results found for '{search_term}', starting spiders")
+            timed_out_stores = run_spiders(search_obj, search_term)
 
-        # If no recent results, run the spiders
-        logger.info(f"No recent results found for '{search_term}', starting spiders")
-
-        @wait_for(timeout=30)
-        def run_spiders():
-            settings = get_project_settings()
-            settings.set(
-                "ITEM_PIPELINES",
-                {"scraper.scraper.pipelines.SearchResultPipeline": 300},
-            )
-
-            runner = CrawlerRunner(settings)
-
-            # Delete old results for this search
-            SearchResult.objects.filter(search=search_obj).delete()
-
-            # Run all spiders in parallel
-            deferreds = [
-                runner.crawl(StartechSpider, search_term=search_term, search_obj=search_obj),
-                runner.crawl(PotakaitSpider, search_term=search_term, search_obj=search_obj),
-                runner.crawl(UCCSpider, search_term=search_term, search_obj=search_obj),
-                runner.crawl(TechLandSpider, search_term=search_term, search_obj=search_obj),
-                runner.crawl(SumashTechSpider, search_term=search_term, search_obj=search_obj),
-                runner.crawl(RioInternationalSpider, search_term=search_term, search_obj=search_obj),
-            ]
-            dlist = defer.DeferredList(deferreds, consumeErrors=True)
-            return dlist
+        # Get the new results; the catalog or the crawl, ours or one we
+        # joined, points the shared cache at them
+        cache.refresh_from_db()
+        results = fetch_results(cache.search_id or search_obj.id)
+        TrendingSearch.record_price(search_term, lowest_price(results))
 
-        # Run spiders and wait for results
-        run_spiders()
+        logger.info(f"Found {len(results)} results for '{search_term}'")
 
-        # Get the new results
-        results = SearchResult.objects.filter(search=search_obj).order_by("price")
-        store_count = results.values("store__name").distinct().count()
-
-        logger.info(
-            f"Spiders completed, found {results.count()} results for '{search_term}'"
-        )
-
-        return render(
+        response = render(
             request,
             "search/results.html",
             {
                 "results": results,
                 "search_term": search_term,
-                "store_count": store_count,
+                "store_count": count_stores(results),
+                "timed_out_stores": timed_out_stores,
             },
         )
+        prefetch_results(results)
+        return response
 
     except Exception as e:
         logger.error(f"Error in search results view: {str(e)}")
@@ -142,3 +235,149 @@ def results(request):
                 "store_count": 0,
             },
         )
+
+
+def _sse_event(event, data):
+    """Format one Server-Sent Event."""
+    lines = "".join(f"data: {line}\n" for line in data.splitlines() or [""])
+    return f"event: {event}\n{lines}\n"
+
+
+def _stream_known(results):
+    """Send results that are already known as one batch, then finish."""
+    cards = "".join(
+        render_to_string("search/result_card.html", {"result": result}) for result in results
+    )
+    if cards:
+        yield _sse_event("results", cards)
+    yield _sse_event(
+        "done",
+        json.dumps({"count": len(results), "store_count": count_stores(results), "timed_out": []}),
+    )
+
+
+def results_stream(request):
+    """Stream search results as Server-Sent Events, one batch per store.
+
+    Like ``results``, fresh or stale shared results and a good catalog
+    answer are sent as they are; only otherwise are the spiders started.
+    The results page passes ``catalog=checked`` because it has just asked
+    the catalog for the same query, so the stream does not ask again.
+    """
+    search_id = request.GET.get("search", "")
+    if not search_id.isdigit():
+        raise Http404("Unknown search")
+    search_obj = get_object_or_404(
+        Search,
+        id=search_id,
+        user=request.user if request.user.is_authenticated else None,
+    )
+
+    cache = SearchCache.objects.filter(
+        normalized_query=Search.normalize_query(search_obj.query)
+    ).first()
+    state = SEARCH_POLICY.state(cache.refreshed_at if cache and cache.search_id else None)
+    known = fetch_results(cache.search_id) if state != EXPIRED else []
+    if known and state == STALE:
+        try:
+            refresh_search_in_background(search_obj)
+        except Exception as e:
+            logger.error(f"Error scheduling search refresh: {str(e)}")
+    elif (
+        not known
+        and CATALOG_SEARCH_ENABLED
+        and request.GET.get("catalog") != "checked"
+        and answer_from_catalog(search_obj)
+    ):
+        known = fetch_results(search_obj.id)
+
+    def event_stream():
+        finished = queue.Queue()
+        # Rows from an earlier crawl stay until this one completes; skip them
+        previous_max_id = (
+            SearchResult.objects.filter(search=search_obj).aggregate(Max("id"))["id__max"] or 0
+        )
+        sent_ids = set()
+        sent = []
+        store_ids = set()
+        pending_stores = set(registry.store_names())
+        timed_out_stores = []
+        min_price = None
+        deadline = time.monotonic() + search_wait_seconds()
+
+        try:
+            start_spiders(
+                search_obj,
+                search_obj.query,
+                lambda store_name, timed_out: finished.put((store_name, timed_out)),
+            )
+        except Exception as e:
+            logger.error(f"Error starting spiders for '{search_obj.query}': {str(e)}")
+            yield _sse_event(
+                "done", json.dumps({"count": 0, "store_count": 0, "timed_out": []})
+            )
+            return
+
+        while pending_stores:
+            try:
+                store_name, timed_out = finished.get(
+                    timeout=max(deadline - time.monotonic(), 0)
+                )
+            except queue.Empty:
+                logger.warning(f"Search stream for '{search_obj.query}' timed out")
+                timed_out_stores.extend(sorted(pending_stores))
+                break
+            if store_name is None:
+                # Another request crawled this query; send what it found
+                cache = SearchCache.objects.filter(
+                    normalized_query=Search.normalize_query(search_obj.query)
+                ).first()
+                new_results = SearchResult.objects.filter(
+                    search_id=cache.search_id if cache else search_obj.id
+                ).select_related("store")
+                pending_stores.clear()
+            else:
+                pending_stores.discard(store_name)
+                if timed_out:
+                    timed_out_stores.append(store_name)
+                new_results = (
+                    SearchResult.objects.filter(search=search_obj, id__gt=previous_max_id)
+                    .exclude(id__in=sent_ids)
+                    .select_related("store")
+                )
+            cards = []
+            for result in new_results:
+                sent_ids.add(result.id)
+                sent.append(result)
+                store_ids.add(result.store_id)
+                if result.price is not None and (min_price is None or result.price < min_price):
+                    min_price = result.price
+                cards.append(
+                    render_to_string("search/result_card.html", {"result": result})
+                )
+
+            logger.info(
+                f"{store_name or 'Joined crawl'} finished, streaming {len(cards)} results for '{search_obj.query}'"
+            )
+            if cards:
+                yield _sse_event("results", "".join(cards))
+
+        TrendingSearch.record_price(search_obj.query, min_price)
+        yield _sse_event(
+            "done",
+            json.dumps(
+                {
+                    "count": len(sent_ids),
+                    "store_count": len(store_ids),
+                    "timed_out": timed_out_stores,
+                }
+            ),
+        )
+        # Runs once the client has the final event
+        prefetch_results(sent)
+
+    stream = _stream_known(known) if known else event_stream()
+    response = StreamingHttpResponse(stream, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -1,10 +1,10 @@
 from django.contrib import admin
 from django.utils import timezone
-from .models import Shop, Review, FeaturedShop
+from .models import Shop, Review, FeaturedShop, ShopCrawlStats
 
 @admin.register(Shop)
 class ShopAdmin(admin.ModelAdmin):
-    list_display = ('name', 'category', 'store_type', 'have_app')
+    list_display = ('name', 'category', 'store_type', 'have_app', 'search_timeout', 'max_concurrency', 'download_timeout')
     search_fields = ('name', 'category', 'store_type')
     list_filter = ('store_type', 'have_app')
 
@@ -24,4 +24,19 @@ class FeaturedShopAdmin(admin.ModelAdmin):
     def is_active(self, obj):
         return obj.expiry_date >= timezone.now()
     is_active.boolean = True
-    is_active.short_description = 'Active'
\ No newline at end of file
+    is_active.short_description = 'Active'
+
+@admin.register(ShopCrawlStats)
+class ShopCrawlStatsAdmin(admin.ModelAdmin):
+    list_display = ('shop', 'kind', 'bucket', 'crawls', 'requests', 'errors', 'timeouts', 'retries',
+                    'not_modified', 'bytes_saved', 'get_throughput', 'get_error_rate')
+    list_filter = ('kind', 'shop', 'bucket')
+    readonly_fields = ShopCrawlStats.COUNTERS
+
+    def get_throughput(self, obj):
+        return f"{obj.throughput:.2f}/s" if obj.throughput is not None else "-"
+    get_throughput.short_description = 'Throughput'
+
+    def get_error_rate(self, obj):
+        return f"{obj.error_rate:.1%}" if obj.error_rate is not None else "-"
+    get_error_rate.short_description = 'Error Rate'
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-18 14:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shops', '0003_alter_shop_options'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shop',
+            name='search_timeout',
+            field=models.PositiveSmallIntegerField(default=15, help_text='Seconds a search crawl of this store may run before it is cancelled'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.1.3 on 2026-10-18 15:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shops', '0004_shop_search_timeout'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shop',
+            name='compression',
+            field=models.BooleanField(default=True, help_text='Ask this store for compressed responses'),
+        ),
+        migrations.AddField(
+            model_name='shop',
+            name='download_timeout',
+            field=models.PositiveSmallIntegerField(default=30, help_text='Seconds before a single download from this store is abandoned'),
+        ),
+        migrations.AddField(
+            model_name='shop',
+            name='max_concurrency',
+            field=models.PositiveSmallIntegerField(default=8, help_text="Parallel requests (and kept-alive connections) to this store's domain"),
+        ),
+        migrations.AddField(
+            model_name='shop',
+            name='retry_times',
+            field=models.PositiveSmallIntegerField(default=2, help_text='How often a failed download is retried'),
+        ),
+        migrations.AddField(
+            model_name='shop',
+            name='use_http2',
+            field=models.BooleanField(default=False, help_text='Download over HTTP/2 (needs the h2 package)'),
+        ),
+        migrations.CreateModel(
+            name='ShopCrawlStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField()),
+                ('kind', models.CharField(choices=[('search', 'Search'), ('product', 'Product'), ('catalog', 'Catalog')], max_length=10)),
+                ('crawls', models.PositiveIntegerField(default=0)),
+                ('requests', models.PositiveIntegerField(default=0)),
+                ('responses', models.PositiveIntegerField(default=0)),
+                ('errors', models.PositiveIntegerField(default=0, help_text='Failed downloads and 4xx/5xx responses')),
+                ('timeouts', models.PositiveIntegerField(default=0)),
+                ('retries', models.PositiveIntegerField(default=0)),
+                ('bytes', models.BigIntegerField(default=0)),
+                ('seconds', models.FloatField(default=0, help_text='Total crawl run time')),
+                ('shop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='crawl_stats', to='shops.shop')),
+            ],
+            options={
+                'verbose_name': 'Shop Crawl Stats',
+                'verbose_name_plural': 'Shop Crawl Stats',
+                'ordering': ['-bucket', 'shop'],
+                'unique_together': {('shop', 'bucket', 'kind')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.3 on 2026-10-18 15:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shops', '0005_shop_compression_shop_download_timeout_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shopcrawlstats',
+            name='bytes_saved',
+            field=models.BigIntegerField(default=0, help_text='Body bytes those 304s did not download'),
+        ),
+        migrations.AddField(
+            model_name='shopcrawlstats',
+            name='not_modified',
+            field=models.PositiveIntegerField(default=0, help_text='Pages revalidated with a 304'),
+        ),
+    ]
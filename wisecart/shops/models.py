@@ -1,8 +1,15 @@
 from django.db import models
+from django.utils import timezone
 from django.utils.text import slugify
 from django.conf import settings
+from wisecart.rollups import add_to_rollup
 
 class Shop(models.Model):
+    DEFAULT_SEARCH_TIMEOUT = 15  # seconds
+    DEFAULT_MAX_CONCURRENCY = 8
+    DEFAULT_DOWNLOAD_TIMEOUT = 30  # seconds
+    DEFAULT_RETRY_TIMES = 2
+
     STORE_TYPE_CHOICES = [
         ('online', 'Online'),
         ('offline', 'Offline'),
@@ -27,6 +34,32 @@ class Shop(models.Model):
     contact_number = models.CharField(max_length=15, blank=True, null=True)
     email = models.EmailField(blank=True, null=True)
     social_media = models.CharField(max_length=255, blank=True, null=True)
+    search_timeout = models.PositiveSmallIntegerField(
+        default=DEFAULT_SEARCH_TIMEOUT,
+        help_text="Seconds a search crawl of this store may run before it is cancelled",
+    )
+
+    # Download profile, applied to every crawl of this store
+    max_concurrency = models.PositiveSmallIntegerField(
+        default=DEFAULT_MAX_CONCURRENCY,
+        help_text="Parallel requests (and kept-alive connections) to this store's domain",
+    )
+    download_timeout = models.PositiveSmallIntegerField(
+        default=DEFAULT_DOWNLOAD_TIMEOUT,
+        help_text="Seconds before a single download from this store is abandoned",
+    )
+    retry_times = models.PositiveSmallIntegerField(
+        default=DEFAULT_RETRY_TIMES,
+        help_text="How often a failed download is retried",
+    )
+    use_http2 = models.BooleanField(
+        default=False,
+        help_text="Download over HTTP/2 (needs the h2 package)",
+    )
+    compression = models.BooleanField(
+        default=True,
+        help_text="Ask this store for compressed responses",
+    )
 
     class Meta:
         ordering = ['name']  # Add this line to order shops by name
@@ -73,4 +106,91 @@ class FeaturedShop(models.Model):
         ordering = ['-priority', '-featured_date']
 
     def __str__(self):
-        return f"Featured Shops ({self.featured_date.strftime('%Y-%m-%d')})"
\ No newline at end of file
+        return f"Featured Shops ({self.featured_date.strftime('%Y-%m-%d')})"
+
+
+class ShopCrawlStats(models.Model):
+    """Hourly download counters per shop and crawl kind, for tuning download profiles."""
+    KIND_SEARCH = 'search'
+    KIND_PRODUCT = 'product'
+    KIND_CATALOG = 'catalog'
+    KIND_CHOICES = [
+        (KIND_SEARCH, 'Search'),
+        (KIND_PRODUCT, 'Product'),
+        (KIND_CATALOG, 'Catalog'),
+    ]
+    COUNTERS = (
+        'crawls', 'requests', 'responses', 'errors', 'timeouts', 'retries', 'bytes', 'seconds',
+        'not_modified', 'bytes_saved',
+    )
+
+    shop = models.ForeignKey(Shop, related_name="crawl_stats", on_delete=models.CASCADE)
+    bucket = models.DateTimeField()
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    crawls = models.PositiveIntegerField(default=0)
+    requests = models.PositiveIntegerField(default=0)
+    responses = models.PositiveIntegerField(default=0)
+    errors = models.PositiveIntegerField(default=0, help_text="Failed downloads and 4xx/5xx responses")
+    timeouts = models.PositiveIntegerField(default=0)
+    retries = models.PositiveIntegerField(default=0)
+    bytes = models.BigIntegerField(default=0)
+    seconds = models.FloatField(default=0, help_text="Total crawl run time")
+    not_modified = models.PositiveIntegerField(default=0, help_text="Pages revalidated with a 304")
+    bytes_saved = models.BigIntegerField(default=0, help_text="Body bytes those 304s did not download")
+
+    class Meta:
+        unique_together = ('shop', 'bucket', 'kind')
+        ordering = ['-bucket', 'shop']
+        verbose_name = "Shop Crawl Stats"
+        verbose_name_plural = "Shop Crawl Stats"
+
+    def __str__(self):
+        return f"{self.shop} {self.kind} @ {self.bucket:%Y-%m-%d %H:00}"
+
+    @property
+    def throughput(self):
+        """Responses per second of crawl time."""
+        return self.responses / self.seconds if self.seconds else None
+
+    @property
+    def error_rate(self):
+        return self.errors / self.requests if self.requests else None
+
+    @staticmethod
+    def counters_from(stats):
+        """This model's counters from one crawl's Scrapy stats."""
+        errors = stats.get('downloader/exception_count', 0) + sum(
+            count for key, count in stats.items()
+            if key.startswith('downloader/response_status_count/') and int(key.rsplit('/', 1)[1]) >= 400
+        )
+        timeouts = sum(
+            count for key, count in stats.items()
+            if key.startswith('downloader/exception_type_count/') and 'Timeout' in key
+        )
+        return {
+            'crawls': 1,
+            'requests': stats.get('downloader/request_count', 0),
+            'responses': stats.get('downloader/response_count', 0),
+            'errors': errors,
+            'timeouts': timeouts,
+            'retries': stats.get('retry/count', 0),
+            'bytes': stats.get('downloader/response_bytes', 0),
+            'seconds': stats.get('elapsed_time_seconds', 0),
+            'not_modified': stats.get('revalidation/not_modified', 0),
+            'bytes_saved': stats.get('revalidation/bytes_saved', 0),
+        }
+
+    @classmethod
+    def record(cls, shop, kind, stats):
+        """Add one finished crawl's Scrapy stats to the current hour bucket."""
+        counters = cls.counters_from(stats)
+        add_to_rollup(
+            cls,
+            key={
+                'shop': shop,
+                'bucket': timezone.now().replace(minute=0, second=0, microsecond=0),
+                'kind': kind,
+            },
+            updates={name: models.F(name) + value for name, value in counters.items()},
+            initial=counters,
+        )
@@ -1,3 +1,28 @@
 from django.test import TestCase
 
-# Create your tests here.
+from .models import Shop, ShopCrawlStats
+
+
+class ShopCrawlStatsTests(TestCase):
+    def test_crawls_add_up_in_the_hourly_row(self):
+        shop = Shop.objects.create(
+            name="Startech", mod_comment="", description="", all_domains="", address=""
+        )
+        stats = {
+            'downloader/request_count': 3,
+            'downloader/response_count': 3,
+            'downloader/response_status_count/200': 2,
+            'downloader/response_status_count/503': 1,
+            'revalidation/not_modified': 1,
+            'revalidation/bytes_saved': 5000,
+            'elapsed_time_seconds': 1.5,
+        }
+        ShopCrawlStats.record(shop, ShopCrawlStats.KIND_PRODUCT, stats)
+        ShopCrawlStats.record(shop, ShopCrawlStats.KIND_PRODUCT, stats)
+        ShopCrawlStats.record(shop, ShopCrawlStats.KIND_SEARCH, stats)
+
+        row = ShopCrawlStats.objects.get(kind=ShopCrawlStats.KIND_PRODUCT)
+        self.assertEqual((row.crawls, row.requests, row.errors), (2, 6, 2))
+        self.assertEqual((row.not_modified, row.bytes_saved), (2, 10000))
+        self.assertEqual(row.seconds, 3.0)
+        self.assertEqual(ShopCrawlStats.objects.count(), 2)
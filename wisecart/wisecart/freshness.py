@@ -0,0 +1,55 @@
+"""Stale-while-revalidate freshness windows for scraped data.
+
+Every entity type has two windows, configured in ``FRESHNESS_POLICIES``:
+
+* ``fresh_hours``: data younger than this is served as-is.
+* ``stale_hours``: data younger than this (but no longer fresh) is served
+  immediately while a refresh runs in the background.
+
+Anything older is expired and the caller has to block on a re-scrape.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+FRESH = "fresh"
+STALE = "stale"
+EXPIRED = "expired"
+
+DEFAULT_POLICIES = {
+    "product": {"fresh_hours": 24, "stale_hours": 24 * 7},
+    "search": {"fresh_hours": 24, "stale_hours": 24 * 3},
+}
+
+
+class FreshnessPolicy:
+    def __init__(self, fresh, stale):
+        self.fresh = fresh
+        self.stale = max(stale, fresh)
+
+    def state(self, timestamp):
+        """Classify data last refreshed at ``timestamp`` (None means never)."""
+        if timestamp is None:
+            return EXPIRED
+        age = timezone.now() - timestamp
+        if age <= self.fresh:
+            return FRESH
+        if age <= self.stale:
+            return STALE
+        return EXPIRED
+
+    def fresh_since(self):
+        """Oldest timestamp that still counts as fresh, for queryset filters."""
+        return timezone.now() - self.fresh
+
+
+def get_policy(entity):
+    config = {
+        **DEFAULT_POLICIES[entity],
+        **getattr(settings, "FRESHNESS_POLICIES", {}).get(entity, {}),
+    }
+    return FreshnessPolicy(
+        fresh=timedelta(hours=config["fresh_hours"]),
+        stale=timedelta(hours=config["stale_hours"]),
+    )
@@ -0,0 +1,25 @@
+"""Upserts for rollup tables: rows of counters kept per time bucket and key.
+
+Rollups are updated as events happen, so the common case (the row exists)
+has to be a single UPDATE, and two writers creating the same bucket at once
+must not lose a count.
+"""
+from django.db import IntegrityError, transaction
+
+
+def add_to_rollup(model, key, updates, initial):
+    """Apply ``updates`` to the row matching ``key``, or create it from ``initial``.
+
+    ``updates`` maps fields to expressions such as ``F("searches") + 1``;
+    ``initial`` holds the values of a new row for the same event. If another
+    writer creates the row between our UPDATE and INSERT, the unique key makes
+    the INSERT fail and the update is applied to their row instead.
+    """
+    rows = model.objects.filter(**key)
+    if rows.update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**key, **initial)
+    except IntegrityError:
+        rows.update(**updates)
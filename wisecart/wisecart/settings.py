@@ -18,11 +18,13 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "users",
     "products",
     "search",
     "shops",
     "comparison",
+    "jobs",
 ]
 
 MIDDLEWARE = [
@@ -109,6 +111,67 @@ MEDIA_ROOT = BASE_DIR / "media"
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Search settings
+SEARCH_STREAMING = True  # Push results to the page per store as spiders finish
+SEARCH_RESULT_BATCH_SIZE = 100  # Scraped results buffered per store before a bulk insert
+
+# Answer searches from already-scraped products when enough fresh ones match;
+# only fall back to scraping the stores when coverage is poor
+CATALOG_SEARCH_ENABLED = True
+CATALOG_MIN_RESULTS = 10
+CATALOG_MIN_STORES = 3
+CATALOG_MAX_RESULTS = 60
+
+# Stale-while-revalidate windows (see wisecart/freshness.py). Data younger than
+# fresh_hours is served as-is, data younger than stale_hours is served while a
+# background refresh runs, and anything older blocks on a re-scrape.
+FRESHNESS_POLICIES = {
+    "product": {"fresh_hours": 24, "stale_hours": 24 * 7},
+    "search": {"fresh_hours": 24, "stale_hours": 24 * 3},
+}
+
+# Product refreshes send conditional requests and skip unchanged pages;
+# validators and compressed bodies are kept here
+PRODUCT_REVALIDATION = True
+REVALIDATION_CACHE_DIR = BASE_DIR / ".scrapy" / "revalidation"
+# Least recently used entries beyond the limit, and any unused for the age, are evicted
+REVALIDATION_CACHE_MAX_ENTRIES = 20000
+REVALIDATION_CACHE_MAX_AGE = 60 * 60 * 24 * 30  # seconds
+
+# Scrape job queue
+SCRAPE_JOBS_ENABLED = False  # Set True when `manage.py scrape_worker` is running
+SCRAPE_JOB_WAIT_SECONDS = 5  # How long a view waits for a job before showing a pending page
+SCRAPE_WORKER_PROCESSES = 2
+SCRAPE_JOB_TIMEOUT = 60  # seconds
+# Running jobs older than this have lost their worker and are failed by the
+# next claim; keep it above SCRAPE_JOB_TIMEOUT
+SCRAPE_JOB_LEASE = 180  # seconds
+
+# Comparison lists are kept in a signed cookie, so they need no session or DB rows
+COMPARISON_COOKIE_AGE = 60 * 60 * 24 * 30  # seconds
+
+# Speculative prefetch: once a results page is served, crawl the product pages
+# of the PREFETCH_TOP_N cheapest results per store in the background, at most
+# PREFETCH_PER_STORE_PER_MINUTE per store (override per store slug in
+# PREFETCH_BUDGETS). The budget is counted in the Django cache.
+PREFETCH_ENABLED = False
+PREFETCH_TOP_N = 3
+PREFETCH_PER_STORE_PER_MINUTE = 10
+PREFETCH_BUDGETS = {}
+PREFETCH_CONCURRENCY = 1  # Prefetch crawls per store at a time (without the job queue)
+
+# Full-catalog crawl (`manage.py crawl_catalog`). AutoThrottle adapts the delay
+# per domain to aim for CATALOG_TARGET_CONCURRENCY parallel requests, never
+# exceeding CATALOG_MAX_CONCURRENCY. Crawl state is kept per store under
+# CATALOG_JOBDIR so an interrupted run resumes where it stopped.
+CATALOG_JOBDIR = BASE_DIR / ".scrapy" / "catalog"
+CATALOG_TARGET_CONCURRENCY = 2.0
+CATALOG_MAX_CONCURRENCY = 4
+CATALOG_START_URLS = {}  # Per-store overrides of the category pages to start from, keyed by slug
+
+# Recorded responses for offline spider runs (`manage.py cassette record|replay`)
+CASSETTE_DIR = BASE_DIR / "scraper" / "cassettes"
+
 # Authentication settings
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'users:profile'
@@ -0,0 +1,156 @@
+"""Single-flight coalescing for identical scrapes.
+
+Only one crawl per key (a product's ``url_key`` or a normalized search query)
+runs at a time. Inside a process, callers that arrive while a crawl is
+running get a Deferred that fires when it finishes. Across gunicorn workers,
+scrape worker processes and hosts, a Postgres advisory lock held by the crawling process
+makes the others wait for it instead of starting their own crawl. On other
+databases only crawls within the same process are coalesced.
+
+Waiting does not prove the leader succeeded: its crawl may have failed or
+been cancelled. So once it is done, each follower asks ``ready()`` whether
+the data is there, and if not, tries to crawl it itself.
+
+``coalesce`` must be called on the reactor thread; ``in_flight`` may be
+called from anywhere.
+"""
+import hashlib
+import logging
+import time
+
+from django.db import connection
+from twisted.internet import defer, task
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 0.5  # seconds between advisory lock checks while waiting
+
+# Result a follower's Deferred fires with; whatever is known is in the database
+COALESCED = object()
+
+# Keys crawled (or waited on) by this process -> follower Deferreds
+_in_flight = {}
+
+
+def lock_key(namespace, value):
+    """Map a key onto the signed 64-bit space of Postgres advisory locks."""
+    digest = hashlib.sha256(f"{namespace}:{value}".encode()).digest()
+    return int.from_bytes(digest[:8], "big", signed=True)
+
+
+def _uses_advisory_locks():
+    return connection.vendor == "postgresql"
+
+
+def _try_lock(key):
+    if not _uses_advisory_locks():
+        return True
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_try_advisory_lock(%s)", [key])
+        return cursor.fetchone()[0]
+
+
+def _unlock(key):
+    if not _uses_advisory_locks():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_unlock(%s)", [key])
+
+
+def lock_parts(key):
+    """The (classid, objid) pair ``pg_locks`` shows for a bigint advisory lock."""
+    return (key >> 32) & 0xFFFFFFFF, key & 0xFFFFFFFF
+
+
+def _locked(key):
+    """Whether any session holds the advisory lock, checked without taking it.
+
+    Briefly taking the lock to test it would make a real leader's
+    ``pg_try_advisory_lock`` fail in the meantime.
+    """
+    if not _uses_advisory_locks():
+        return False
+    classid, objid = lock_parts(key)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT EXISTS (SELECT 1 FROM pg_locks WHERE locktype = 'advisory' AND granted"
+            " AND database = (SELECT oid FROM pg_database WHERE datname = current_database())"
+            " AND classid = %s::oid AND objid = %s::oid AND objsubid = 1)",
+            [classid, objid],
+        )
+        return cursor.fetchone()[0]
+
+
+def in_flight(namespace, value):
+    """Return True if a crawl for this key is running in any process."""
+    key = lock_key(namespace, value)
+    return key in _in_flight or _locked(key)
+
+
+def _release_followers(key):
+    for follower in _in_flight.pop(key, []):
+        follower.callback(COALESCED)
+
+
+def _wait_for_leader(key, deadline):
+    """Poll until the process holding the advisory lock lets go of it."""
+    from twisted.internet import reactor
+
+    _in_flight[key] = []
+
+    def poll():
+        if not _locked(key) or time.monotonic() >= deadline:
+            return COALESCED
+        return task.deferLater(reactor, POLL_INTERVAL, poll)
+
+    def done(result):
+        _release_followers(key)
+        return result
+
+    return task.deferLater(reactor, POLL_INTERVAL, poll).addBoth(done)
+
+
+def _lead(key, crawl):
+    _in_flight[key] = []
+
+    def finish(result):
+        _unlock(key)
+        _release_followers(key)
+        return result
+
+    return defer.maybeDeferred(crawl).addBoth(finish)
+
+
+def coalesce(namespace, value, crawl, timeout, ready=None):
+    """Run ``crawl()`` unless the same key is already being crawled somewhere.
+
+    The leader's Deferred fires with ``crawl``'s result. A follower waits for
+    the leader to finish and then calls ``ready()``: if the data is there
+    (or there is no ``ready``) its Deferred fires with ``COALESCED``;
+    otherwise it tries again, leading a crawl itself if nobody else is. After
+    ``timeout`` seconds of waiting it fires with ``COALESCED`` regardless.
+    """
+    key = lock_key(namespace, value)
+    deadline = time.monotonic() + timeout
+
+    def attempt():
+        if key in _in_flight:
+            logger.info(f"Joining in-flight {namespace} crawl for '{value}'")
+            follower = defer.Deferred()
+            _in_flight[key].append(follower)
+            return follower.addCallback(waited)
+        if not _try_lock(key):
+            logger.info(f"Another process is crawling {namespace} '{value}', waiting")
+            return _wait_for_leader(key, deadline).addCallback(waited)
+        return _lead(key, crawl)
+
+    def waited(_):
+        if ready is None or ready():
+            return COALESCED
+        if time.monotonic() >= deadline:
+            logger.warning(f"Gave up waiting for the {namespace} crawl of '{value}'")
+            return COALESCED
+        logger.info(f"The {namespace} crawl of '{value}' left nothing behind, retrying")
+        return attempt()
+
+    return attempt()
@@ -0,0 +1,74 @@
+from django.test import SimpleTestCase
+from twisted.internet import defer
+
+from wisecart import singleflight
+from wisecart.singleflight import COALESCED, coalesce, in_flight
+
+
+class Crawl:
+    """A crawl that stays in flight until the test finishes it."""
+
+    def __init__(self):
+        self.runs = []
+
+    def __call__(self):
+        d = defer.Deferred()
+        self.runs.append(d)
+        return d
+
+
+def result_of(d):
+    results = []
+    d.addBoth(results.append)
+    return results
+
+
+class CoalesceTests(SimpleTestCase):
+    def tearDown(self):
+        singleflight._in_flight.clear()
+
+    def test_concurrent_callers_share_one_crawl(self):
+        crawl = Crawl()
+        leader = result_of(coalesce("product", "k", crawl, timeout=60))
+        follower = result_of(coalesce("product", "k", crawl, timeout=60))
+
+        self.assertEqual(len(crawl.runs), 1)
+        self.assertTrue(in_flight("product", "k"))
+        crawl.runs[0].callback("saved")
+
+        self.assertEqual(leader, ["saved"])
+        self.assertEqual(follower, [COALESCED])
+        self.assertFalse(in_flight("product", "k"))
+
+    def test_different_keys_crawl_separately(self):
+        crawl = Crawl()
+        coalesce("product", "a", crawl, timeout=60)
+        coalesce("product", "b", crawl, timeout=60)
+        coalesce("search", "a", crawl, timeout=60)
+        self.assertEqual(len(crawl.runs), 3)
+
+    def test_follower_crawls_itself_when_the_leader_left_no_data(self):
+        crawl = Crawl()
+        leader = result_of(coalesce("product", "k", crawl, timeout=60))
+        follower = result_of(coalesce("product", "k", crawl, timeout=60, ready=lambda: False))
+
+        crawl.runs[0].errback(RuntimeError("crawl failed"))
+        leader[0].trap(RuntimeError)
+        self.assertEqual(len(crawl.runs), 2)
+        self.assertEqual(follower, [])
+        crawl.runs[1].callback("saved")
+        self.assertEqual(follower, ["saved"])
+
+    def test_follower_is_done_when_the_data_is_there(self):
+        crawl = Crawl()
+        leader = result_of(coalesce("product", "k", crawl, timeout=60))
+        follower = result_of(coalesce("product", "k", crawl, timeout=60, ready=lambda: True))
+
+        crawl.runs[0].errback(RuntimeError("crawl failed"))
+        self.assertEqual(len(crawl.runs), 1)
+        self.assertEqual(follower, [COALESCED])
+        leader[0].trap(RuntimeError)
+
+    def test_lock_parts_match_pg_locks_columns(self):
+        self.assertEqual(singleflight.lock_parts(-1), (0xFFFFFFFF, 0xFFFFFFFF))
+        self.assertEqual(singleflight.lock_parts((5 << 32) | 7), (5, 7))
@@ -1,22 +1,11 @@
 from django.shortcuts import render
-from django.db.models import Count
-from django.utils import timezone
-from datetime import timedelta
-from search.models import Search
+from search.models import TrendingSearch
 from shops.models import Shop
 
 
 def index(request):
-    # Calculate the date 7 days ago
-    one_week_ago = timezone.now() - timedelta(days=7)
-
-    # Get the most searched terms within the last week
-    most_searched_terms = (
-        Search.objects.filter(time__gte=one_week_ago)
-        .values("query")
-        .annotate(search_count=Count("query"))
-        .order_by("-search_count")[:9]
-    )
+    # Most searched terms within the last week, from the hourly rollup
+    most_searched_terms = TrendingSearch.top(9)
 
     shops = Shop.objects.all()[:4]
 